@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class TeachadminConfig(AppConfig):
     name = 'teachadmin'
+
+    def ready(self):
+        # Connects the ScoreDataVersion signal handlers
+        from . import signals
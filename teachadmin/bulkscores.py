@@ -0,0 +1,127 @@
+""" Entering the scores of a whole class for one score model (Exam, Assignment, LessonTest
+    or Homework) at once.
+    The students' best scores are read with a single query, every new score is checked in
+    memory (ScoreEntry.validate_many(), the same checks clean() runs) and the valid batch is
+    written with bulk_create() inside one transaction. bulk_create() skips the signal handlers,
+    so the BestScores and ScoreDataVersions are brought up to date here instead. """
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import BestScore, ScoreEntry
+from .signals import scores_written
+
+
+def item_subject(item):
+    """ The Subject a score model belongs to (LessonTests and Homeworks through their Lesson). """
+    if hasattr(item, 'subject_id'):
+        return item.subject
+    return item.lesson.subject
+
+
+def best_scores(item):
+    """ Every student's BestScore for the given score model.
+        params: item (score model object)
+        OUTPUT: dict {student pk: BestScore} """
+    return {
+        best.student_id: best for best in BestScore.objects.filter(
+            model=item._meta.model_name, object_id=item.pk)
+    }
+
+
+def build_scores(item, scores):
+    """ Unsaved score table rows for the given score model.
+        params: item (score model object), scores (dict {Student: int})
+        OUTPUT: list of ExamScores / AssignmentScores / LessonTestScores / HomeworkScores """
+    score_model = getattr(item, '{}_set'.format(item.SCORE_TABLE)).model
+    return [
+        score_model(**{score_model.ITEM_FIELD: item}, student=student, score=score)
+        for student, score in scores.items()
+    ]
+
+
+def check_scores(entries, best):
+    """ Runs every entry's checks against the best scores, without touching the database.
+        params: entries (list of unsaved score table rows), best (dict from best_scores())
+        OUTPUT: dict {student pk: list of error messages} (empty if all scores are valid) """
+    best_scores = {
+        (best_score.model, best_score.object_id, student_id): best_score.score
+        for student_id, best_score in best.items()
+    }
+    return {
+        entry.student_id: err.messages
+        for entry, err in ScoreEntry.validate_many(entries, best_scores)
+    }
+
+
+def save_scores(item, entries, best):
+    """ Writes the (already checked) entries and updates the students' BestScores,
+        all in one transaction.
+        params: item (score model object), entries (list), best (dict from best_scores())
+        OUTPUT: list of the saved entries """
+    model_name = item._meta.model_name
+    return write_scores(entries, {
+        (model_name, item.pk, student_id): best_score for student_id, best_score in best.items()
+    })
+
+
+def best_score_rows(entries):
+    """ The BestScores of every (score model, student) pair in entries, read with ONE query.
+        params: entries (list of score table rows, of any of the four kinds)
+        OUTPUT: dict {(model name, object id, student pk): BestScore} """
+    keys = {entry.best_score_key() for entry in entries}
+    if not keys:
+        return {}
+    lookup = Q()
+    for model_name in {model_name for model_name, _, _ in keys}:
+        lookup |= Q(model=model_name,
+                    object_id__in={object_id for name, object_id, _ in keys if name == model_name},
+                    student_id__in={student_id for name, _, student_id in keys if name == model_name})
+    return {
+        (best.model, best.object_id, best.student_id): best
+        for best in BestScore.objects.filter(lookup)
+    }
+
+
+def write_scores(entries, best):
+    """ Writes (already checked) entries of any score models and updates the students'
+        BestScores, all in one transaction.
+        params: entries (list of score table rows, all of the same kind),
+                best (dict from best_score_rows(), updated in place)
+        OUTPUT: list of the saved entries """
+    new_best, changed_best, items = [], {}, {}
+    for entry in entries:
+        key = entry.best_score_key()
+        items[key[:2]] = entry.item
+        percent = BestScore.percent_of(entry.score, entry.item.max_score)
+        current = best.get(key)
+        if current is None:
+            current = BestScore(student_id=entry.student_id, model=key[0], object_id=key[1],
+                                score=entry.score, percent=percent)
+            best[key] = current
+            new_best.append(current)
+        elif entry.score > current.score:
+            current.score, current.percent = entry.score, percent
+            if current.pk:
+                changed_best[current.pk] = current
+
+    with transaction.atomic():
+        if entries:
+            entries = type(entries[0]).objects.bulk_create(entries)
+        BestScore.objects.bulk_create(new_best)
+        BestScore.objects.bulk_update(list(changed_best.values()), ['score', 'percent'])
+        scores_written(*items.values(), students={entry.student_id for entry in entries})
+    return entries
+
+
+def enter_scores(item, scores):
+    """ Checks and saves the scores of many students for one score model.
+        Nothing gets saved unless every score is valid.
+        params: item (score model object), scores (dict {Student: int})
+        OUTPUT: tuple (list of saved entries, dict {student pk: list of error messages}) """
+    best = best_scores(item)
+    entries = build_scores(item, scores)
+    errors = check_scores(entries, best)
+    if errors:
+        return [], errors
+    return save_scores(item, entries, best), errors
@@ -0,0 +1,269 @@
+""" Report comments for every student of a Subject or HomeRoom, generated in one pass.
+    A comment is made of sections (one per kind of score model, plus an overall outro).
+    Each section is a CommentRule: score bins (lowest score of the bin => phrase template)
+    and an optional phrase for students above the class average. The templates are parsed
+    once, when the rule is created, so unknown placeholders fail right away.
+    generate() then works on the whole class at once: np.select() picks every student's bin,
+    and each bin's template is rendered for all of its students by concatenating pandas
+    string columns, instead of running an if/elif chain and string formatting per student.
+    Scores are the students' best scores in percent of max_score (see BestScore), averaged
+    per kind of score model. """
+
+from .scorematrix import build_score_matrix, column_name
+from .scoretree import load_score_model_tree
+
+import string
+
+import numpy as np
+import pandas as pd
+
+# Placeholders a phrase template can use
+TEMPLATE_FIELDS = {
+    'name',         # The student's first name
+    'score',        # The section's score (percent, one decimal)
+    'lost',         # 100 - score
+    'average',      # The class average for the section
+    'they', 'them', 'their', 'They', 'Their',
+}
+
+PRONOUNS = {
+    'F': ('she', 'her', 'her'),
+    'M': ('he', 'him', 'his'),
+    'O': ('they', 'them', 'their'),
+}
+
+# Section => kind of score model its score is averaged over (None: all of them)
+SECTION_MODELS = {
+    'exam': 'exam',
+    'assignment': 'assignment',
+    'lessontest': 'lessontest',
+    'homework': 'homework',
+    'overall': None,
+}
+
+
+def compile_template(template: str):
+    """ Splits a phrase template into literal text and placeholders.
+        params: template (str) e.g. "{name} scored {score}%."
+        OUTPUT: list of (literal text, placeholder name or None) tuples """
+    compiled = []
+    for literal, field, format_spec, conversion in string.Formatter().parse(template):
+        if field is not None and field not in TEMPLATE_FIELDS:
+            raise ValueError("Unknown placeholder {{{}}} in comment template: {}".format(field, template))
+        if field is not None and (format_spec or conversion):
+            raise ValueError("Comment templates don't support format specs: {}".format(template))
+        compiled.append((literal, field))
+    return compiled
+
+
+def render(compiled, context: pd.DataFrame):
+    """ Renders a compiled template for every row of context at once.
+        params: compiled (from compile_template()), context (DataFrame of str columns,
+                one per placeholder)
+        OUTPUT: Series of str """
+    rendered = pd.Series("", index=context.index, dtype=object)
+    for literal, field in compiled:
+        if literal:
+            rendered = rendered + literal
+        if field is not None:
+            rendered = rendered + context[field]
+    return rendered
+
+
+class CommentRule:
+    """ One section of a report comment.
+        params: title (str), section (str) = column of the scores (see SECTION_MODELS),
+                bins (list of (lowest score, template) tuples, highest first; the last
+                bin's lowest score is None and catches every other score),
+                above_average (str) = template added for scores above the class average """
+
+    def __init__(self, title: str, section: str, bins, above_average: str = ""):
+        self.title = title
+        self.section = section
+        self.thresholds = [low for low, _ in bins]
+        if self.thresholds[-1] is not None:
+            raise ValueError("The last bin of {} has to catch every other score (None).".format(title))
+        if any(low is None for low in self.thresholds[:-1]):
+            raise ValueError("Only the last bin of {} can catch every other score.".format(title))
+        self.templates = [compile_template(template) for _, template in bins]
+        self.above_average = compile_template(above_average)
+
+    def bins(self, scores: pd.Series):
+        """ Every student's bin (index into self.templates), -1 for students without a score.
+            params: scores (Series of float)
+            OUTPUT: numpy array of int """
+        values = scores.to_numpy(dtype='float64')
+        scored = ~np.isnan(values)
+        conditions = [scored & (values >= low) for low in self.thresholds[:-1]] + [scored]
+        return np.select(conditions, list(range(len(conditions))), default=-1)
+
+    def generate(self, scores: pd.Series, context: pd.DataFrame):
+        """ This section's text for every student ("" for students without a score).
+            params: scores (Series of float), context (DataFrame of str, see score_context())
+            OUTPUT: Series of str """
+        context = context.assign(**score_context(scores))
+        bins = self.bins(scores)
+        text = pd.Series("", index=scores.index, dtype=object)
+        for index, compiled in enumerate(self.templates):
+            in_bin = bins == index
+            if in_bin.any():
+                text[in_bin] = render(compiled, context[in_bin])
+        if self.above_average:
+            above = (scores > scores.mean()).to_numpy()
+            if above.any():
+                text[above] = text[above] + render(self.above_average, context[above])
+        return text
+
+
+def _number(values: pd.Series):
+    return values.round(1).map('{:g}'.format)
+
+
+def score_context(scores: pd.Series):
+    """ The score placeholders for every student.
+        params: scores (Series of float)
+        OUTPUT: dict {placeholder: Series of str} """
+    return {
+        'score': _number(scores),
+        'lost': _number(100 - scores),
+        'average': pd.Series(_number(pd.Series([scores.mean()])).iloc[0], index=scores.index),
+    }
+
+
+def student_context(names: pd.Series, genders: pd.Series):
+    """ The student placeholders (name and pronouns) for every student.
+        params: names (Series of str), genders (Series of 'F' / 'M' / 'O')
+        OUTPUT: DataFrame of str """
+    pronouns = pd.DataFrame(
+        [PRONOUNS.get(gender, PRONOUNS['O']) for gender in genders],
+        index=names.index, columns=['they', 'them', 'their'])
+    return pronouns.assign(
+        name=names.astype(str).str.strip().str.title(),
+        They=pronouns['they'].str.capitalize(),
+        Their=pronouns['their'].str.capitalize())
+
+
+class CommentEngine:
+    """ Report comments from a list of CommentRules (and an optional outro rule).
+        Create it once and call generate() for as many classes as needed. """
+
+    def __init__(self, rules, outro: CommentRule = None):
+        self.rules = list(rules)
+        self.outro = outro
+
+    def sections(self, frame: pd.DataFrame):
+        """ Every student's text for each section.
+            params: frame (DataFrame with 'Name' and 'Gender' columns and a column of
+                    scores per section, see section_scores())
+            OUTPUT: DataFrame (index of frame, one column per section title; "" where
+                    a student has no score for the section) """
+        context = student_context(frame['Name'], frame['Gender'])
+        texts = pd.DataFrame(index=frame.index)
+        for rule in self.rules + ([self.outro] if self.outro else []):
+            if rule.section in frame:
+                texts[rule.title] = rule.generate(frame[rule.section].astype('float64'), context)
+        return texts
+
+    def generate(self, frame: pd.DataFrame):
+        """ Every student's comment.
+            params: frame (see sections())
+            OUTPUT: Series of str (index of frame) """
+        comments = pd.Series("", index=frame.index, dtype=object)
+        for title, text in self.sections(frame).items():
+            so_far = comments.where(comments == "", comments + "\n\n")
+            comments = comments.where(text == "", so_far + title + ":\n\t" + text)
+        return comments
+
+
+def section_scores(group):
+    """ The students of a Subject or HomeRoom with their average best score (in percent)
+        per kind of score model and overall.
+        params: group (Subject or HomeRoom)
+        OUTPUT: DataFrame ['Student', 'Name', 'Gender', 'exam', 'assignment', 'lessontest',
+                           'homework', 'overall'] (NaN where a student has no scores) """
+    load_score_model_tree(group)
+    students = list(group.students())
+    score_models = group.get_score_models()
+    matrix = build_score_matrix(students, score_models)
+    frame = pd.DataFrame({
+        'Student': students,
+        'Name': [student.first_name for student in students],
+        'Gender': [student.gender for student in students],
+    })
+    for section, model_name in SECTION_MODELS.items():
+        columns = [
+            column_name(item) for item in score_models
+            if model_name is None or item._meta.model_name == model_name
+        ]
+        columns = list(dict.fromkeys(column for column in columns if column in matrix))
+        if columns:
+            frame[section] = matrix[columns].mean(axis=1).to_numpy()
+        else:
+            frame[section] = np.nan
+    return frame
+
+
+DEFAULT_RULES = [
+    CommentRule("Exams", 'exam', [
+        (100, "{name} got a perfect score on the exams! Incredible!"),
+        (90, "{name} scored a whopping {score}% on the exams! That's fantastic! "
+             "To improve even further, I recommend {them} to review the vocabulary and grammar."),
+        (80, "{name} scored {score}% on the exams. That's very good! "
+             "To improve even further, I recommend {them} to review the vocabulary and grammar."),
+        (65, "{name} scored {score}% on the exams and missed {lost}% of the points. "
+             "Reviewing the vocabulary and grammar will help {them} improve."),
+        (None, "{name} lost {lost}% of the points on the exams. With some extra practice and "
+               "guidance, I have no doubt {name}'s scores will soon improve."),
+    ], above_average=" {name}'s score was higher than the class average ({average}%). Great!"),
+    CommentRule("Assignments", 'assignment', [
+        (90, "{name} scored {score}% on the assignments, and that is fabulous."),
+        (80, "{name} scored {score}% on the assignments. That's really good!"),
+        (None, "{name} scored {score}% on the assignments. Handing in complete assignments "
+               "will help {them} a lot."),
+    ], above_average=" That is higher than the class average ({average}%)."),
+    CommentRule("Tests", 'lessontest', [
+        (80, "{name} is often prepared for the tests and earned an average score of {score}%. Very good!"),
+        (60, "{name} is mostly prepared for the tests ({score}%), but I know {name} can do better."),
+        (None, "{name} is not very prepared for the tests ({score}%). Reviewing each lesson "
+               "at home will help {them} a lot."),
+    ], above_average=" {Their} score was higher than the class average ({average}%)."),
+    CommentRule("Homework", 'homework', [
+        (90, "{name} scored {score}% on the homework, and that is fabulous."),
+        (80, "{name} scored {score}% on the homework. That's really good!"),
+        (None, "{name} scored {score}% on the homework. There is room for improvement here."),
+    ], above_average=" {name} scored higher than the average student on the homework."),
+]
+
+DEFAULT_OUTRO = CommentRule("Overall", 'overall', [
+    (90, "I am extremely proud of {name}. I look forward to seeing {them} continue to grow."),
+    (80, "I am very proud of {name}. I look forward to seeing {them} continue to grow."),
+    (None, "Keep trying, {name}! I look forward to seeing {them} continue to grow."),
+])
+
+DEFAULT_ENGINE = CommentEngine(DEFAULT_RULES, DEFAULT_OUTRO)
+
+
+def group_comments(group, engine: CommentEngine = DEFAULT_ENGINE):
+    """ Report comments for every student of a Subject or HomeRoom.
+        params: group (Subject or HomeRoom), engine (CommentEngine) = DEFAULT_ENGINE
+        OUTPUT: dict {Student: comment (str, "" for students without any scores)} """
+    frame = section_scores(group)
+    if frame.empty:
+        return {}
+    return dict(zip(frame['Student'], engine.generate(frame)))
+
+
+def group_comment_sections(group, engine: CommentEngine = DEFAULT_ENGINE):
+    """ Report comments for every student of a Subject or HomeRoom, section by section.
+        params: group (Subject or HomeRoom), engine (CommentEngine) = DEFAULT_ENGINE
+        OUTPUT: dict {Student: list of (section title, text) tuples (only the sections
+                      the student has scores for)} """
+    frame = section_scores(group)
+    if frame.empty:
+        return {}
+    sections = engine.sections(frame)
+    titles = list(sections.columns)
+    return {
+        student: [(title, text) for title, text in zip(titles, texts) if text]
+        for student, texts in zip(frame['Student'], sections.itertuples(index=False))
+    }
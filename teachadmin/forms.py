@@ -229,3 +229,44 @@ class BehaviorEventForm(forms.ModelForm):
     class Meta:
         model = BehaviorEvent
         fields = ['behaviorType', 'timestamp', 'comment']
+
+
+class BulkScoreForm(forms.Form):
+    """ One (optional) score field per student, for entering a whole class's scores at once. """
+
+    def __init__(self, *args, **kwargs):
+        students = kwargs.pop('students', [])
+        best_scores = kwargs.pop('best_scores', {})
+        super().__init__(*args, **kwargs)
+        self.students = {}
+        for student in students:
+            name = 'student_{}'.format(student.pk)
+            best = best_scores.get(student.pk)
+            self.fields[name] = forms.IntegerField(
+                label="{} {}".format(student.first_name, student.last_name),
+                required=False,
+                min_value=0,
+                help_text="Best score: {}".format(best.score) if best else "No score yet")
+            self.students[name] = student
+
+    def scores(self):
+        """ The entered scores.
+            OUTPUT: dict {Student: int} """
+        return {
+            student: self.cleaned_data[name]
+            for name, student in self.students.items()
+            if self.cleaned_data.get(name) is not None
+        }
+
+
+class ScoreImportForm(forms.Form):
+    """ Upload of a score sheet (see scoreimport.py) for a Subject or a Lesson. """
+    file = forms.FileField(help_text="CSV or XLSX: a 'Number' column and one column per score model, "
+                                     "e.g. 'Quiz 1:0-20'.")
+    model = forms.ChoiceField()
+
+    def __init__(self, *args, **kwargs):
+        model_choices = kwargs.pop('model_choices', [])
+        super().__init__(*args, **kwargs)
+        self.fields['model'].choices = model_choices
+        self.fields['model'].label = "Columns are"
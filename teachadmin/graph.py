@@ -1,80 +1,170 @@
+from django.urls import reverse
+from django.utils.functional import cached_property
+
 from .models import *
+from .scorematrix import build_score_matrix
+from .scoretree import load_score_model_tree
+from .graphcache import graph_cache
+from .stats import generalstats
+from .plotting import figure, to_bytes, tilt_xticklabels
+from .swarm import swarmplot
+from .timeline import timeline_image
 import pandas as pd
 import numpy as np
-import seaborn as sns
-from matplotlib import pyplot as plt
 
-import io
 import urllib
 import base64
 
-ASSIGNMENT = Assignment()
-EXAM = Exam()
-LESSONTEST = LessonTest()
-HOMEWORK = Homework()
+SINGLE_SCORE_MODELS = (Assignment, Exam, LessonTest, Homework)
+
+MULTIPLE_SCORE_MODELS = (Lesson, Subject, HomeRoom)
+
+# Model name (as used in graph URLs) => model class
+GRAPH_MODELS = {
+    model._meta.model_name: model
+    for model in SINGLE_SCORE_MODELS + MULTIPLE_SCORE_MODELS + (Student,)
+}
+
+GRAPH_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+# Lookups from every score table to each kind of graph owner
+SCORE_LOOKUPS = {
+    'exam': {ExamScore: 'exam'},
+    'assignment': {AssignmentScore: 'assignment'},
+    'lessontest': {LessonTestScore: 'lessonTest'},
+    'homework': {HomeworkScore: 'homework'},
+    'lesson': {
+        LessonTestScore: 'lessonTest__lesson',
+        HomeworkScore: 'homework__lesson'},
+    'subject': {
+        ExamScore: 'exam__subject',
+        AssignmentScore: 'assignment__subject',
+        LessonTestScore: 'lessonTest__lesson__subject',
+        HomeworkScore: 'homework__lesson__subject'},
+    'homeroom': {
+        ExamScore: 'exam__subject__homeroom',
+        AssignmentScore: 'assignment__subject__homeroom',
+        LessonTestScore: 'lessonTest__lesson__subject__homeroom',
+        HomeworkScore: 'homework__lesson__subject__homeroom'},
+    'student': {
+        ExamScore: 'student',
+        AssignmentScore: 'student',
+        LessonTestScore: 'student',
+        HomeworkScore: 'student'},
+}
+
 
-SINGLE_SCORE_MODELS = (ASSIGNMENT, EXAM, LESSONTEST, HOMEWORK)
+def has_scores(model_instance):
+    """ Cheap check for whether there are any scores to draw a graph of,
+        without building the graph itself.
+        params: model_instance (score model, Lesson, Subject, HomeRoom or Student)
+        OUTPUT: bool """
+    lookups = SCORE_LOOKUPS.get(model_instance._meta.model_name, {})
+    for score_model, lookup in lookups.items():
+        if score_model.objects.filter(**{lookup: model_instance}).exists():
+            return True
+    return False
 
-LESSON = Lesson()
-SUBJECT = Subject()
-HOMEROOM = HomeRoom()
 
-MULTIPLE_SCORE_MODELS = (LESSON, SUBJECT, HOMEROOM)
+def graph_url(model_instance, fmt: str = 'png'):
+    """ Returns the URL of the graph image endpoint for the given object,
+        or False if there are no scores to draw.
+        params: model_instance, fmt (str) = 'png' or 'svg'
+        OUTPUT: str / False """
+    if not has_scores(model_instance):
+        return False
+    return reverse("teachadmin:graph", kwargs={
+        "model": model_instance._meta.model_name,
+        "pk": model_instance.pk,
+        "fmt": fmt
+        })
+
+def graph_image(model_instance, fmt: str = 'png', version: int = None):
+    """ The (cached) graph of a score model, Lesson, Subject or HomeRoom,
+        or the score timeline of a Student (see timeline.py).
+        params: model_instance, fmt (str) = 'png' or 'svg',
+                version (int) = the object's ScoreDataVersion if already known
+        OUTPUT: bytes / False (rendering failed) / None (no scores) """
+    if isinstance(model_instance, Student):
+        return timeline_image(model_instance, fmt, version)
+    return Graph(model_instance, 'df').get_image(fmt, version)
+
+def render_graph(model_name: str, pk: int, fmt: str = 'png'):
+    """ Renders (and caches) the graph of a single object for the current
+        version of its score data. Used by the background graph renderer.
+        params: model_name (str), pk (int), fmt (str) = 'png'
+        OUTPUT: bool - whether there is a graph for the object """
+    model_instance = GRAPH_MODELS[model_name].objects.filter(pk=pk).first()
+    if model_instance is None:
+        return False
+    return bool(graph_image(model_instance, fmt))
+
 
 class Graph():
     """ This class is meant to simplify the code for generating graphs
         for all the different views in the TeachAdmin application.
+        Nothing is computed up front: the DataFrame (df), the rendered image
+        (get_image() / uri) and the stats (get_generalstats_dict()) are each
+        built the first time they're asked for and then kept on the instance.
         params: 
         model object (in view): self.object
-        get_objects: 'all' => gets the uri on top of the DataFrame.
-                    Any other string WILL skip generating graph-part (uri)"""
+        get_objects: kept for backwards compatibility, no longer has any effect"""
 
     model_instance = None
     model = None
-    uri = False
-    df = pd.DataFrame()
 
     def __init__(self, model_instance, get_objects: str = 'all'):
+        self._images = {}
+        self._stats = None
         try:
-            for score_model in SINGLE_SCORE_MODELS:
-                if type(model_instance) == type(score_model):
-                    self.model = score_model
-            for multiscore_model in MULTIPLE_SCORE_MODELS:
-                if type(model_instance) == type(multiscore_model):
-                    self.model = multiscore_model
+            if isinstance(model_instance, ScoredItem) or type(model_instance) in MULTIPLE_SCORE_MODELS:
+                self.model = type(model_instance)
 
             self.model_instance = model_instance
-            self.df = self._get_dataframe()
-            if get_objects == 'all':
-                self.uri = self._get_uri()
 
         except TypeError as te:
             print("Cannot establish Graph object.")
             print(te)
 
+    @cached_property
+    def df(self):
+        try:
+            df = self._get_dataframe()
+        except TypeError as te:
+            print("Cannot create DataFrame for {}.".format(self.model_instance))
+            print(te)
+            df = None
+        if df is None:
+            df = pd.DataFrame()
+        return df
+
+    @cached_property
+    def uri(self):
+        return self._get_uri()
+
     def __str__(self):
-        return "{}: {}".format(self.model, self.model_instance)
+        return "{}: {}".format(self.model.__name__ if self.model else None, self.model_instance)
 
     def _create_score_df(self):
         students = self.model_instance.students()
-        all_scores = self.model_instance.scores()
-        if len(students) != 0 and all_scores != None:
+        if students:
+            # Every student's best score, as kept up to date in BestScore
+            best_scores = dict(BestScore.objects.filter(
+                model=self.model_instance._meta.model_name,
+                object_id=self.model_instance.pk
+            ).values_list('student', 'score'))
             scores_dict = {
                 'Student': [],
                 'Gender': [],
                 '{}'.format(self.model_instance): []
             }    
             for student in students:
-                score_list = []
-                for score in all_scores.filter(student=student):
-                    score_list.append(score.score)
-                if len(score_list) >= 1:
-                    max_score = max(score_list)
-                else:
-                    max_score = None
                 scores_dict['Student'].append(student)
                 scores_dict['Gender'].append(student.gender)
-                scores_dict['{}'.format(self.model_instance)].append(max_score)
+                scores_dict['{}'.format(self.model_instance)].append(best_scores.get(student.pk))
             
             try:
                 df = pd.DataFrame(data=scores_dict)
@@ -91,56 +181,22 @@ class Graph():
     def _create_multiple_score_df(self):
         students = self.model_instance.students()
 
-        if self.model == HOMEROOM:
-            subjects = self.model_instance.subjects()
-            if subjects:
-                tuple_list = []
-                score_model_list = []
-                for subject in subjects:
-                    score_model_list.extend(subject.get_score_models())
-                    tuple_list.extend(subject.get_score_models(as_tuples=True))
-
-                names = ['Subject', 'Score model']
-                df_columns = pd.MultiIndex.from_tuples([
-                    ("{}".format(subject.name), "{}".format(model.name)) for (subject, model) in tuple_list
-                    ])
-                index = pd.Index(self.model_instance.students(as_list=True))
+        # The whole tree below the object in a fixed number of queries
+        load_score_model_tree(self.model_instance)
+        score_model_list = []
+        if self.model is HomeRoom:
+            for subject in self.model_instance.subjects():
+                score_model_list.extend(subject.get_score_models())
         else:
-            score_models_list = self.model_instance.get_score_models()
-            df_columns = ["{}".format(model.name) for model in score_models_list]
-        
-        df = pd.DataFrame()
-        if (len(score_model_list) > 0) and students.exists():
-            scores_dict = {
-                'Student': [],
-                'Gender': []
-            }
-            for score_model in score_model_list:
-                all_scores = score_model.scores()
-                if '{}'.format(score_model) not in scores_dict.keys():
-                    scores_dict['{}({})'.format(score_model, score_model.pk)] = []
-                
-                for student in students:
-                    if student not in scores_dict['Student']:
-                        scores_dict['Student'].append(student)
-                        scores_dict['Gender'].append(student.gender)
-                    if type(score_model) in (type(LESSONTEST), type(HOMEWORK), type(EXAM), type(ASSIGNMENT)):
-                        if all_scores.filter(student=student).exists():
-                            scores_list = []
-                            for score in all_scores.filter(student=student):
-                                scores_list.append(round((score.score/score_model.max_score)*100,1))
-                            scores_dict['{}({})'.format(score_model, score_model.pk)].append(max(scores_list))
-                        else:
-                            scores_dict['{}({})'.format(score_model, score_model.pk)].append(None)
-            try:
-                df = pd.DataFrame(data=scores_dict)
-            except Exception as err:
-                print("Couldn't create DataFrame for {}!".format(self.model_instance))
-                print(err)
-                df = pd.DataFrame()
-            else:
-                df['Gender'] = df['Gender'].apply(self._gender_map)
-        
+            score_model_list = self.model_instance.get_score_models()
+
+        try:
+            df = build_score_matrix(students, score_model_list)
+        except Exception as err:
+            print("Couldn't create DataFrame for {}!".format(self.model_instance))
+            print(err)
+            df = pd.DataFrame()
+
         return df
 
     def _gender_map(self, gender):
@@ -159,77 +215,75 @@ class Graph():
             df = self._create_multiple_score_df()
         return df
     
-    def _create_uri(self):
+    def _render(self, fmt: str = 'png'):
+        if self.model not in SINGLE_SCORE_MODELS and self.df.select_dtypes(include=['float64']).empty:
+            return False
+
         # Initiating graph
-        fig = plt.figure()
-        sns.set_style(style='darkgrid')
-        plt.style.use("dark_background")
-        axes = fig.gca()
-
-        # Note: Since the seaborn 'swarmplot' wouldn't let me omit either 'x' or 'y' to get the 'hue' shown properly
-        # I had to provide 'dummy-data' for the 'x' to make the 'hue' work
-        # Link to issue: https://github.com/mwaskom/seaborn/issues/941
-        if self.model in SINGLE_SCORE_MODELS:
-            sns.swarmplot(
-                data=self.df,
-                x=[""]*len(self.df),
-                y='{}'.format(self.model_instance),
-                hue='Gender',
-                palette='bright',
-                size=8,
-                edgecolor='white',
-                linewidth=1
+        with figure() as (fig, axes):
+            # The y-limits decide how close points may get, so they go first
+            axes.set_ylim(
+                (self.df.min(axis=0, numeric_only=True).min())-2,
+                (self.df.max(axis=0, numeric_only=True).max())+2
             )
-            axes.legend(title='Gender', loc='center left',
-                        bbox_to_anchor=(1.02, 0.90))
-        else:
-            if self.df.select_dtypes(include=['float64']).empty:
+            if self.model in SINGLE_SCORE_MODELS:
+                score_column = '{}'.format(self.model_instance)
+                swarmplot(
+                    axes,
+                    self.df[[score_column]].rename(columns={score_column: ""}),
+                    hue=self.df['Gender']
+                )
+                axes.legend(title='Gender', loc='center left',
+                            bbox_to_anchor=(1.02, 0.90))
+            else:
+                swarmplot(axes, self.df.select_dtypes(include=['float64']))
+            tilt_xticklabels(axes)
+            axes.set_title("{} scores".format(self.model_instance))
+            fig.tight_layout()
+
+            try:
+                return to_bytes(fig, fmt)
+            except Exception as err:
+                print("Error while saving graph for {}".format(self.model_instance))
+                print(err)
                 return False
-            sns.swarmplot(
-                data=self.df.select_dtypes(include=['float64']),
-                palette='bright',
-                size=8,
-                edgecolor='white',
-                linewidth=1
-            )
-        axes.set_ylim(
-            (self.df.min(axis=0, numeric_only=True).min())-2,
-            (self.df.max(axis=0, numeric_only=True).max())+2
-        )
-        plt.setp(axes.get_xticklabels(), rotation=45, ha="right",
-                    rotation_mode="anchor")
-        axes.set_title("{} scores".format(self.model_instance))
-        plt.tight_layout()
-
-        # Getting the complete filepath to which we save the graph
-        buf = io.BytesIO()
-        try:
-            plt.savefig(buf, format='png')
-        except Exception as err:
-            print("Error while saving graph for {}".format(self.model_instance))
-            print(err)
-            return False
-        else:
-            buf.seek(0)
-            pltstring = base64.b64encode(buf.read())
-            uri = urllib.parse.quote(pltstring)
-            return uri
+
+    def get_image(self, fmt: str = 'png', version: int = None):
+        """ Returns the graph as PNG or SVG bytes, rendering it only if the current
+            version of the score data hasn't been rendered (and cached) before.
+            params: fmt (str) = 'png' or 'svg',
+                    version (int) = the object's ScoreDataVersion if already known
+            OUTPUT: bytes / False (rendering failed) / None (no scores) """
+        if fmt in self._images:
+            return self._images[fmt]
+        model_name = self.model_instance._meta.model_name
+        if version is None:
+            version = ScoreDataVersion.get_for(self.model_instance).version
+        image = graph_cache.get(model_name, self.model_instance.pk, version, fmt)
+        if image is None:
+            if self.df.empty:
+                return None
+            image = self._render(fmt)
+            if image:
+                graph_cache.set(model_name, self.model_instance.pk, version, image, fmt)
+        self._images[fmt] = image
+        return image
 
     def _get_uri(self):
-        if not self.df.empty:
-            uri = self._create_uri()
-            return uri
-        return None
+        png = self.get_image('png')
+        if png:
+            pltstring = base64.b64encode(png)
+            return urllib.parse.quote(pltstring)
+        return png
 
     def get_generalstats_dict(self):
-        if self.model in MULTIPLE_SCORE_MODELS:
-            stat_dict = {
-                "Avg. score": round(self.df.mean(axis=0).mean(), 1),
-                "Median score": self.df.median(axis=0).median(),
-                "Std. Dev.": round(self.df.std(axis=0).mean(), 2)
-            }
-            return stat_dict
-        else:
+        if self.model not in MULTIPLE_SCORE_MODELS:
             return False
+        if self._stats is None:
+            # Aggregated by the database, see stats.py
+            self._stats = generalstats(
+                self.model_instance._meta.model_name, [self.model_instance]
+            )[self.model_instance]
+        return self._stats
 
     
@@ -0,0 +1,108 @@
+""" Persistent, size-capped cache for rendered graphs.
+    Graphs are stored as files named <model>-<pk>-<version>.<format> so that a graph
+    is only ever re-rendered when its ScoreDataVersion changes.
+    Settings:
+        TEACHADMIN_GRAPH_CACHE_DIR (str): directory holding the files
+            (default: <tempdir>/teachadmin-graphs)
+        TEACHADMIN_GRAPH_CACHE_MAX_BYTES (int): size cap; least recently used graphs
+            are evicted first once it is exceeded (default: 64 MB) """
+
+from django.conf import settings
+
+import glob
+import os
+import tempfile
+import threading
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class GraphCache():
+    """ Stores rendered graph bytes on disk, keyed by (model name, pk, data version, format).
+        Reading a graph marks it as recently used, writing one evicts older versions of
+        the same graph as well as the least recently used graphs above the size cap. """
+
+    def __init__(self, directory: str = None, max_bytes: int = None):
+        self.directory = directory or getattr(
+            settings, 'TEACHADMIN_GRAPH_CACHE_DIR',
+            os.path.join(tempfile.gettempdir(), 'teachadmin-graphs'))
+        self.max_bytes = max_bytes or getattr(
+            settings, 'TEACHADMIN_GRAPH_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+        self._lock = threading.Lock()
+
+    def _path(self, model_name, pk, version, fmt):
+        return os.path.join(
+            self.directory, "{}-{}-{}.{}".format(model_name, pk, version, fmt))
+
+    def get(self, model_name: str, pk: int, version: int, fmt: str = 'png'):
+        """ Returns the cached bytes or None if the graph hasn't been rendered
+            for this data version yet. """
+        path = self._path(model_name, pk, version, fmt)
+        try:
+            with open(path, 'rb') as graph_file:
+                data = graph_file.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def set(self, model_name: str, pk: int, version: int, data: bytes, fmt: str = 'png'):
+        """ Stores rendered bytes and evicts stale and least recently used graphs. """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(model_name, pk, version, fmt)
+        # Writing to a temporary file first makes sure that readers never see half a graph
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, path)
+        except OSError as err:
+            print("Unable to cache graph for {}({})".format(model_name, pk))
+            print(err)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            for old_path in glob.glob(self._path(model_name, pk, '*', fmt)):
+                if old_path != path:
+                    self._remove(old_path)
+            self._evict()
+
+    def clear(self):
+        for path in glob.glob(os.path.join(self.directory, '*-*-*.*')):
+            self._remove(path)
+
+    def size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _entries(self):
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, '*-*-*.*')):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        # Oldest access time first
+        for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+graph_cache = GraphCache()
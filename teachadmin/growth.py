@@ -0,0 +1,150 @@
+""" Improvement of every student of a HomeRoom or Subject across a series of assessments.
+    The assessments (Exams and LessonTests, see SERIES_MODELS) are put in order of their
+    date and grouped into categories: the Subjects of a HomeRoom, or the kinds of assessment
+    of a Subject. All of a class's best scores (in percent) are read into one long DataFrame,
+    and every student's improvement per category is computed for the whole class at once:
+        Improvement - the sum of the differences between consecutive assessments
+                      (groupby().diff(), which adds up to last - first)
+        Slope       - the least squares slope, in percent per assessment
+    Pivoted into a students x categories table, np.nanargmax() / np.nanargmin() give every
+    student's most and least improved category in one go, for any number of assessments. """
+
+from .models import Subject, Exam, LessonTest
+from .scorematrix import fetch_scores
+from .scoretree import load_score_model_tree
+
+import numpy as np
+import pandas as pd
+
+# Score model => name of its date field
+SERIES_MODELS = {
+    Exam: 'date',
+    LessonTest: 'test_date',
+}
+
+# Subject categories by kind of assessment
+KIND_CATEGORIES = {
+    'exam': "Exams",
+    'lessontest': "Lesson tests",
+}
+
+GROWTH_COLUMNS = ['Assessments', 'First', 'Last', 'Improvement', 'Slope']
+
+EXTREME_COLUMNS = ['Max Category', 'Max Improvement', 'Min Category', 'Min Improvement']
+
+
+def series_items(group):
+    """ The assessments of a HomeRoom (categories: its Subjects) or a Subject (categories:
+        exams and lesson tests), in order of their date.
+        params: group (HomeRoom or Subject)
+        OUTPUT: DataFrame ['Model', 'Item', 'Category', 'Date', 'Name'] """
+    load_score_model_tree(group)
+    records = []
+    for subject, item in group.get_score_models(as_tuples=True):
+        date_field = SERIES_MODELS.get(type(item))
+        if date_field is None:
+            continue
+        model_name = item._meta.model_name
+        category = KIND_CATEGORIES[model_name] if isinstance(group, Subject) else str(subject)
+        records.append((model_name, item.pk, category, getattr(item, date_field), str(item)))
+    items = pd.DataFrame.from_records(records, columns=['Model', 'Item', 'Category', 'Date', 'Name'])
+    return items.drop_duplicates(['Model', 'Item']).sort_values(
+        ['Category', 'Date', 'Model', 'Item'], kind='mergesort').reset_index(drop=True)
+
+
+def assessment_scores(group):
+    """ Every student's best score (in percent) per assessment of a HomeRoom or Subject,
+        with the assessment's category and its number within the category.
+        params: group (HomeRoom or Subject)
+        OUTPUT: DataFrame ['Student', 'Category', 'Number', 'Date', 'Percent'],
+                sorted by student, category and number """
+    columns = ['Student', 'Category', 'Number', 'Date', 'Percent']
+    items = series_items(group)
+    students = list(group.students())
+    if items.empty or not students:
+        return pd.DataFrame(columns=columns)
+    items['Number'] = items.groupby('Category').cumcount()
+
+    item_objects = [
+        model(pk=pk) for model, pk in zip(
+            items['Model'].map({m._meta.model_name: m for m in SERIES_MODELS}), items['Item'])
+    ]
+    scores = fetch_scores(students, item_objects)
+    scores = scores.dropna(subset=['Percent']).merge(items, on=['Model', 'Item'])
+    scores['Percent'] = scores['Percent'].astype('float64')
+    return scores[columns].sort_values(['Student', 'Category', 'Number']).reset_index(drop=True)
+
+
+def growth(scores: pd.DataFrame):
+    """ Every student's improvement per category.
+        params: scores (DataFrame from assessment_scores())
+        OUTPUT: DataFrame indexed by (Student, Category) with the columns
+                ['Assessments', 'First', 'Last', 'Improvement', 'Slope']
+                (Improvement and Slope are NaN with fewer than two assessments) """
+    if scores.empty:
+        return pd.DataFrame(columns=GROWTH_COLUMNS,
+                            index=pd.MultiIndex.from_tuples([], names=['Student', 'Category']))
+    scores = scores.sort_values(['Student', 'Category', 'Number'])
+    keys = [scores['Student'], scores['Category']]
+    grouped = scores.groupby(keys)['Percent']
+
+    # Least squares slope of Percent over Number: sum(dx * dy) / sum(dx ** 2)
+    dx = scores['Number'] - scores.groupby(keys)['Number'].transform('mean')
+    dy = scores['Percent'] - grouped.transform('mean')
+    sums = pd.DataFrame({'xy': dx * dy, 'xx': dx * dx}).groupby(keys).sum()
+
+    result = pd.DataFrame({
+        'Assessments': grouped.count(),
+        'First': grouped.first(),
+        'Last': grouped.last(),
+        'Improvement': scores['Percent'].diff().where(
+            scores.duplicated(['Student', 'Category'])).groupby(keys).sum(min_count=1),
+        'Slope': sums['xy'] / sums['xx'].where(sums['xx'] > 0),
+    })
+    result.index.names = ['Student', 'Category']
+    return result
+
+
+def improvement_extremes(growth_df: pd.DataFrame, measure: str = 'Improvement'):
+    """ Every student's most and least improved category.
+        params: growth_df (DataFrame from growth()), measure (str) = 'Improvement' / 'Slope'
+        OUTPUT: DataFrame indexed by student pk with the columns
+                ['Max Category', 'Max Improvement', 'Min Category', 'Min Improvement']
+                (students without any category with two assessments are left out) """
+    table = growth_df[measure].unstack('Category').astype('float64').dropna(how='all')
+    if table.empty:
+        return pd.DataFrame(columns=EXTREME_COLUMNS)
+    values = table.to_numpy()
+    # NaN-aware arg max/min over the categories of every student at once
+    max_index = np.nanargmax(values, axis=1)
+    min_index = np.nanargmin(values, axis=1)
+    rows = np.arange(len(table))
+    return pd.DataFrame({
+        'Max Category': table.columns[max_index],
+        'Max Improvement': values[rows, max_index].round(1),
+        'Min Category': table.columns[min_index],
+        'Min Improvement': values[rows, min_index].round(1),
+    }, index=table.index)
+
+
+def group_growth(group, measure: str = 'Improvement'):
+    """ The most and least improved category of every student of a HomeRoom or Subject.
+        params: group (HomeRoom or Subject), measure (str) = 'Improvement' / 'Slope'
+        OUTPUT: list of {'student': Student, 'max_category': ..., 'max_improvement': ...,
+                         'min_category': ..., 'min_improvement': ...}
+                (in the order of group.students(), only students with a measurable growth) """
+    extremes = improvement_extremes(growth(assessment_scores(group)), measure)
+    extremes = extremes.to_dict('index')
+    rows = []
+    for student in group.students():
+        row = extremes.get(student.pk)
+        if row is None:
+            continue
+        rows.append({
+            'student': student,
+            'max_category': row['Max Category'],
+            'max_improvement': row['Max Improvement'],
+            'min_category': row['Min Category'],
+            'min_improvement': row['Min Improvement'],
+        })
+    return rows
@@ -0,0 +1,167 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction, DatabaseError
+from django.db.models import Max
+
+from teachadmin.models import (School, HomeRoom, Subject, Student, Exam, ExamScore,
+                                AssignmentScore, LessonTestScore, HomeworkScore)
+
+import numpy as np
+import time
+
+
+class Command(BaseCommand):
+    help = ("Seeds a large number of exam scores inside a transaction that gets rolled back, "
+            "then prints query plans and timings of the score tables' hot queries "
+            "with and without the composite score indexes, and with and without "
+            "the display ordering. Fails if the score tables' default querysets are ordered.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scores', type=int, default=1000000,
+            help="Number of ExamScores to seed (default: 1000000)")
+        parser.add_argument('--exams', type=int, default=50,
+            help="Number of exams the scores are spread over (default: 50)")
+        parser.add_argument('--attempts', type=int, default=2,
+            help="Scores per student and exam (default: 2)")
+        parser.add_argument('--repeat', type=int, default=5,
+            help="Runs per query, the fastest one counts (default: 5)")
+        parser.add_argument('--no-plans', action='store_false', dest='plans',
+            help="Only print the timings")
+
+    def handle(self, *args, **options):
+        self._check_ordering()
+
+        with transaction.atomic():
+            exams, student = self._seed(options)
+            queries = self._queries(exams, student)
+
+            self.stdout.write(self.style.MIGRATE_HEADING("With indexes"))
+            with_indexes = self._run(queries, options, "with indexes")
+
+            self.stdout.write(self.style.MIGRATE_HEADING("Display ordering"))
+            ordered_queries = {
+                label: qs.for_display() for label, qs in queries.items()
+                if not qs.query.order_by and not qs.query.is_sliced
+            }
+            ordered = self._run(ordered_queries, options, "display ordering")
+            self.stdout.write(self.style.MIGRATE_HEADING("Ordering timings (ms)"))
+            self.stdout.write("{:<40}{:>12}{:>12}{:>10}".format(
+                "Query", "unordered", "ordered", "speedup"))
+            for label in ordered_queries:
+                fast, slow = with_indexes[label], ordered[label]
+                self.stdout.write("{:<40}{:>12.2f}{:>12.2f}{:>9.1f}x".format(
+                    label, fast * 1000, slow * 1000, slow / fast if fast else 0))
+
+            try:
+                self._drop_indexes()
+            except DatabaseError as err:
+                self.stderr.write("Unable to drop the indexes inside a transaction on {}: {}".format(
+                    connection.vendor, err))
+                transaction.set_rollback(True)
+                return
+            self.stdout.write(self.style.MIGRATE_HEADING("Without indexes"))
+            without_indexes = self._run(queries, options, "without indexes")
+
+            self.stdout.write(self.style.MIGRATE_HEADING("Index timings (ms)"))
+            self.stdout.write("{:<40}{:>12}{:>12}{:>10}".format(
+                "Query", "indexed", "unindexed", "speedup"))
+            for label in queries:
+                fast, slow = with_indexes[label], without_indexes[label]
+                self.stdout.write("{:<40}{:>12.2f}{:>12.2f}{:>9.1f}x".format(
+                    label, fast * 1000, slow * 1000, slow / fast if fast else 0))
+
+            # Nothing seeded (or dropped) in here is meant to last
+            transaction.set_rollback(True)
+
+    def _check_ordering(self):
+        """ Regression check: querying a score table must not sort anything unless
+            the caller asks for the display order. """
+        for score_model in (ExamScore, AssignmentScore, LessonTestScore, HomeworkScore):
+            if 'ORDER BY' in str(score_model.objects.all().query):
+                raise CommandError("{}.objects.all() is ordered.".format(score_model.__name__))
+            if 'ORDER BY' not in str(score_model.objects.for_display().query):
+                raise CommandError("{}.objects.for_display() isn't ordered.".format(score_model.__name__))
+        self.stdout.write("Score tables are unordered by default.")
+
+    def _seed(self, options):
+        n_exams = options['exams']
+        attempts = options['attempts']
+        n_students = max(options['scores'] // (n_exams * attempts), 1)
+        self.stdout.write("Seeding {} students, {} exams and {} scores...".format(
+            n_students, n_exams, n_students * n_exams * attempts))
+        started = time.perf_counter()
+
+        school = School.objects.create(name="Benchmark school")
+        homeroom = HomeRoom.objects.create(name="Benchmark", school=school)
+        subject = Subject.objects.create(name="Benchmark", school=school)
+        Student.objects.bulk_create([
+            Student(first_name="Student", last_name=str(number), homeroom=homeroom)
+            for number in range(n_students)
+        ])
+        student_pks = list(Student.objects.filter(homeroom=homeroom).values_list('pk', flat=True))
+        Exam.objects.bulk_create([
+            Exam(name="Exam {}".format(number), subject=subject) for number in range(n_exams)
+        ])
+        exams = list(Exam.objects.filter(subject=subject).order_by('pk'))
+
+        rng = np.random.default_rng(0)
+        for exam in exams:
+            scores = rng.integers(0, 101, size=len(student_pks) * attempts)
+            ExamScore.objects.bulk_create([
+                ExamScore(exam_id=exam.pk, student_id=student_pk, score=int(score))
+                for student_pk, score in zip(np.repeat(student_pks, attempts), scores)
+            ])
+
+        if connection.vendor in ('postgresql', 'sqlite'):
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE {}".format(ExamScore._meta.db_table))
+        self.stdout.write("Seeded in {:.1f}s".format(time.perf_counter() - started))
+        return exams, Student.objects.get(pk=student_pks[len(student_pks) // 2])
+
+    def _queries(self, exams, student):
+        """ The score tables' access paths: by (score model, student) and by student. """
+        exam = exams[len(exams) // 2]
+        scores = ExamScore.objects.all()
+        return {
+            "Best score per student (1 exam)":
+                scores.filter(exam=exam).values('student').annotate(best=Max('score')),
+            "Best score per student (5 exams)":
+                scores.filter(exam__in=exams[:5]).values('exam', 'student').annotate(best=Max('score')),
+            "Best score of one student":
+                scores.filter(exam=exam, student=student).order_by('-score').values_list('score')[:1],
+            "Has score (exists)":
+                scores.filter(exam=exam, student=student).values('pk')[:1],
+            "All scores of one student":
+                scores.filter(student=student).values_list('exam', 'score'),
+            "All scores of one exam":
+                scores.filter(exam=exam).values_list('student', 'score'),
+        }
+
+    def _run(self, queries, options, phase):
+        timings = {}
+        for label, qs in queries.items():
+            if options['plans']:
+                self.stdout.write(self.style.SQL_KEYWORD(label))
+                self.stdout.write(self._explain(qs, phase))
+            runs = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                list(qs.all())
+                runs.append(time.perf_counter() - started)
+            timings[label] = min(runs)
+        return timings
+
+    def _explain(self, qs, phase):
+        """ Like QuerySet.explain(), but tagged with the phase: SQLite caches prepared
+            statements by their SQL, and a cached EXPLAIN keeps showing the plan it
+            was prepared with even after the indexes have been dropped. """
+        sql, params = qs.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("{} /* {} */ {}".format(
+                connection.ops.explain_query_prefix(), phase, sql), params)
+            return "\n".join(
+                " ".join(str(column) for column in row) for row in cursor.fetchall())
+
+    def _drop_indexes(self):
+        schema_editor = connection.schema_editor()
+        for index in ExamScore._meta.indexes:
+            schema_editor.execute(index.remove_sql(ExamScore, schema_editor))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.text import slugify
+
+from teachadmin.models import School
+from teachadmin.reports import REPORT_FORMATS, stream_reports
+
+import time
+
+
+class Command(BaseCommand):
+    help = ("Writes the report comments of every student of a School into one ZIP archive, "
+            "one file per student (see teachadmin/reports.py).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('school', type=int, help="pk of the School")
+        parser.add_argument('--format', choices=list(REPORT_FORMATS), default='txt',
+            help="File format of the reports (default: txt)")
+        parser.add_argument('--processes', type=int, default=2,
+            help="Number of rendering processes, 0 renders in this process (default: 2)")
+        parser.add_argument('--output',
+            help="Path of the ZIP archive (default: <school>-reports.zip)")
+
+    def handle(self, *args, **options):
+        school = School.objects.filter(pk=options['school']).first()
+        if school is None:
+            raise CommandError("There is no school with pk {}.".format(options['school']))
+        output = options['output'] or "{}-reports.zip".format(slugify(str(school)) or 'school')
+
+        started = time.perf_counter()
+        size = 0
+        with open(output, 'wb') as archive:
+            for chunk in stream_reports(school, options['format'], options['processes']):
+                archive.write(chunk)
+                size += len(chunk)
+        self.stdout.write(self.style.SUCCESS("Wrote {} ({} kB) in {:.1f}s.".format(
+            output, size // 1024, time.perf_counter() - started)))
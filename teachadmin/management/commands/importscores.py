@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from teachadmin.models import Subject, Lesson, Teacher
+from teachadmin.scoreimport import IMPORT_MODELS, DEFAULT_CHUNKSIZE, import_scores
+
+import time
+
+
+class Command(BaseCommand):
+    help = ("Imports a score sheet (CSV or XLSX, one row per student, one column per score model) "
+            "into a Subject's exams/assignments or a Lesson's tests/homeworks, chunk by chunk. "
+            "See teachadmin/scoreimport.py for the sheet's layout.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help="Path of the .csv or .xlsx file")
+        parser.add_argument('--model', choices=list(IMPORT_MODELS), default='exam',
+            help="Kind of score model the columns are (default: exam)")
+        parser.add_argument('--subject', type=int,
+            help="pk of the Subject (for exams and assignments)")
+        parser.add_argument('--lesson', type=int,
+            help="pk of the Lesson (for lessontests and homeworks)")
+        parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+            help="Rows read at a time (default: {})".format(DEFAULT_CHUNKSIZE))
+        parser.add_argument('--teacher',
+            help="Username of the teacher who creates the new assignments")
+
+    def handle(self, *args, **options):
+        owner_field = IMPORT_MODELS[options['model']][1]
+        owner_model = Subject if owner_field == 'subject' else Lesson
+        owner_pk = options[owner_field]
+        if owner_pk is None:
+            raise CommandError("Importing {}s needs --{}.".format(options['model'], owner_field))
+        owner = owner_model.objects.filter(pk=owner_pk).first()
+        if owner is None:
+            raise CommandError("There is no {} with pk {}.".format(owner_field, owner_pk))
+
+        teacher = None
+        if options['teacher']:
+            teacher = Teacher.objects.filter(user__username=options['teacher']).first()
+            if teacher is None:
+                raise CommandError("There is no teacher with the username {}.".format(options['teacher']))
+
+        started = time.perf_counter()
+
+        def progress(report):
+            self.stdout.write("{:>8} rows read, {:>8} scores created, {:>6} already there, "
+                              "{:>6} problems ({:.1f}s)".format(
+                report['rows'], report['created'], report['skipped'],
+                report['error_count'], time.perf_counter() - started))
+
+        try:
+            report = import_scores(options['file'], options['model'], owner,
+                                   chunksize=options['chunksize'], progress=progress, teacher=teacher)
+        except (OSError, ImportError, ValueError) as err:
+            raise CommandError("Unable to read {}: {}".format(options['file'], err))
+
+        for line, column, message in report['errors']:
+            self.stderr.write("Line {} ({}): {}".format(line, column, message))
+        if report['error_count'] > len(report['errors']):
+            self.stderr.write("... and {} more problem(s).".format(
+                report['error_count'] - len(report['errors'])))
+        self.stdout.write(self.style.SUCCESS("Imported {} scores from {} rows into {} in {:.1f}s.".format(
+            report['created'], report['rows'], owner, time.perf_counter() - started)))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from teachadmin.models import BestScore
+
+
+class Command(BaseCommand):
+    help = ("Recalculates the BestScore table from the score tables, e.g. after scores "
+            "were imported with bulk_create() or changed with QuerySet.update().")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', action='append', dest='models',
+            choices=list(BestScore.score_tables().keys()),
+            help="Only rebuild the best scores of this score model (can be repeated)")
+
+    def handle(self, *args, **options):
+        written = BestScore.rebuild(options['models'])
+        self.stdout.write("Wrote {} best scores.".format(written))
@@ -0,0 +1,97 @@
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.utils import timezone
+
+from teachadmin.models import GraphRenderJob
+
+from concurrent.futures import ProcessPoolExecutor
+import datetime
+import time
+import traceback
+
+
+def _render(job_pk, model_name, object_id):
+    """ Runs inside the worker processes. """
+    from teachadmin.graph import render_graph
+    try:
+        render_graph(model_name, object_id)
+    except Exception:
+        return job_pk, traceback.format_exc()
+    finally:
+        connections.close_all()
+    return job_pk, ""
+
+
+class Command(BaseCommand):
+    help = ("Background graph renderer. Renders the graphs queued in GraphRenderJob "
+            "(render-on-write, see settings.TEACHADMIN_GRAPH_WORKER) into the graph cache.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2,
+            help="Number of rendering processes (default: 2)")
+        parser.add_argument('--batch', type=int, default=20,
+            help="Number of jobs claimed at a time (default: 20)")
+        parser.add_argument('--poll', type=float, default=1.0,
+            help="Seconds to wait between polls of an empty queue (default: 1)")
+        parser.add_argument('--once', action='store_true',
+            help="Exit as soon as the queue is empty")
+        parser.add_argument('--status', action='store_true',
+            help="Print queue depth and render latency, then exit")
+
+    def handle(self, *args, **options):
+        if options['status']:
+            for stat, value in GraphRenderJob.stats().items():
+                self.stdout.write("{}: {}".format(stat, value))
+            return
+
+        self._requeue_stale()
+        # Worker processes must not inherit the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['processes']) as pool:
+            while True:
+                jobs = self._claim(options['batch'])
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+
+                connections.close_all()
+                futures = [
+                    pool.submit(_render, job.pk, job.model, job.object_id) for job in jobs
+                ]
+                for future in futures:
+                    job_pk, error = future.result()
+                    GraphRenderJob.objects.filter(pk=job_pk).update(
+                        status=GraphRenderJob.FAILED if error else GraphRenderJob.DONE,
+                        finished=timezone.now(),
+                        error=error)
+                    if error:
+                        self.stderr.write("Rendering job {} failed:\n{}".format(job_pk, error))
+                self._cleanup()
+
+    def _claim(self, batch):
+        """ Marks up to <batch> pending jobs as running and returns them. """
+        with transaction.atomic():
+            jobs = list(GraphRenderJob.objects.select_for_update(skip_locked=True).filter(
+                status=GraphRenderJob.PENDING).order_by('created')[:batch])
+            GraphRenderJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status=GraphRenderJob.RUNNING, started=timezone.now())
+        return jobs
+
+    def _requeue_stale(self):
+        """ Jobs left 'running' for too long by a worker that died get another go
+            (unless the same graph has been queued again since). """
+        with transaction.atomic():
+            stale = GraphRenderJob.objects.filter(
+                status=GraphRenderJob.RUNNING,
+                started__lt=timezone.now() - datetime.timedelta(minutes=10))
+            keys = list(stale.values_list('model', 'object_id'))
+            stale.delete()
+            GraphRenderJob.enqueue(keys)
+
+    def _cleanup(self):
+        """ Keeps a day's worth of finished jobs around for the --status numbers. """
+        GraphRenderJob.objects.filter(
+            status=GraphRenderJob.DONE,
+            finished__lt=timezone.now() - datetime.timedelta(days=1)).delete()
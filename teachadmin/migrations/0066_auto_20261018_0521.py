@@ -0,0 +1,27 @@
+# Generated by Django 3.0.6 on 2026-10-18 10:21
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachadmin', '0065_auto_20201022_1844'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreDataVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=30)),
+                ('object_id', models.PositiveIntegerField()),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('modified', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'unique_together': {('model', 'object_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.0.6 on 2026-10-18 10:23
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachadmin', '0066_auto_20261018_0521'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GraphRenderJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=30)),
+                ('object_id', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('P', 'Pending'), ('R', 'Running'), ('D', 'Done'), ('F', 'Failed')], default='P', max_length=1)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started', models.DateTimeField(blank=True, null=True)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'ordering': ['created'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='graphrenderjob',
+            index=models.Index(fields=['status', 'created'], name='teachadmin__status_005b65_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.0.6 on 2026-10-18 10:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+def best_score_backfill(apps, schema_editor):
+    BestScore = apps.get_model('teachadmin', 'bestscore')
+    score_tables = {
+        'exam': (apps.get_model('teachadmin', 'examscore'), 'exam'),
+        'assignment': (apps.get_model('teachadmin', 'assignmentscore'), 'assignment'),
+        'lessontest': (apps.get_model('teachadmin', 'lessontestscore'), 'lessonTest'),
+        'homework': (apps.get_model('teachadmin', 'homeworkscore'), 'homework'),
+    }
+    for model_name, (score_model, fk_name) in score_tables.items():
+        rows = score_model.objects.order_by().values_list(
+            fk_name, 'student', '{}__max_score'.format(fk_name)).annotate(best=models.Max('score'))
+        BestScore.objects.bulk_create([
+            BestScore(student_id=student_id, model=model_name, object_id=object_id, score=best,
+                percent=round((best/max_score)*100, 1) if max_score else None)
+            for object_id, student_id, max_score, best in rows
+        ], batch_size=1000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachadmin', '0067_auto_20261018_0523'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BestScore',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=30)),
+                ('object_id', models.PositiveIntegerField()),
+                ('score', models.PositiveSmallIntegerField()),
+                ('percent', models.FloatField(blank=True, null=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='teachadmin.Student')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='bestscore',
+            index=models.Index(fields=['model', 'object_id'], name='teachadmin__model_dcace7_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='bestscore',
+            unique_together={('student', 'model', 'object_id')},
+        ),
+        migrations.RunPython(best_score_backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.0.6 on 2026-10-18 10:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachadmin', '0068_auto_20261018_0534'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignmentscore',
+            index=models.Index(fields=['assignment', 'student', 'score'], name='teachadmin__assignm_142c4a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignmentscore',
+            index=models.Index(fields=['student', 'assignment'], name='teachadmin__student_e79b17_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examscore',
+            index=models.Index(fields=['exam', 'student', 'score'], name='teachadmin__exam_id_f6f0fa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examscore',
+            index=models.Index(fields=['student', 'exam'], name='teachadmin__student_405e41_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='homeworkscore',
+            index=models.Index(fields=['homework', 'student', 'score'], name='teachadmin__homewor_adf237_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='homeworkscore',
+            index=models.Index(fields=['student', 'homework'], name='teachadmin__student_a6240a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lessontestscore',
+            index=models.Index(fields=['lessonTest', 'student', 'score'], name='teachadmin__lessonT_2752ce_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lessontestscore',
+            index=models.Index(fields=['student', 'lessonTest'], name='teachadmin__student_98ca24_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.0.6 on 2026-10-18 10:39
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachadmin', '0069_auto_20261018_0536'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='assignmentscore',
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name='examscore',
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name='homeworkscore',
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name='lessontestscore',
+            options={},
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.0.6 on 2026-10-18 11:12
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachadmin', '0070_auto_20261018_0539'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='exam',
+            options={'ordering': ['date', 'name', 'subject']},
+        ),
+        migrations.AlterModelOptions(
+            name='homework',
+            options={'ordering': ['deadline', 'name', 'lesson']},
+        ),
+        migrations.AlterModelOptions(
+            name='lesson',
+            options={'ordering': ['name', 'start_date']},
+        ),
+        migrations.AlterModelOptions(
+            name='lessontest',
+            options={'ordering': ['name', 'test_date', 'lesson']},
+        ),
+        migrations.AlterField(
+            model_name='lessontest',
+            name='test_date',
+            field=models.DateField(blank=True, default=datetime.date.today, help_text='Format: yyyy-mm-dd'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.0.6 on 2026-10-18 11:13
+
+from django.db import migrations, models
+
+def drop_duplicate_pending_jobs(apps, schema_editor):
+    """ Older versions could queue the same graph twice; only the oldest pending job is kept. """
+    GraphRenderJob = apps.get_model('teachadmin', 'graphrenderjob')
+    first_jobs = GraphRenderJob.objects.filter(status='P').order_by().values(
+        'model', 'object_id').annotate(first=models.Min('pk')).values_list('first', flat=True)
+    GraphRenderJob.objects.filter(status='P').exclude(pk__in=list(first_jobs)).delete()
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teachadmin', '0071_auto_20261018_0612'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_pending_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='graphrenderjob',
+            constraint=models.UniqueConstraint(condition=models.Q(status='P'), fields=('model', 'object_id'), name='teachadmin_one_pending_render_job'),
+        ),
+    ]
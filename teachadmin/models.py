@@ -1,5 +1,6 @@
-from django.db import models
-from django.db.models import F
+from django.db import models, transaction
+from django.db.models import F, Q, ExpressionWrapper, FloatField, Value, CharField
+from django.db.models.functions import Cast, NullIf
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
@@ -11,6 +12,57 @@ import datetime
 
 # Create your models here.
 
+def cached_relation(instance, relation: str, queryset=None):
+    """ Returns all the objects of one of the instance's relations (e.g. 'student_set'),
+        fetched with ONE query the first time and kept on the instance afterwards
+        (in the same cache prefetch_related() fills, so prefetched relations cost nothing).
+        The returned QuerySet is already evaluated: truthiness, len() and iterating it
+        don't hit the database again. An empty relation gives an empty (falsy) QuerySet.
+        params: instance (model object), relation (str),
+                queryset (QuerySet) = base QuerySet, e.g. with select_related()
+        OUTPUT: QuerySet (evaluated) """
+    qs = getattr(instance, relation).all()
+    # Django 3.0's prefetch_related_objects() doesn't spot prefetched ManyToMany
+    # relations (they're cached under another name), so check the result instead
+    if qs._result_cache is None:
+        lookup = relation if queryset is None else models.Prefetch(relation, queryset=queryset)
+        models.prefetch_related_objects([instance], lookup)
+        qs = getattr(instance, relation).all()
+    return qs
+
+
+class ScoreQuerySet(models.QuerySet):
+    """ QuerySet for the score tables (ExamScore, AssignmentScore, LessonTestScore, HomeworkScore).
+        Score tables are large and mostly read through aggregates, existence checks and
+        lookups by (score model, student), none of which need any particular order.
+        That's why they come without Meta.ordering: querysets are unordered unless the
+        order is asked for explicitly with for_display() (the order used on list pages). """
+
+    def for_display(self):
+        """ Orders the scores the way they are listed on the detail pages. """
+        return self.order_by(*self.model.DISPLAY_ORDERING)
+
+    def unordered(self):
+        """ Drops any ordering, e.g. one added by a previous for_display(). """
+        return self.order_by()
+
+    def percentages(self, *fields):
+        """ The scores as (model, item, student, score, percent) rows, where model is the
+            score model's name (e.g. 'exam'), item its pk and percent the score in percent
+            of the score model's max_score (None if max_score is 0). Unrounded, unordered.
+            The rows of all four score tables have the same shape, see ScoreEntry.percentages().
+            params: fields (str) = further fields or annotations added to the end of each row
+            OUTPUT: QuerySet (values_list) """
+        item_field = self.model.ITEM_FIELD
+        item_model = self.model._meta.get_field(item_field).related_model
+        return self.order_by().annotate(
+            entry_model=Value(item_model._meta.model_name, output_field=CharField()),
+            item=F(item_field),
+            percent=ExpressionWrapper(Cast('score', FloatField()) * 100 / NullIf(
+                F('{}__max_score'.format(item_field)), Value(0)), output_field=FloatField()),
+        ).values_list('entry_model', 'item', 'student', 'score', 'percent', *fields)
+
+
 class Teacher(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     # Additional Info
@@ -72,40 +124,34 @@ class HomeRoom(models.Model):
                 })
 
     def students(self, as_list:bool=False):
-        """ Returns a QuerySet of all the students linked to the current HomeRoom. 
-            If none are found, this returns False.
+        """ Returns a QuerySet of all the students linked to the current HomeRoom
+            (empty if there are none). It's fetched once and kept on the HomeRoom.
             Setting as_list=True will return a list of the students' full names.
             params: as_list(bool)=False
-            OUTPUT: QuerySet, List or False"""
-        qs = self.student_set.all()
-        if qs.exists():
-            if as_list:
-                return ["{} {}".format(
-                    student.first_name, student.last_name
-                ) for student in qs]
-            return qs
-        return False
+            OUTPUT: QuerySet or List"""
+        qs = cached_relation(self, 'student_set')
+        if as_list:
+            return ["{} {}".format(
+                student.first_name, student.last_name
+            ) for student in qs]
+        return qs
     
     def subjects(self):
-        """ Returns a QuerySet of all the subjects linked to the current HomeRoom. """
-        qs = self.subject_set.all()
-        if qs.exists():
-            return qs
-        return False
+        """ Returns a QuerySet of all the subjects linked to the current HomeRoom
+            (empty if there are none). It's fetched once and kept on the HomeRoom. """
+        return cached_relation(self, 'subject_set')
 
     def get_score_models(self, as_tuples:bool=False):
         """ Returns a list of score models (Exam, Assignment, LessonTest, Homework)
             that are linked to the current HomeRoom """
         score_model_list = []
-        qs = self.subjects()
-        if qs:
-            for subject in qs:
-                if as_tuples:
-                    score_model_list.extend(
-                        subject.get_score_models(as_tuples=True)
-                    )
-                else:
-                    score_model_list.extend(subject.get_score_models())
+        for subject in self.subjects():
+            if as_tuples:
+                score_model_list.extend(
+                    subject.get_score_models(as_tuples=True)
+                )
+            else:
+                score_model_list.extend(subject.get_score_models())
         return score_model_list
 
 
@@ -145,54 +191,43 @@ class Subject(models.Model):
 
     def get_exams(self):
         """ Model method that retrieves all the related Exams for the current Subject.
-            If no Exams are found, it returns False
+            If no Exams are found, the QuerySet is empty. It's fetched once and kept on the Subject.
             PARAMS: None
-            RETURNS: QuerySet / False """
-        qs = self.exam_set.all()
-        if qs.exists():
-            return qs
-        return False
+            RETURNS: QuerySet """
+        return cached_relation(self, 'exam_set')
     
     def has_assignment(self):
         return self.assignment_set.all().exists()
 
     def get_assignments(self):
         """ Model method that retrieves all the related Assignments for the current Subject.
-            If no Exams are found, it returns False
+            If no Assignments are found, the QuerySet is empty. It's fetched once and kept on the Subject.
             PARAMS: None
-            RETURNS: QuerySet / False """
-        qs = self.assignment_set.all()
-        if qs.exists():
-            return qs
-        return False
+            RETURNS: QuerySet """
+        return cached_relation(self, 'assignment_set')
     
     def has_lesson(self):
         return self.lesson_set.all().exists()
 
     def get_lessons(self):
         """ Model method that retrieves all the related Lessons for the current Subject.
-            If no Exams are found, it returns False
+            If no Lessons are found, the QuerySet is empty. It's fetched once and kept on the Subject.
             PARAMS: None
-            RETURNS: QuerySet / False """
-        qs = self.lesson_set.all()
-        if qs.exists():
-            return qs
-        return False
+            RETURNS: QuerySet """
+        return cached_relation(self, 'lesson_set')
     
     def students(self, as_list:bool=False):
-        """ Attempts to retrieve the students registered at the current Subject.
-            Failure to do so will return False instead.
+        """ Retrieves the students registered at the current Subject
+            (an empty QuerySet if there are none). It's fetched once and kept on the Subject.
             params: as_list (bool)=False
-            OUTPUT: QuerySet, List or False """
-        qs = self.student_set.all()
-        if qs.exists():
-            if as_list:
-                return [
-                    "{} {}".format(
-                        student.first_name, student.last_name
-                        ) for student in qs]
-            return qs
-        return False
+            OUTPUT: QuerySet or List """
+        qs = cached_relation(self, 'student_set')
+        if as_list:
+            return [
+                "{} {}".format(
+                    student.first_name, student.last_name
+                    ) for student in qs]
+        return qs
 
     def get_score_models(self, as_tuples:bool = False):
         score_models = []
@@ -218,7 +253,45 @@ class Subject(models.Model):
         return score_models
 
 
-class Exam(models.Model):
+class ScoredItem(models.Model):
+    """ Abstract base of the score models (Exam, Assignment, LessonTest, Homework).
+        Subclasses name their score table's related query name (SCORE_TABLE, e.g. 'examscore')
+        and the ForeignKey on it that points back to them (SCORE_FIELD, e.g. 'exam'). """
+    SCORE_TABLE = None
+    SCORE_FIELD = None
+
+    class Meta:
+        abstract = True
+
+    def has_score(self):
+        """ Checks whether there are any scores for the current score model.
+            INPUT: None
+            OUTPUT: bool """
+        if hasattr(self, 'score_count'):
+            # Annotated by the score model tree loader (see scoretree.py)
+            return self.score_count > 0
+        return getattr(self, '{}_set'.format(self.SCORE_TABLE)).all().exists()
+
+    def students(self):
+        """ Returns the UNIQUE students that have scores for the current score model,
+            de-duplicated by the database (empty if there are no scores).
+            params: None
+            OUTPUT: QuerySet of Student """
+        return Student.objects.filter(**{
+            '{}__{}'.format(self.SCORE_TABLE, self.SCORE_FIELD): self
+        }).distinct()
+
+    def scores(self):
+        """ Retrieves all of the scores of the current score model, with their students.
+            If none are found, the QuerySet is empty. It's fetched once and kept on the instance.
+            PARAMS: None
+            OUTPUT: QuerySet """
+        relation = '{}_set'.format(self.SCORE_TABLE)
+        score_model = getattr(self, relation).model
+        return cached_relation(self, relation, score_model.objects.select_related('student'))
+
+
+class Exam(ScoredItem):
     name = models.CharField(
         max_length=100,
         help_text="Anything within 100 characters.")
@@ -236,6 +309,9 @@ class Exam(models.Model):
         default=datetime.date.today,
         help_text="Format: YYYY-MM-DD")
 
+    SCORE_TABLE = 'examscore'
+    SCORE_FIELD = 'exam'
+
     class Meta:
         ordering = [
             'date',
@@ -262,25 +338,6 @@ class Exam(models.Model):
         if self.max_score < self.min_score:
             raise ValidationError(_("Maximum score cannot be lower than minimum score!"))
 
-    def has_score(self):
-        return self.examscore_set.all().exists()
-    
-    def students(self):
-        """ Returns a list of UNIQUE students that has scores for the current exam. """
-
-        if self.has_score():
-            students = []
-            scores = self.examscore_set.all().select_related('student')
-            for score in scores:
-                if score.student not in students:
-                    students.append(score.student)
-            return students
-        else:
-            return False
-
-    def scores(self):
-        return self.examscore_set.all().select_related('student')
-
 
 class Lesson(models.Model):
     name = models.CharField(
@@ -322,14 +379,11 @@ class Lesson(models.Model):
         return self.lessontest_set.all().exists()
 
     def get_lessontests(self):
-        """ Attempts to retrieve all LessonTests associated with the current Lesson.
-            If none are found, it will return False.
+        """ Retrieves all LessonTests associated with the current Lesson.
+            If none are found, the QuerySet is empty. It's fetched once and kept on the Lesson.
             PARAMS: None
-            OUTPUT: QuerySet / False """
-        qs = self.lessontest_set.all()
-        if qs.exists():
-            return qs
-        return False
+            OUTPUT: QuerySet """
+        return cached_relation(self, 'lessontest_set')
     
     def has_homework(self):
         """ If the Lesson has any homeworks, it returns True. Otherwise, it returns False.
@@ -338,14 +392,11 @@ class Lesson(models.Model):
         return self.homework_set.all().exists()
 
     def get_homeworks(self):
-        """ Attempts to retrieve all Homeworks associated with the current Lesson.
-            If none are found, it will return False.
+        """ Retrieves all Homeworks associated with the current Lesson.
+            If none are found, the QuerySet is empty. It's fetched once and kept on the Lesson.
             PARAMS: None
-            OUTPUT: QuerySet / False """
-        qs = self.homework_set.all()
-        if qs.exists():
-            return qs
-        return False
+            OUTPUT: QuerySet """
+        return cached_relation(self, 'homework_set')
     
     def get_score_models(self, as_tuples:bool=False):
         """ This method looks up whether there are any tests or homeworks for the current lesson.
@@ -375,7 +426,7 @@ class Lesson(models.Model):
         return self.subject.students()
 
 
-class LessonTest(models.Model):
+class LessonTest(ScoredItem):
     name = models.CharField(
         max_length=50,
         help_text="Within 50 characters.")
@@ -387,10 +438,13 @@ class LessonTest(models.Model):
         default=0,
         help_text="Default: 0")
     test_date = models.DateField(
-        default=datetime.date.today(),
+        default=datetime.date.today,
         blank=True,
         help_text="Format: yyyy-mm-dd")
 
+    SCORE_TABLE = 'lessontestscore'
+    SCORE_FIELD = 'lessonTest'
+
     class Meta:
         ordering = [
             'name',
@@ -424,36 +478,6 @@ class LessonTest(models.Model):
             })
 
 
-    def has_score(self):
-        """ Checks whether the LessonTest has any test scores associated with it.
-            INPUT: None
-            OUTPUT: bool """
-        return self.lessontestscore_set.all().exists()
-    
-    def students(self):
-        """ Returns list of UNIQUE students that has scores for the current test.
-            If there are no scores for the test, it will return False.
-            params: None
-            OUTPUT: list / False """
-        qs = self.lessontestscore_set.select_related('student').order_by('student', 'score').distinct('student')
-        if qs.exists():
-            students = []
-            for score in qs:
-                students.append(score.student)
-            return students
-        return []
-
-    def scores(self):
-        """ Attempts to retrieve all of the related LessonTestScores to the current LessonTest.
-            If none are found, it returns False.
-            PARAMS: None
-            OUTPUT: LessonTestScores (QuerySet) / False (bool) """
-        qs = self.lessontestscore_set.all().select_related('student')
-        if qs.exists():
-            return qs
-        return False
-
-
 class Student(models.Model):
     first_name = models.CharField(
         max_length=50,
@@ -512,7 +536,7 @@ class Student(models.Model):
             self.last_name = ""
 
 
-class Assignment(models.Model):
+class Assignment(ScoredItem):
     name = models.CharField(max_length=50)
     max_score = models.PositiveSmallIntegerField(default=100)
     min_score = models.PositiveSmallIntegerField(default=0)
@@ -522,6 +546,9 @@ class Assignment(models.Model):
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
     creator = models.ManyToManyField(Teacher)
 
+    SCORE_TABLE = 'assignmentscore'
+    SCORE_FIELD = 'assignment'
+
     class Meta:
         ordering = [
             'name',
@@ -539,27 +566,119 @@ class Assignment(models.Model):
     def __str__(self):
         return "{}".format(self.name)
 
-    def has_score(self):
-        return self.assignmentscore_set.all().exists()
-    
-    def students(self):
-        """ Returns UNIQUE students that has scores for the current test. """
 
-        if self.has_score():
-            students = []
-            scores = self.assignmentscore_set.all().select_related('student')
-            for score in scores:
-                if score.student not in students:
-                    students.append(score.student)
-            return students
-        return []
+class ScoreEntry(models.Model):
+    """ Abstract base of the score tables (ExamScore, AssignmentScore, LessonTestScore, HomeworkScore).
+        Subclasses name their ForeignKey to the score model in ITEM_FIELD. """
+    ITEM_FIELD = None
 
-    def scores(self):
-        """ Returns all the scores associated with the current test. """
-        return self.assignmentscore_set.all().select_related('student')
+    objects = ScoreQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    @property
+    def item(self):
+        """ The score model (Exam, Assignment, LessonTest or Homework) the score is for. """
+        return getattr(self, self.ITEM_FIELD)
 
+    @property
+    def percent(self):
+        """ The score in percent of the score model's max_score, rounded to one decimal. """
+        return BestScore.percent_of(self.score, self.item.max_score)
 
-class AssignmentScore(models.Model):
+    def best_score_key(self):
+        """ The (model name, object id, student pk) of the student's BestScore for the score model. """
+        item_model = self._meta.get_field(self.ITEM_FIELD).related_model
+        return (item_model._meta.model_name, getattr(self, '{}_id'.format(self.ITEM_FIELD)), self.student_id)
+
+    def clean(self):
+        errors = ScoreEntry.validate_many([self])
+        if errors:
+            raise errors[0][1]
+
+    @staticmethod
+    def best_scores_of(entries):
+        """ The current best scores of every (score model, student) pair in entries, read with ONE query.
+            params: entries (list of score table rows, of any of the four kinds)
+            OUTPUT: dict {(model name, object id, student pk): score} """
+        pairs = {}
+        for model_name, object_id, student_id in (entry.best_score_key() for entry in entries):
+            object_ids, student_ids = pairs.setdefault(model_name, (set(), set()))
+            object_ids.add(object_id)
+            student_ids.add(student_id)
+        if not pairs:
+            return {}
+        lookup = models.Q()
+        for model_name, (object_ids, student_ids) in pairs.items():
+            lookup |= models.Q(model=model_name, object_id__in=object_ids, student_id__in=student_ids)
+        return {
+            (model_name, object_id, student_id): score
+            for model_name, object_id, student_id, score in BestScore.objects.filter(lookup).values_list(
+                'model', 'object_id', 'student_id', 'score')
+        }
+
+    @staticmethod
+    def validate_many(entries, best_scores=None):
+        """ Validates one or many (e.g. thousands of imported) scores with the checks of
+            check_score(), using a single query for the students' best scores instead of
+            one per score. Entries are checked in order, as if they were saved one by one:
+            a valid entry raises the bar for the entries after it.
+            params: entries (list of score table rows, of any of the four kinds),
+                    best_scores (dict from best_scores_of()) = None => read from BestScore
+            OUTPUT: list of (entry, ValidationError) tuples for the invalid entries """
+        entries = list(entries)
+        # The error messages name the score models and students
+        for score_model in {type(entry) for entry in entries}:
+            models.prefetch_related_objects(
+                [entry for entry in entries if type(entry) == score_model],
+                score_model.ITEM_FIELD, 'student')
+        best_scores = dict(ScoreEntry.best_scores_of(entries) if best_scores is None else best_scores)
+
+        errors = []
+        for entry in entries:
+            key = entry.best_score_key()
+            best_score = best_scores.get(key)
+            try:
+                entry.check_score(best_score)
+            except ValidationError as err:
+                errors.append((entry, err))
+                continue
+            if best_score is None or entry.score > best_score:
+                best_scores[key] = entry.score
+        return errors
+
+    def check_score(self, best_score):
+        """ Raises a ValidationError if the score isn't allowed, e.g. because it's out of the
+            score model's min/max range. Needs no queries of its own as long as the score
+            model and student are loaded, so many scores can be checked in memory.
+            params: best_score (int) = the student's current best score for the score model / None
+            OUTPUT: None """
+        pass
+
+    @staticmethod
+    def percentages(items, students=None):
+        """ Every score of the given score models - of any kind, mixed - normalised to percent
+            of their max_score, read from all four score tables with ONE UNION query.
+            params: items (list of Exam, Assignment, LessonTest and/or Homework),
+                    students (list or QuerySet of Student) = None => all students
+            OUTPUT: QuerySet of (model, item, student, score, percent) tuples / None (no items) """
+        querysets = []
+        for score_model in (ExamScore, AssignmentScore, LessonTestScore, HomeworkScore):
+            item_model = score_model._meta.get_field(score_model.ITEM_FIELD).related_model
+            item_pks = [item.pk for item in items if type(item) == item_model]
+            if not item_pks:
+                continue
+            scores = score_model.objects.filter(**{'{}__in'.format(score_model.ITEM_FIELD): item_pks})
+            if students is not None:
+                scores = scores.filter(student__in=students)
+            querysets.append(scores.percentages())
+        if not querysets:
+            return None
+        return querysets[0].union(*querysets[1:], all=True)
+
+
+class AssignmentScore(ScoreEntry):
     score = models.PositiveSmallIntegerField()
     assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE)
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
@@ -567,12 +686,19 @@ class AssignmentScore(models.Model):
         default=timezone.now,
         help_text="Format: YYYY-MM-DD HH:MM:SS")
 
+    ITEM_FIELD = 'assignment'
+
+    DISPLAY_ORDERING = [
+        'assignment',
+        'turn_in_time',
+        'score',
+    ]
+
     class Meta:
-        ordering = [
-            'assignment',
-            'turn_in_time',
-            'score',
-            ]
+        indexes = [
+            models.Index(fields=['assignment', 'student', 'score']),
+            models.Index(fields=['student', 'assignment']),
+        ]
 
     def __str__(self):
         if self.assignment.min_score == 0 and self.assignment.max_score == 100:
@@ -581,7 +707,7 @@ class AssignmentScore(models.Model):
             return "{} ({}%)".format(self.score,
                 round((self.score/self.assignment.max_score)*100,1))
 
-    def clean(self):
+    def check_score(self, best_score):
         # Don't allow for scores higher than the Assignment's max_score field
         if self.score > self.assignment.max_score:
             raise ValidationError({
@@ -593,18 +719,25 @@ class AssignmentScore(models.Model):
             })
 
 
-class ExamScore(models.Model):
+class ExamScore(ScoreEntry):
     score = models.PositiveSmallIntegerField(default=0)
     exam = models.ForeignKey(Exam, on_delete=models.CASCADE)
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     timestamp = models.DateTimeField(auto_now_add=True)
     
+    ITEM_FIELD = 'exam'
+
+    DISPLAY_ORDERING = [
+        'exam',
+        'timestamp',
+        'score',
+        'student',
+    ]
+
     class Meta:
-        ordering = [
-            'exam',
-            'timestamp',
-            'score',
-            'student',
+        indexes = [
+            models.Index(fields=['exam', 'student', 'score']),
+            models.Index(fields=['student', 'exam']),
         ]
 
     def __str__(self):
@@ -616,46 +749,48 @@ class ExamScore(models.Model):
             "subject_pk": self.exam.subject.pk
             })
 
-    def clean(self):
-        # First we check to see whether the chosen student DOES NOT have any scores for the exam
-        if self.student not in self.exam.students():
+    def check_score(self, best_score):
         # Do not allow scores to be set higher than exam's max_score
-            if self.score > self.exam.max_score:
-                raise ValidationError({
-                    "score": ValidationError(
-                        _("Score cannot be higher than exam's maximum score."),
-                        code='invalid'
-                        )
-                    })
-            if self.score < self.exam.min_score:
-                raise ValidationError({
-                    "score": ValidationError(
-                        _("Score cannot be lower than exam's minimum score."),
-                        code='invalid'
-                        )
-                    })
-        else:
-            exam_scores = self.exam.scores().filter(student=self.student).select_related('student')
-            if exam_scores.count() > 0:
-                for score in exam_scores:
-                    if score.score > self.score:
-                        raise ValidationError({
-                            "score": ValidationError(
-                                _("{} already has a higher score than you tried to enter: {} > {} ".format(
-                                score.student, score.score, self.score)), code='invalid')
-                            })
+        if self.score > self.exam.max_score:
+            raise ValidationError({
+                "score": ValidationError(
+                    _("Score cannot be higher than exam's maximum score."),
+                    code='invalid'
+                    )
+                })
+        if self.score < self.exam.min_score:
+            raise ValidationError({
+                "score": ValidationError(
+                    _("Score cannot be lower than exam's minimum score."),
+                    code='invalid'
+                    )
+                })
+        # Then we check whether the chosen student already has a better score for the exam
+        if best_score is not None and best_score > self.score:
+            raise ValidationError({
+                "score": ValidationError(
+                    _("{} already has a higher score than you tried to enter: {} > {} ".format(
+                    self.student, best_score, self.score)), code='invalid')
+                })
                     
 
-class LessonTestScore(models.Model):
+class LessonTestScore(ScoreEntry):
     score = models.PositiveSmallIntegerField(default=0)
     lessonTest = models.ForeignKey(LessonTest, on_delete=models.CASCADE)
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
 
+    ITEM_FIELD = 'lessonTest'
+
+    DISPLAY_ORDERING = [
+        'lessonTest',
+        'student',
+        '-score',
+    ]
+
     class Meta:
-        ordering = [
-            'lessonTest',
-            'student',
-            '-score',
+        indexes = [
+            models.Index(fields=['lessonTest', 'student', 'score']),
+            models.Index(fields=['student', 'lessonTest']),
         ]
 
     def __str__(self):
@@ -671,7 +806,7 @@ class LessonTestScore(models.Model):
                 }
             )
     
-    def clean(self):
+    def check_score(self, best_score):
         # Don't allow user to enter scores that are lower/higher than LessonTest's min/max scores.
         if self.score > self.lessonTest.max_score:
             raise ValidationError({
@@ -681,16 +816,12 @@ class LessonTestScore(models.Model):
             raise ValidationError({
                 "score": ValidationError(_("Score cannot be lower than the lessontest's minimum score."), code='invalid')
             })
-        if self.lessonTest.has_score():
-            student_scores = self.lessonTest.scores().filter(student=self.student).select_related('student')
-            if student_scores.count() > 0:
-                for score in student_scores:
-                    if score.score >= self.score:
-                        raise ValidationError({
-                            "score": ValidationError(_("{} already has a higher score: {} > {}".format(
-                                score.student, score.score, self.score
-                            )), code='invalid')
-                        })
+        if best_score is not None and best_score >= self.score:
+            raise ValidationError({
+                "score": ValidationError(_("{} already has a higher score: {} > {}".format(
+                    self.student, best_score, self.score
+                )), code='invalid')
+            })
         
 
 class BehaviorType(models.Model):
@@ -734,13 +865,16 @@ class BehaviorEvent(models.Model):
         return reverse("teachadmin:behaviorevent_detail", kwargs={"pk": self.pk})
     
 
-class Homework(models.Model):
+class Homework(ScoredItem):
     name = models.CharField(max_length=50, help_text="Within 50 characters.")
     lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE)
     min_score = models.PositiveSmallIntegerField(default=0, help_text="Default: 0")
     max_score = models.PositiveSmallIntegerField(default=100, help_text="Default: 100")
     deadline = models.DateTimeField(default=timezone.now, help_text="Format: YYYY-MM-DD HH:MM:SS")
 
+    SCORE_TABLE = 'homeworkscore'
+    SCORE_FIELD = 'homework'
+
     class Meta:
         ordering = [
             'deadline',
@@ -758,27 +892,8 @@ class Homework(models.Model):
             "pk": self.pk
         })
 
-    def has_score(self):
-        return self.homeworkscore_set.all().exists()
-    
-    def students(self):
-        """ Returns a list of UNIQUE students that has scores for the current homework. """
-
-        if self.has_score():
-            students = []
-            scores = self.homeworkscore_set.all()
-            for score in scores:
-                if score.student not in students:
-                    students.append(score.student)
-            return students
-        else:
-            return False
-    
-    def scores(self):
-        return self.homeworkscore_set.all().select_related('student')
-
 
-class HomeworkScore(models.Model):
+class HomeworkScore(ScoreEntry):
     score = models.PositiveSmallIntegerField()
     homework = models.ForeignKey(Homework, on_delete=models.CASCADE)
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
@@ -787,11 +902,18 @@ class HomeworkScore(models.Model):
         help_text="Format: YYYY-MM-DD HH:MM:SS"
     )
 
+    ITEM_FIELD = 'homework'
+
+    DISPLAY_ORDERING = [
+        'homework',
+        'student',
+        'score',
+    ]
+
     class Meta:
-        ordering = [
-            'homework',
-            'student',
-            'score',
+        indexes = [
+            models.Index(fields=['homework', 'student', 'score']),
+            models.Index(fields=['student', 'homework']),
         ]
 
     def __str__(self):
@@ -805,7 +927,7 @@ class HomeworkScore(models.Model):
                             "pk": self.homework.pk
                             })
 
-    def clean(self):
+    def check_score(self, best_score):
         # Don't allow for scores higher than the homework's max_score field
         if self.score > self.homework.max_score:
             raise ValidationError({
@@ -815,21 +937,255 @@ class HomeworkScore(models.Model):
             raise ValidationError({
                 "score": ValidationError(_("Score cannot be lower than the homework's minimum score."), code='invalid')
             })
-        if self.homework.has_score():
-            student_scores = self.homework.scores().filter(student=self.student).select_related('student')
-            if student_scores.exists():
-                for score in student_scores:
-                    if score.score > self.score:
-                        raise ValidationError({
-                            "score": ValidationError(_("{} already has a higher score for this homework: {} > {}".format(
-                                score.student, score.score, self.score
-                            )), code='invalid')
-                        })
-        if self.turn_in_date > timezone.now():
-            ValidationError(_("Did the future {} turn in the paper? I don't think it works that way.".format(self.student)),
-                code='invalid'
-            )
+        if best_score is not None and best_score > self.score:
+            raise ValidationError({
+                "score": ValidationError(_("{} already has a higher score for this homework: {} > {}".format(
+                    self.student, best_score, self.score
+                )), code='invalid')
+            })
+        if self.turn_in_time and self.turn_in_time > timezone.now():
+            raise ValidationError({
+                "turn_in_time": ValidationError(_("Did the future {} turn in the paper? I don't think it works that way.".format(self.student)),
+                    code='invalid')
+            })
 
         
 
     
+
+
+def keys_lookup(keys):
+    """ A filter for the rows of many (model name, object id) pairs, with one condition per
+        model name, so that e.g. every student of a large import doesn't turn into thousands
+        of ORs.
+        params: keys (set of (model name, object id) tuples)
+        OUTPUT: Q """
+    lookup = Q()
+    for model_name in {model_name for model_name, _ in keys}:
+        lookup |= Q(model=model_name,
+                    object_id__in=[object_id for name, object_id in keys if name == model_name])
+    return lookup
+
+
+class ScoreDataVersion(models.Model):
+    """ Keeps count of how many times the data behind an object's graph has changed.
+        One row per (model, object_id), e.g. ('exam', 4) or ('homeroom', 2).
+        The version gets bumped by the signal handlers in signals.py whenever a score,
+        a score model (Exam, Assignment, LessonTest, Homework) or student membership changes. """
+    model = models.CharField(max_length=30)
+    object_id = models.PositiveIntegerField()
+    version = models.PositiveIntegerField(default=0)
+    modified = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = [
+            ['model', 'object_id'],
+        ]
+
+    def __str__(self):
+        return "{}({}): v{}".format(self.model, self.object_id, self.version)
+
+    @classmethod
+    def get_for(cls, instance):
+        """ Returns the ScoreDataVersion for the given model instance.
+            Objects whose data has never changed get an unsaved version 0.
+            params: instance (Model)
+            OUTPUT: ScoreDataVersion """
+        model_name = instance._meta.model_name
+        try:
+            return cls.objects.get(model=model_name, object_id=instance.pk)
+        except cls.DoesNotExist:
+            return cls(model=model_name, object_id=instance.pk, modified=None)
+
+    @classmethod
+    def bump(cls, keys):
+        """ Increases the version of every (model name, pk) pair in keys by one.
+            params: keys (iterable of tuples)
+            OUTPUT: None """
+        now = timezone.now()
+        keys = {(model_name, object_id) for model_name, object_id in keys if object_id is not None}
+        if not keys:
+            return
+        lookup = keys_lookup(keys)
+        with transaction.atomic():
+            # Missing rows start at version 0 and are then bumped like all the others, so two
+            # concurrent first bumps of the same object both count (a row inserted by the
+            # other one is simply skipped here)
+            existing = set(cls.objects.filter(lookup).values_list('model', 'object_id'))
+            cls.objects.bulk_create([
+                cls(model=model_name, object_id=object_id, version=0, modified=now)
+                for model_name, object_id in keys - existing
+            ], ignore_conflicts=True)
+            cls.objects.filter(lookup).update(version=F('version') + 1, modified=now)
+
+
+class GraphRenderJob(models.Model):
+    """ Queue entry for the background graph renderer (manage.py rendergraphs).
+        Jobs get queued whenever the ScoreDataVersion of a graph owner is bumped,
+        as long as settings.TEACHADMIN_GRAPH_WORKER is True. """
+    PENDING = 'P'
+    RUNNING = 'R'
+    DONE = 'D'
+    FAILED = 'F'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    model = models.CharField(max_length=30)
+    object_id = models.PositiveIntegerField()
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default=PENDING)
+    created = models.DateTimeField(default=timezone.now)
+    started = models.DateTimeField(blank=True, null=True)
+    finished = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True, default="")
+
+    class Meta:
+        ordering = [
+            'created',
+        ]
+        indexes = [
+            models.Index(fields=['status', 'created']),
+        ]
+        constraints = [
+            # At most one pending job per graph, even with several processes enqueueing at once
+            models.UniqueConstraint(fields=['model', 'object_id'], condition=Q(status='P'),
+                                    name='teachadmin_one_pending_render_job'),
+        ]
+
+    def __str__(self):
+        return "{}({}): {}".format(self.model, self.object_id, self.get_status_display())
+
+    @classmethod
+    def enqueue(cls, keys):
+        """ Queues a render job for every (model name, pk) pair in keys,
+            unless there already is a pending job for it.
+            params: keys (iterable of tuples)
+            OUTPUT: None """
+        keys = {(model_name, object_id) for model_name, object_id in keys if object_id is not None}
+        if not keys:
+            return
+        pending = set(cls.objects.filter(keys_lookup(keys), status=cls.PENDING).values_list(
+            'model', 'object_id'))
+        # A job queued by someone else in the meantime is skipped by the unique constraint
+        cls.objects.bulk_create([
+            cls(model=model_name, object_id=object_id) for model_name, object_id in sorted(keys - pending)
+        ], ignore_conflicts=True)
+
+    @classmethod
+    def stats(cls, last: int = 100):
+        """ Queue depth and latency numbers for sizing the render worker pool.
+            Latencies (in seconds) are taken from the last <last> finished jobs.
+            params: last (int) = 100
+            OUTPUT: dict """
+        finished = list(cls.objects.filter(status=cls.DONE).order_by('-finished').values_list(
+            'created', 'started', 'finished')[:last])
+        waits = [(started - created).total_seconds() for created, started, _ in finished]
+        renders = [(done - started).total_seconds() for _, started, done in finished]
+        return {
+            "Pending": cls.objects.filter(status=cls.PENDING).count(),
+            "Running": cls.objects.filter(status=cls.RUNNING).count(),
+            "Failed": cls.objects.filter(status=cls.FAILED).count(),
+            "Avg. wait": round(sum(waits) / len(waits), 3) if waits else None,
+            "Max. wait": round(max(waits), 3) if waits else None,
+            "Avg. render": round(sum(renders) / len(renders), 3) if renders else None,
+            "Max. render": round(max(renders), 3) if renders else None,
+        }
+
+
+class BestScore(models.Model):
+    """ Each student's best score per score model (Exam, Assignment, LessonTest, Homework).
+        One row per (student, model, object_id), e.g. (<Student>, 'exam', 4), holding the
+        raw score and its percentage of the score model's max_score (rounded to one decimal).
+        The rows are kept up to date by the signal handlers in signals.py.
+        Scores written with QuerySet.update() or bulk_create() don't send any signals,
+        so run 'manage.py rebuildbestscores' (or BestScore.rebuild()) after those. """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    model = models.CharField(max_length=30)
+    object_id = models.PositiveIntegerField()
+    score = models.PositiveSmallIntegerField()
+    percent = models.FloatField(blank=True, null=True)
+
+    class Meta:
+        unique_together = [
+            ['student', 'model', 'object_id'],
+        ]
+        indexes = [
+            models.Index(fields=['model', 'object_id']),
+        ]
+
+    def __str__(self):
+        return "{} {}({}): {}".format(self.student, self.model, self.object_id, self.score)
+
+    @staticmethod
+    def score_tables():
+        """ Model name of every score model => (its score table, the score table's ForeignKey name) """
+        return {
+            'exam': (ExamScore, 'exam'),
+            'assignment': (AssignmentScore, 'assignment'),
+            'lessontest': (LessonTestScore, 'lessonTest'),
+            'homework': (HomeworkScore, 'homework'),
+        }
+
+    @staticmethod
+    def percent_of(score, max_score):
+        if not max_score:
+            return None
+        return round((score/max_score)*100, 1)
+
+    @classmethod
+    def refresh(cls, model_name: str, object_id: int, student_id: int):
+        """ Recalculates a single student's best score for a single score model.
+            params: model_name (str) = 'exam' / 'assignment' / 'lessontest' / 'homework',
+                    object_id (int), student_id (int)
+            OUTPUT: None """
+        score_model_class, fk_name = cls.score_tables()[model_name]
+        best = score_model_class.objects.filter(
+            **{'{}_id'.format(fk_name): object_id}, student_id=student_id
+        ).order_by('-score').values_list('score', '{}__max_score'.format(fk_name)).first()
+
+        if best is None:
+            cls.objects.filter(student_id=student_id, model=model_name, object_id=object_id).delete()
+            return
+        score, max_score = best
+        cls.objects.update_or_create(
+            student_id=student_id, model=model_name, object_id=object_id,
+            defaults={'score': score, 'percent': cls.percent_of(score, max_score)})
+
+    @classmethod
+    def _calculate(cls, model_name: str, **score_filter):
+        """ Builds (unsaved) BestScores straight from a score table. """
+        score_model_class, fk_name = cls.score_tables()[model_name]
+        rows = score_model_class.objects.filter(**score_filter).order_by().values_list(
+            fk_name, 'student', '{}__max_score'.format(fk_name)).annotate(best=models.Max('score'))
+        return [
+            cls(student_id=student_id, model=model_name, object_id=object_id,
+                score=best, percent=cls.percent_of(best, max_score))
+            for object_id, student_id, max_score, best in rows
+        ]
+
+    @classmethod
+    def refresh_item(cls, model_name: str, object_id: int):
+        """ Recalculates every student's best score for a single score model,
+            e.g. after its max_score has changed.
+            params: model_name (str), object_id (int)
+            OUTPUT: None """
+        _, fk_name = cls.score_tables()[model_name]
+        with transaction.atomic():
+            cls.objects.filter(model=model_name, object_id=object_id).delete()
+            cls.objects.bulk_create(cls._calculate(model_name, **{'{}_id'.format(fk_name): object_id}))
+
+    @classmethod
+    def rebuild(cls, model_names=None, batch_size: int = 1000):
+        """ Recalculates the whole table (or the rows of the given score models).
+            params: model_names (list of str) = None => all four score models
+            OUTPUT: int - number of rows written """
+        written = 0
+        with transaction.atomic():
+            for model_name in model_names or cls.score_tables().keys():
+                cls.objects.filter(model=model_name).delete()
+                best_scores = cls._calculate(model_name)
+                cls.objects.bulk_create(best_scores, batch_size=batch_size)
+                written += len(best_scores)
+        return written
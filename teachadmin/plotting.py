@@ -0,0 +1,125 @@
+""" Figure-scoped plotting helpers.
+    pyplot keeps a global registry of figures and a global style, which makes it
+    leak memory (figures that are never closed) and unsafe to use from several
+    request threads at once. Everything in here works on explicit Figure objects
+    with their own Agg canvas instead. The graph style is only put into rcParams
+    for the moment the Figure and its Axes are created (they take their colours,
+    grid, spines and colour cycle from rcParams right then); everything drawn
+    afterwards gets the style's values passed in directly, so any number of
+    figures can be drawn and saved at the same time. """
+
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.font_manager import fontManager
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.lines import Line2D
+from matplotlib.text import Text
+import seaborn as sns
+
+import contextlib
+import functools
+import io
+import threading
+import weakref
+
+# rcParams are process wide, so only one figure at a time can be created under a
+# temporary style. Drawing and saving happen outside of the lock.
+_RC_LOCK = threading.RLock()
+
+# Figure => the graph style it was created with
+_STYLES = weakref.WeakKeyDictionary()
+
+DARK = 'dark'
+LIGHT = 'light'
+
+
+def graph_style(theme: str = DARK):
+    """ Returns the rcParams for TeachAdmin's graphs:
+        seaborn's 'darkgrid' with matplotlib's 'dark_background' on top (DARK),
+        or plain 'darkgrid' (LIGHT).
+        params: theme (str) = DARK / LIGHT
+        OUTPUT: dict """
+    style = dict(sns.axes_style('darkgrid'))
+    if theme == DARK:
+        style.update(matplotlib.style.library['dark_background'])
+    return style
+
+
+@contextlib.contextmanager
+def figure(theme: str = DARK, **figure_kwargs):
+    """ Context manager that yields a (Figure, Axes) pair drawn with the graph style.
+        The figure is released as soon as the block is left, so it never outlives
+        the request that created it. Save it with to_bytes(), which applies the
+        style to whatever was drawn inside the block.
+        Usage:
+            with figure() as (fig, axes):
+                swarmplot(axes, df)
+                png = to_bytes(fig) """
+    style = graph_style(theme)
+    with _RC_LOCK, matplotlib.rc_context(style):
+        fig = Figure(**figure_kwargs)
+        FigureCanvasAgg(fig)
+        axes = fig.add_subplot(111)
+    # Ticks and grid lines are created lazily while drawing: give them the style up front
+    axes.tick_params(
+        colors=_rc(style, 'xtick.color'), labelcolor=_rc(style, 'text.color'),
+        grid_color=_rc(style, 'grid.color'), grid_linestyle=_rc(style, 'grid.linestyle'),
+        grid_linewidth=_rc(style, 'grid.linewidth'))
+    _STYLES[fig] = style
+    try:
+        yield fig, axes
+    finally:
+        fig.clear()
+
+
+def _rc(style, key):
+    """ A style's value for an rcParam, or matplotlib's default for rcParams it leaves alone. """
+    return style[key] if key in style else matplotlib.rcParamsDefault[key]
+
+
+@functools.lru_cache()
+def _installed_fonts(fonts: tuple):
+    """ The fonts of a font list that are installed, so that matplotlib doesn't warn about
+        every missing one each time a text is drawn. """
+    installed = {font.name for font in fontManager.ttflist}
+    return [font for font in fonts if font in installed] or ['sans-serif']
+
+
+def _apply_style(fig, style):
+    """ Titles, labels, lines and legends read rcParams when they are added, i.e. outside of
+        the style: gives them the style's text colour, font, line caps and legend frame. """
+    family = _rc(style, 'font.family')[0]
+    fonts = _rc(style, 'font.{}'.format(family)) if family in ('sans-serif', 'serif', 'monospace') else [family]
+    fonts = _installed_fonts(tuple(fonts))
+    for text in fig.findobj(Text):
+        text.set_color(_rc(style, 'text.color'))
+        text.set_fontfamily(fonts)
+    for line in fig.findobj(Line2D):
+        line.set_solid_capstyle(_rc(style, 'lines.solid_capstyle'))
+    for axes in fig.axes:
+        legend = axes.get_legend()
+        if legend is None:
+            continue
+        frame = legend.get_frame()
+        facecolor = _rc(style, 'legend.facecolor')
+        frame.set_facecolor(axes.get_facecolor() if facecolor == 'inherit' else facecolor)
+        edgecolor = _rc(style, 'legend.edgecolor')
+        frame.set_edgecolor(_rc(style, 'axes.edgecolor') if edgecolor == 'inherit' else edgecolor)
+
+
+def to_bytes(fig, fmt: str = 'png'):
+    """ Saves the figure into memory.
+        params: fig (Figure), fmt (str) = 'png' / 'svg'
+        OUTPUT: bytes """
+    style = _STYLES.get(fig)
+    if style is not None:
+        _apply_style(fig, style)
+    buf = io.BytesIO()
+    fig.savefig(buf, format=fmt, facecolor=fig.get_facecolor(), edgecolor=fig.get_edgecolor())
+    return buf.getvalue()
+
+
+def tilt_xticklabels(axes):
+    """ Tilts the x-axis labels so that long score model names stay readable. """
+    matplotlib.artist.setp(axes.get_xticklabels(), rotation=45, ha="right",
+                            rotation_mode="anchor")
@@ -0,0 +1,190 @@
+""" Report comment files (see comments.py) for every student of a School, in one ZIP archive.
+    The comments are generated per HomeRoom in the calling process (a few queries per
+    HomeRoom). Turning them into files (TXT, HTML or PDF) is pure CPU work without any
+    database access, so 'manage.py exportreports' fans it out over a process pool, keeping
+    only a few reports per process in flight at a time. The download view renders inside
+    the request instead (processes=0): web server workers shouldn't fork processes of their
+    own or lose their database connection halfway through a response. The finished files
+    are written into the ZIP archive in order and the archive is handed out chunk by chunk
+    as it grows (stream_reports()), so neither the reports nor the archive are ever held in
+    memory as a whole. """
+
+from django.db import connections
+from django.utils.html import escape
+from django.utils.text import slugify
+
+from .comments import group_comment_sections
+
+from concurrent.futures import ProcessPoolExecutor
+import collections
+import io
+import textwrap
+import zipfile
+
+# Format => content type of a single report
+REPORT_FORMATS = {
+    'txt': 'text/plain',
+    'html': 'text/html',
+    'pdf': 'application/pdf',
+}
+
+# Reports per process that are rendered ahead of the one being written to the archive
+REPORTS_IN_FLIGHT = 4
+
+HTML_REPORT = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>body {{ font-family: sans-serif; max-width: 45em; margin: 2em auto; }}</style>
+</head>
+<body>
+<h1>{title}</h1>
+<h3>{group}</h3>
+{sections}
+</body>
+</html>
+"""
+
+# A4 in inches, and the lines of text that fit on it
+PDF_PAGE_SIZE = (8.27, 11.69)
+PDF_LINES_PER_PAGE = 54
+PDF_LINE_WIDTH = 90
+
+
+def render_txt(title: str, group: str, sections):
+    lines = [title, "-" * len(title), group, ""]
+    for section, text in sections:
+        lines.extend([section + ":", "\t" + text, ""])
+    if not sections:
+        lines.append("No scores yet.")
+    return "\n".join(lines).encode('utf-8')
+
+
+def render_html(title: str, group: str, sections):
+    body = "\n".join(
+        "<h2>{}</h2>\n<p>{}</p>".format(escape(section), escape(text)) for section, text in sections
+    ) or "<p>No scores yet.</p>"
+    return HTML_REPORT.format(title=escape(title), group=escape(group), sections=body).encode('utf-8')
+
+
+def render_pdf(title: str, group: str, sections):
+    # Imported here: only the worker processes that render PDFs need matplotlib's PDF backend
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_pdf import FigureCanvasPdf, PdfPages
+
+    lines = [(title, 16, 'bold'), (group, 11, 'normal'), ("", 10, 'normal')]
+    for section, text in sections:
+        lines.append((section, 12, 'bold'))
+        lines.extend((line, 10, 'normal') for line in textwrap.wrap(text, PDF_LINE_WIDTH))
+        lines.append(("", 10, 'normal'))
+    if not sections:
+        lines.append(("No scores yet.", 10, 'normal'))
+
+    buf = io.BytesIO()
+    with PdfPages(buf) as pdf:
+        for first in range(0, len(lines), PDF_LINES_PER_PAGE):
+            fig = Figure(figsize=PDF_PAGE_SIZE)
+            FigureCanvasPdf(fig)
+            for row, (line, size, weight) in enumerate(lines[first:first + PDF_LINES_PER_PAGE]):
+                fig.text(0.08, 0.94 - row * (0.88 / PDF_LINES_PER_PAGE), line,
+                         fontsize=size, fontweight=weight, va='top')
+            pdf.savefig(fig)
+    return buf.getvalue()
+
+
+RENDERERS = {
+    'txt': render_txt,
+    'html': render_html,
+    'pdf': render_pdf,
+}
+
+
+def render_report(fmt: str, filename: str, title: str, group: str, sections):
+    """ Runs inside the worker processes: plain data in, file contents out.
+        params: fmt (str) = 'txt' / 'html' / 'pdf', filename (str), title (str),
+                group (str), sections (list of (section title, text) tuples)
+        OUTPUT: tuple (filename, bytes) """
+    return filename, RENDERERS[fmt](title, group, sections)
+
+
+def school_reports(school, fmt: str):
+    """ The report of every student of a School's HomeRooms, one HomeRoom at a time.
+        params: school (School), fmt (str) = 'txt' / 'html' / 'pdf'
+        OUTPUT: iterator of render_report() argument tuples """
+    for homeroom in school.homeroom_set.all():
+        folder = slugify(str(homeroom)) or 'homeroom-{}'.format(homeroom.pk)
+        for student, sections in group_comment_sections(homeroom).items():
+            title = "{} {}".format(student.first_name, student.last_name).strip()
+            filename = "{}/{}-{}.{}".format(
+                folder, student.student_number or student.pk, slugify(title) or 'student', fmt)
+            yield fmt, filename, title, str(homeroom), sections
+
+
+def render_reports(reports, processes: int = 2):
+    """ Renders the reports in a process pool, keeping at most REPORTS_IN_FLIGHT reports
+        per process queued at a time.
+        params: reports (iterator of render_report() argument tuples),
+                processes (int) = 0 => render in the calling process
+        OUTPUT: iterator of (filename, bytes), in the order of reports """
+    if processes < 1:
+        for report in reports:
+            yield render_report(*report)
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = collections.deque()
+        for report in reports:
+            if not pending:
+                # The workers are forked on the first submit() and must not inherit the
+                # database connections (the next query simply reconnects)
+                connections.close_all()
+            pending.append(pool.submit(render_report, *report))
+            if len(pending) >= processes * REPORTS_IN_FLIGHT:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class _ZipStream:
+    """ Write-only file object that hands out whatever zipfile has written so far. """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(files):
+    """ Writes files into a ZIP archive, yielding the archive's bytes as they are written.
+        params: files (iterator of (filename, bytes))
+        OUTPUT: iterator of bytes """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for filename, data in files:
+            archive.writestr(filename, data)
+            chunk = stream.pop()
+            if chunk:
+                yield chunk
+    yield stream.pop()
+
+
+def stream_reports(school, fmt: str = 'txt', processes: int = 0):
+    """ A ZIP archive with the report of every student of a School.
+        params: school (School), fmt (str) = 'txt' / 'html' / 'pdf',
+                processes (int) = number of rendering processes (0: no process pool,
+                for use inside requests)
+        OUTPUT: iterator of bytes """
+    if fmt not in RENDERERS:
+        raise ValueError("Unknown report format: {}".format(fmt))
+    return stream_zip(render_reports(school_reports(school, fmt), processes))
@@ -0,0 +1,109 @@
+""" Importing a roster (a CSV file with the columns Number, First, Last and Gender, see
+    static/teachadmin/homerooms/csv templates/students-template.csv) into a HomeRoom.
+    The whole file is checked at once with pandas (missing names, lengths, genders and
+    duplicate student numbers) and the valid rows are written with three bulk_create()s
+    in one transaction: the students, their teacher links and their subject links.
+    Rows that can't be imported aren't dropped silently: they come back as an error report
+    with the line number of the row in the file. """
+
+from django.db import transaction
+
+from .models import Student
+from .signals import students_added
+
+import pandas as pd
+
+# Roster column => Student field
+ROSTER_COLUMNS = {
+    'Number': 'student_number',
+    'First': 'first_name',
+    'Last': 'last_name',
+    'Gender': 'gender',
+}
+
+GENDERS = {gender for gender, _ in Student.GENDERS_CHOICES}
+
+
+def read_roster(file, **kwargs):
+    """ Reads a roster CSV file, keeping every value as text (e.g. student number '007').
+        params: file (path or file object), any other pandas.read_csv() keyword argument
+        OUTPUT: DataFrame (or an iterator of DataFrames when chunksize is given) """
+    return pd.read_csv(file, dtype=str, keep_default_na=False, skipinitialspace=True, **kwargs)
+
+
+def clean_roster(df: pd.DataFrame, existing_numbers=(), first_line: int = 2):
+    """ Normalises and checks every row of a roster, without touching the database.
+        params: df (DataFrame with the ROSTER_COLUMNS),
+                existing_numbers (iterable of str) = student numbers that are already taken,
+                first_line (int) = line number of the DataFrame's first row in the file
+        OUTPUT: tuple (DataFrame of the valid rows with Student field names as columns,
+                       list of (line number, error message) tuples) """
+    missing = [column for column in ROSTER_COLUMNS if column not in df.columns]
+    if missing:
+        return pd.DataFrame(columns=ROSTER_COLUMNS.values()), [
+            (first_line - 1, "Missing column(s): {}".format(", ".join(missing)))]
+
+    students = df[list(ROSTER_COLUMNS)].rename(columns=ROSTER_COLUMNS).fillna("")
+    students = students.apply(lambda column: column.astype(str).str.strip())
+    students['gender'] = students['gender'].str.upper().str[:1]
+    lines = pd.Series(range(first_line, first_line + len(students)), index=students.index)
+
+    checks = [
+        (students['first_name'] == "", "First name is missing."),
+        (~students['gender'].isin(GENDERS),
+            "Gender has to be one of {}.".format(", ".join(sorted(GENDERS)))),
+    ]
+    for field in ('first_name', 'last_name', 'student_number'):
+        max_length = Student._meta.get_field(field).max_length
+        checks.append((students[field].str.len() > max_length,
+            "{} is longer than {} characters.".format(
+                Student._meta.get_field(field).verbose_name.capitalize(), max_length)))
+    numbered = students['student_number'] != ""
+    checks.extend([
+        (numbered & students['student_number'].duplicated(keep='first'),
+            "Student number appears more than once in the file."),
+        (numbered & students['student_number'].isin(set(existing_numbers)),
+            "A student with this student number already exists in the homeroom."),
+    ])
+
+    errors = []
+    invalid = pd.Series(False, index=students.index)
+    for failed, message in checks:
+        errors.extend((line, message) for line in lines[failed])
+        invalid |= failed
+    errors.sort(key=lambda error: error[0])
+    return students[~invalid], errors
+
+
+def import_roster(df: pd.DataFrame, homeroom, teacher=None, first_line: int = 2):
+    """ Creates the students of a roster in the given HomeRoom, links them to the teacher
+        and to the HomeRoom's subjects, in one transaction.
+        params: df (DataFrame with the ROSTER_COLUMNS), homeroom (HomeRoom),
+                teacher (Teacher) = None, first_line (int) = line number of the first row
+        OUTPUT: tuple (list of created Students, list of (line number, error message) tuples) """
+    existing_numbers = homeroom.student_set.exclude(student_number="").values_list(
+        'student_number', flat=True)
+    rows, errors = clean_roster(df, existing_numbers, first_line)
+    if rows.empty:
+        return [], errors
+
+    with transaction.atomic():
+        existing_pks = set(homeroom.student_set.values_list('pk', flat=True))
+        students = Student.objects.bulk_create([
+            Student(homeroom=homeroom, **row) for row in rows.to_dict('records')])
+        if any(student.pk is None for student in students):
+            # Only some databases hand back the primary keys of bulk inserted rows
+            students = list(homeroom.student_set.exclude(pk__in=existing_pks))
+
+        if teacher is not None:
+            Student.teacher.through.objects.bulk_create([
+                Student.teacher.through(student_id=student.pk, teacher_id=teacher.pk)
+                for student in students])
+        subject_pks = list(homeroom.subject_set.values_list('pk', flat=True))
+        if subject_pks:
+            Student.subject.through.objects.bulk_create([
+                Student.subject.through(student_id=student.pk, subject_id=subject_pk)
+                for student in students for subject_pk in subject_pks])
+        students_added(homeroom)
+
+    return students, errors
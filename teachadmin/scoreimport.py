@@ -0,0 +1,267 @@
+""" Streaming import of score spreadsheets (CSV or XLSX) into a Subject's Exams or Assignments,
+    or a Lesson's LessonTests or Homeworks.
+    The sheet has one row per student: a 'Number' column with the student number, optional
+    'Name' / 'First' / 'Last' / 'Gender' columns (only there for the reader), and one column
+    per score model, named '<name>' or '<name>:<min score>-<max score>', e.g. 'Quiz 1:0-20'.
+    Score models are looked up by name (and created if they don't exist yet) once. The sheet
+    is then read chunksize rows at a time: each chunk costs one query for its students, one
+    for the scores that are already there (re-importing a sheet doesn't duplicate anything),
+    one for the best scores, and bulk_create()s for the new scores and BestScores. So memory
+    use is bounded by the chunk size and the number of queries by the number of chunks.
+    Cells that can't be imported are skipped and reported with their line number, and so are
+    rows repeating a student number and columns whose min/max scores disagree with the score
+    model that is already there. """
+
+from .models import Exam, Assignment, LessonTest, Homework, ScoreEntry
+from . import bulkscores
+
+import re
+
+import pandas as pd
+
+DEFAULT_CHUNKSIZE = 1000
+
+# Errors kept in the report, the rest is only counted
+MAX_REPORTED_ERRORS = 100
+
+STUDENT_COLUMNS = ('Number', 'Name', 'First', 'Last', 'Gender')
+
+SCORE_COLUMN = re.compile(r'^(?P<name>.+?)\s*(?::\s*(?P<min>\d+)\s*-\s*(?P<max>\d+))?$')
+
+# Score model name => (score model, the field pointing at what it belongs to)
+IMPORT_MODELS = {
+    'exam': (Exam, 'subject'),
+    'assignment': (Assignment, 'subject'),
+    'lessontest': (LessonTest, 'lesson'),
+    'homework': (Homework, 'lesson'),
+}
+
+
+def read_chunks(file, chunksize: int = DEFAULT_CHUNKSIZE, filename: str = None):
+    """ Reads a CSV or XLSX file chunksize rows at a time, keeping every value as text.
+        params: file (path or file object), chunksize (int),
+                filename (str) = None => file's own name, used to tell XLSX from CSV
+        OUTPUT: iterator of DataFrames """
+    name = (filename or getattr(file, 'name', None) or str(file)).lower()
+    if name.endswith(('.xlsx', '.xlsm')):
+        return _read_excel_chunks(file, chunksize)
+    return pd.read_csv(file, dtype=str, keep_default_na=False, skipinitialspace=True,
+                       chunksize=chunksize)
+
+
+def _cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        # Excel keeps every number as a float: 12 => 12.0
+        value = int(value)
+    return str(value)
+
+
+def _read_excel_chunks(file, chunksize):
+    try:
+        import openpyxl
+    except ImportError:
+        raise ImportError("Reading .xlsx files needs the openpyxl package (pip install openpyxl).")
+
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [_cell_text(value).strip() for value in next(rows, ())]
+        chunk = []
+        for row in rows:
+            chunk.append([_cell_text(value) for value in row][:len(header)])
+            if len(chunk) == chunksize:
+                yield pd.DataFrame(chunk, columns=header)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header)
+    finally:
+        workbook.close()
+
+
+def score_columns(columns):
+    """ The score model columns of a sheet.
+        params: columns (list of str)
+        OUTPUT: dict {column: (name, min score, max score)} (min/max None when not given) """
+    parsed = {}
+    for column in columns:
+        if column in STUDENT_COLUMNS or not column.strip():
+            continue
+        match = SCORE_COLUMN.match(column.strip())
+        min_score, max_score = match.group('min'), match.group('max')
+        parsed[column] = (
+            match.group('name'),
+            int(min_score) if min_score is not None else None,
+            int(max_score) if max_score is not None else None,
+        )
+    return parsed
+
+
+def resolve_items(model_name: str, owner, columns, teacher=None):
+    """ The score models for a sheet's score columns, looked up by name with ONE query.
+        Score models that don't exist yet are created (with the column's min/max scores).
+        params: model_name (str) = 'exam' / 'assignment' / 'lessontest' / 'homework',
+                owner (Subject for exams and assignments, Lesson for lessontests and homeworks),
+                columns (dict from score_columns()),
+                teacher (Teacher) = None => creator of new assignments
+        OUTPUT: dict {column: score model object} """
+    item_model, owner_field = IMPORT_MODELS[model_name]
+    names = {name for name, _, _ in columns.values()}
+    existing = {
+        item.name: item for item in item_model.objects.filter(**{owner_field: owner}, name__in=names)
+    }
+    items = {}
+    for column, (name, min_score, max_score) in columns.items():
+        if name not in existing:
+            item = item_model(**{owner_field: owner}, name=name)
+            if min_score is not None:
+                item.min_score, item.max_score = min_score, max_score
+            item.save()
+            if teacher is not None and hasattr(item, 'creator'):
+                item.creator.add(teacher)
+            existing[name] = item
+        items[column] = existing[name]
+    return items
+
+
+def import_chunk(chunk: pd.DataFrame, items, subject, first_line: int, report, seen=None):
+    """ Imports the scores of one chunk of a sheet and adds the outcome to the report.
+        params: chunk (DataFrame), items (dict from resolve_items()), subject (Subject the
+                students have to belong to), first_line (int) = line number of the chunk's
+                first row, report (dict from import_scores()),
+                seen (dict {student number: line}) = the rows of the chunks before this one
+                (updated in place)
+        OUTPUT: None """
+    if seen is None:
+        seen = {}
+    lines = pd.Series(range(first_line, first_line + len(chunk)), index=chunk.index)
+    numbers = chunk['Number'].astype(str).str.strip()
+    numbered = numbers != ""
+
+    # Every student's scores come from the first row with their number
+    first_lines = dict(seen)
+    for number, line in lines[numbered].groupby(numbers[numbered]).first().items():
+        first_lines.setdefault(number, line)
+    repeated = numbered & (numbers.duplicated(keep='first') | numbers.isin(seen))
+    for line, number in zip(lines[repeated], numbers[repeated]):
+        _report_error(report, line, 'Number', "Student number '{}' appears more than once in the sheet "
+                      "(first on line {}).".format(number, first_lines[number]))
+    seen.update(first_lines)
+
+    students, ambiguous = {}, set()
+    for student in subject.student_set.filter(student_number__in=set(numbers[numbered])):
+        if student.student_number in students:
+            ambiguous.add(student.student_number)
+        students[student.student_number] = student
+    for number in ambiguous:
+        del students[number]
+    unknown = ~repeated & ~numbers.isin(students)
+    for line, number in zip(lines[unknown], numbers[unknown]):
+        if number in ambiguous:
+            message = "More than one student in {} has the number '{}'.".format(subject, number)
+        else:
+            message = "No student with number '{}' in {}.".format(number, subject)
+        _report_error(report, line, 'Number', message)
+    unknown |= repeated
+
+    # One row per (student, score column) cell that has a score in it
+    cells = chunk.loc[~unknown, list(items)].assign(Number=numbers[~unknown], Line=lines[~unknown]).melt(
+        id_vars=['Number', 'Line'], var_name='Column', value_name='Value')
+    cells['Value'] = cells['Value'].astype(str).str.strip()
+    cells = cells[cells['Value'] != ""]
+    scores = pd.to_numeric(cells['Value'], errors='coerce')
+    invalid = scores.isna() | (scores < 0) | (scores % 1 != 0)
+    for line, column, value in cells.loc[invalid, ['Line', 'Column', 'Value']].itertuples(index=False):
+        _report_error(report, line, column, "'{}' isn't a whole, positive number.".format(value))
+    cells = cells[~invalid].assign(Score=scores[~invalid].astype(int))
+    if cells.empty:
+        return
+
+    # Scores that were imported before
+    item_model = type(next(iter(items.values())))
+    score_model = item_model._meta.get_field(item_model.SCORE_TABLE).related_model
+    item_field = score_model.ITEM_FIELD
+    existing = set(score_model.objects.filter(
+        **{'{}__in'.format(item_field): set(items.values())},
+        student__in=[students[number] for number in cells['Number'].unique()]
+    ).values_list('{}_id'.format(item_field), 'student_id', 'score'))
+
+    entries, entry_lines = [], []
+    for number, line, column, score in cells[['Number', 'Line', 'Column', 'Score']].itertuples(index=False):
+        item, student = items[column], students[number]
+        if (item.pk, student.pk, score) in existing:
+            report['skipped'] += 1
+            continue
+        entries.append(score_model(**{item_field: item}, student=student, score=score))
+        entry_lines.append((line, column))
+
+    best = bulkscores.best_score_rows(entries)
+    errors = ScoreEntry.validate_many(entries, {key: row.score for key, row in best.items()})
+    invalid_entries = {id(entry) for entry, _ in errors}
+    lines_by_entry = {id(entry): line for entry, line in zip(entries, entry_lines)}
+    for entry, err in errors:
+        line, column = lines_by_entry[id(entry)]
+        for message in err.messages:
+            _report_error(report, line, column, message)
+
+    valid = [entry for entry in entries if id(entry) not in invalid_entries]
+    bulkscores.write_scores(valid, best)
+    report['created'] += len(valid)
+
+
+def _report_error(report, line, column, message):
+    report['error_count'] += 1
+    if len(report['errors']) < MAX_REPORTED_ERRORS:
+        report['errors'].append((line, column, message))
+
+
+def import_scores(file, model_name: str, owner, chunksize: int = DEFAULT_CHUNKSIZE,
+                  filename: str = None, progress=None, teacher=None):
+    """ Imports a score sheet chunk by chunk.
+        params: file (path or file object), model_name (str) = 'exam' / 'assignment' /
+                'lessontest' / 'homework', owner (Subject or Lesson, see resolve_items()),
+                chunksize (int), filename (str) = None (see read_chunks()),
+                progress (callable) = None => called with the report after every chunk,
+                teacher (Teacher) = None => creator of the assignments the import creates
+        OUTPUT: dict {'rows': int, 'created': int, 'skipped': int (already imported),
+                      'error_count': int, 'errors': list of (line, column, message)} """
+    report = {'rows': 0, 'created': 0, 'skipped': 0, 'error_count': 0, 'errors': []}
+    subject = owner if IMPORT_MODELS[model_name][1] == 'subject' else owner.subject
+    items = None
+    seen = {}
+    for chunk in read_chunks(file, chunksize, filename):
+        if items is None:
+            if 'Number' not in chunk.columns:
+                _report_error(report, 1, 'Number', "The sheet needs a 'Number' column.")
+                return report
+            columns = score_columns(list(chunk.columns))
+            max_length = IMPORT_MODELS[model_name][0]._meta.get_field('name').max_length
+            for column, (name, min_score, max_score) in list(columns.items()):
+                if len(name) > max_length:
+                    _report_error(report, 1, column, "Name is longer than {} characters.".format(max_length))
+                elif min_score is not None and min_score > max_score:
+                    _report_error(report, 1, column, "Minimum score cannot be higher than maximum score.")
+                else:
+                    continue
+                del columns[column]
+            if not columns:
+                _report_error(report, 1, '', "The sheet doesn't have any score columns.")
+                return report
+            items = resolve_items(model_name, owner, columns, teacher)
+            # Scores are checked against the score model's own limits, not the header's
+            for column, item in list(items.items()):
+                _, min_score, max_score = columns[column]
+                if min_score is not None and (min_score, max_score) != (item.min_score, item.max_score):
+                    _report_error(report, 1, column, "{} already exists with scores from {} to {}.".format(
+                        item, item.min_score, item.max_score))
+                    del items[column]
+            if not items:
+                return report
+
+        # Line 1 is the header
+        import_chunk(chunk, items, subject, report['rows'] + 2, report, seen)
+        report['rows'] += len(chunk)
+        if progress is not None:
+            progress(report)
+    return report
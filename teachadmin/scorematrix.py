@@ -0,0 +1,76 @@
+from django.db.models import Q
+
+from .models import (Student, Exam, ExamScore,
+                        Assignment, AssignmentScore,
+                        LessonTest, LessonTestScore,
+                        Homework, HomeworkScore, BestScore)
+import pandas as pd
+
+# Maps every score model to its score table and the name of the
+# ForeignKey on that table that points back to the score model.
+SCORE_TABLES = {
+    Exam: (ExamScore, 'exam'),
+    Assignment: (AssignmentScore, 'assignment'),
+    LessonTest: (LessonTestScore, 'lessonTest'),
+    Homework: (HomeworkScore, 'homework'),
+}
+
+GENDERS = dict(Student.GENDERS_CHOICES)
+
+
+def column_name(score_model):
+    """ Returns the DataFrame column label used for a score model.
+        params: score_model (Exam, Assignment, LessonTest or Homework)
+        OUTPUT: str """
+    return "{}({})".format(score_model, score_model.pk)
+
+
+def fetch_scores(students, score_models):
+    """ Fetches every given student's best score (see BestScore) for any of the given
+        score models, using ONE query.
+        params: students (list of Student), score_models (list of score model objects)
+        OUTPUT: DataFrame with the columns 'Model', 'Item', 'Student', 'Score', 'Percent' """
+    student_pks = [student.pk for student in students]
+    items = Q()
+    for model in SCORE_TABLES:
+        item_pks = [item.pk for item in score_models if type(item) == model]
+        if item_pks:
+            items |= Q(model=model._meta.model_name, object_id__in=item_pks)
+
+    columns = ['Model', 'Item', 'Student', 'Score', 'Percent']
+    if not items or not student_pks:
+        return pd.DataFrame(columns=columns)
+    rows = BestScore.objects.filter(items, student__in=student_pks).values_list(
+        'model', 'object_id', 'student', 'score', 'percent')
+    return pd.DataFrame.from_records(list(rows), columns=columns)
+
+
+def build_score_matrix(students, score_models):
+    """ Builds the student x score model DataFrame used by Graph for Lessons,
+        Subjects and HomeRooms.
+        Each cell holds the student's BEST score for that score model, in percent
+        of the score model's max_score (rounded to one decimal).
+        Students without a score for a score model get NaN.
+        params: students (QuerySet or list of Student), score_models (list)
+        OUTPUT: DataFrame ['Student', 'Gender', '<score model>(<pk>)', ...] """
+    students = list(students) if students else []
+    score_models = list(score_models)
+    if not students or not score_models:
+        return pd.DataFrame()
+
+    scores = fetch_scores(students, score_models)
+
+    keys = [(item._meta.model_name, item.pk) for item in score_models]
+    percent = scores.set_index(['Model', 'Item', 'Student'])['Percent'].astype('float64')
+    matrix = percent.unstack(['Model', 'Item']).reindex(
+        index=[student.pk for student in students],
+        columns=pd.MultiIndex.from_tuples(keys, names=['Model', 'Item'])
+    ).astype('float64')
+    matrix.columns = [column_name(item) for item in score_models]
+    matrix = matrix.loc[:, ~matrix.columns.duplicated()]
+
+    df = pd.DataFrame({
+        'Student': students,
+        'Gender': [GENDERS.get(student.gender, 'Other') for student in students],
+    })
+    return pd.concat([df, matrix.reset_index(drop=True)], axis=1)
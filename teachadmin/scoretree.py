@@ -0,0 +1,78 @@
+""" Loads the School -> HomeRoom -> Subject -> Lesson -> (Exam, Assignment, LessonTest, Homework)
+    tree below a set of objects in a constant number of queries.
+    get_score_models() walks that tree one relation at a time, which costs a few queries
+    per Subject and per Lesson plus one has_score() query per LessonTest and Homework.
+    After load_score_model_tree() every relation it walks is prefetched and every score model
+    carries its number of scores (score_count, which has_score() uses), so the same
+    get_score_models() calls return the same lists without touching the database. """
+
+from django.db.models import Count, Prefetch, prefetch_related_objects
+
+from .models import (School, HomeRoom, Subject, Lesson,
+                        Exam, Assignment, LessonTest, Homework)
+
+
+def _scored(model, score_relation):
+    return model.objects.annotate(score_count=Count(score_relation))
+
+
+def lesson_lookups(prefix: str = ''):
+    """ Prefetch lookups for the LessonTests and Homeworks of Lessons.
+        params: prefix (str) = path from the loaded objects to the Lessons, e.g. 'lesson_set__'
+        OUTPUT: list """
+    return [
+        Prefetch(prefix + 'lessontest_set', queryset=_scored(LessonTest, 'lessontestscore')),
+        Prefetch(prefix + 'homework_set', queryset=_scored(Homework, 'homeworkscore')),
+    ]
+
+
+def subject_lookups(prefix: str = ''):
+    """ Prefetch lookups for the Exams, Assignments and Lessons (with their score models) of Subjects.
+        params: prefix (str) = path from the loaded objects to the Subjects
+        OUTPUT: list """
+    return [
+        Prefetch(prefix + 'exam_set', queryset=_scored(Exam, 'examscore')),
+        Prefetch(prefix + 'assignment_set', queryset=_scored(Assignment, 'assignmentscore')),
+        prefix + 'lesson_set',
+    ] + lesson_lookups(prefix + 'lesson_set__')
+
+
+def homeroom_lookups(prefix: str = ''):
+    """ Prefetch lookups for the Subjects (and everything below them) of HomeRooms.
+        params: prefix (str) = path from the loaded objects to the HomeRooms
+        OUTPUT: list """
+    return [prefix + 'subject_set'] + subject_lookups(prefix + 'subject_set__')
+
+
+def school_lookups(prefix: str = ''):
+    """ Prefetch lookups for the HomeRooms and Subjects (and everything below them) of Schools.
+        params: prefix (str) = path from the loaded objects to the Schools
+        OUTPUT: list """
+    return ([prefix + 'homeroom_set'] + homeroom_lookups(prefix + 'homeroom_set__')
+            + [prefix + 'subject_set'] + subject_lookups(prefix + 'subject_set__'))
+
+
+TREE_LOOKUPS = {
+    School: school_lookups,
+    HomeRoom: homeroom_lookups,
+    Subject: subject_lookups,
+    Lesson: lesson_lookups,
+}
+
+
+def load_score_model_tree(objects):
+    """ Prefetches everything get_score_models() needs for the given objects.
+        Objects that already have the tree loaded aren't queried again.
+        params: objects (Schools, HomeRooms, Subjects or Lessons; a single object, list or QuerySet)
+        OUTPUT: list of the (now loaded) objects """
+    if isinstance(objects, (School, HomeRoom, Subject, Lesson)):
+        objects = [objects]
+    objects = list(objects)
+    for model, lookups in TREE_LOOKUPS.items():
+        instances = [obj for obj in objects if type(obj) == model
+                     and not getattr(obj, '_score_model_tree_loaded', False)]
+        if instances:
+            prefetch_related_objects(instances, *lookups())
+            for obj in instances:
+                obj._score_model_tree_loaded = True
+    return objects
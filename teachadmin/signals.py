@@ -0,0 +1,285 @@
+""" Signal handlers that keep ScoreDataVersion and BestScore up to date.
+    Every graph in TeachAdmin belongs to an Exam, Assignment, LessonTest, Homework,
+    Lesson, Subject, HomeRoom or Student (the student's score timeline, see timeline.py).
+    Whenever the data behind one of those graphs changes, its version gets bumped so that
+    cached graphs for older versions are never used again.
+    Saving or deleting a score recalculates that student's BestScore for the score model. """
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete, post_delete, pre_save, m2m_changed
+from django.dispatch import receiver
+
+from .models import (Student, HomeRoom, Subject, Lesson,
+                        Exam, ExamScore, Assignment, AssignmentScore,
+                        LessonTest, LessonTestScore, Homework, HomeworkScore,
+                        ScoreDataVersion, GraphRenderJob, BestScore)
+
+# Score table => name of the ForeignKey pointing at its score model
+SCORE_FIELDS = {
+    ExamScore: 'exam',
+    AssignmentScore: 'assignment',
+    LessonTestScore: 'lessonTest',
+    HomeworkScore: 'homework',
+}
+
+SCORED_ITEMS = (Exam, Assignment, LessonTest, Homework)
+
+
+def _bump(keys):
+    ScoreDataVersion.bump(keys)
+    # Render-on-write: let the background worker re-render the affected graphs.
+    # Student timelines are only rendered when a student's page asks for them.
+    if getattr(settings, 'TEACHADMIN_GRAPH_WORKER', False):
+        GraphRenderJob.enqueue(key for key in keys if key[0] != 'student')
+
+
+def _bump_on_commit(keys):
+    keys = list(keys)
+    if keys:
+        transaction.on_commit(lambda: _bump(keys))
+
+
+def _subject_keys(subject_id):
+    """ Keys for a subject and every homeroom that the subject is linked to. """
+    keys = [('subject', subject_id)]
+    homeroom_pks = Subject.homeroom.through.objects.filter(
+        subject_id=subject_id).values_list('homeroom_id', flat=True)
+    keys.extend(('homeroom', pk) for pk in homeroom_pks)
+    return keys
+
+
+def _lesson_keys(lesson_id):
+    keys = [('lesson', lesson_id)]
+    subject_id = Lesson.objects.filter(pk=lesson_id).values_list('subject_id', flat=True).first()
+    if subject_id:
+        keys.extend(_subject_keys(subject_id))
+    return keys
+
+
+def _item_keys(model_name, item_id):
+    """ Keys for a score model (Exam, Assignment, LessonTest or Homework)
+        and everything above it in the School hierarchy. """
+    keys = [(model_name, item_id)]
+    if model_name in ('lessontest', 'homework'):
+        model = LessonTest if model_name == 'lessontest' else Homework
+        lesson_id = model.objects.filter(pk=item_id).values_list('lesson_id', flat=True).first()
+        if lesson_id:
+            keys.extend(_lesson_keys(lesson_id))
+    else:
+        model = Exam if model_name == 'exam' else Assignment
+        subject_id = model.objects.filter(pk=item_id).values_list('subject_id', flat=True).first()
+        if subject_id:
+            keys.extend(_subject_keys(subject_id))
+    return keys
+
+
+def _item_student_keys(model_name, item_id):
+    """ Keys for the timelines of every student with a score for a score model. """
+    score_model, field_name = BestScore.score_tables()[model_name]
+    student_pks = score_model.objects.filter(**{'{}_id'.format(field_name): item_id}).order_by(
+        ).values_list('student_id', flat=True).distinct()
+    return [('student', pk) for pk in student_pks]
+
+
+def _student_keys(student):
+    """ Keys for every graph the given student shows up in. """
+    keys = [('student', student.pk)]
+    if student.homeroom_id:
+        keys.append(('homeroom', student.homeroom_id))
+    subject_pks = list(student.subject.values_list('pk', flat=True))
+    for subject_pk in subject_pks:
+        keys.append(('subject', subject_pk))
+    for lesson_pk in Lesson.objects.filter(subject__in=subject_pks).values_list('pk', flat=True):
+        keys.append(('lesson', lesson_pk))
+    for score_model, field_name in SCORE_FIELDS.items():
+        item_model_name = score_model._meta.get_field(field_name).related_model._meta.model_name
+        item_pks = score_model.objects.filter(student=student).order_by().values_list(
+            '{}_id'.format(field_name), flat=True).distinct()
+        keys.extend((item_model_name, pk) for pk in item_pks)
+    return keys
+
+
+def scores_written(*items, students=()):
+    """ bulk_create() doesn't send any signals: bumps the versions of everything above the
+        given score models (Exams, Assignments, LessonTests or Homeworks) and the timelines
+        of the given students once the transaction commits. Lessons and subjects shared by
+        several score models are only looked up once.
+        params: items (score model objects), students (iterable of student pks) = ()
+        OUTPUT: None """
+    keys = {(item._meta.model_name, item.pk) for item in items}
+    keys.update(('student', pk) for pk in students)
+    lesson_pks = {item.lesson_id for item in items if hasattr(item, 'lesson_id')}
+    subject_pks = {item.subject_id for item in items if hasattr(item, 'subject_id')}
+    subject_pks.update(Lesson.objects.filter(pk__in=lesson_pks).values_list('subject_id', flat=True))
+    keys.update(('lesson', pk) for pk in lesson_pks)
+    keys.update(('subject', pk) for pk in subject_pks)
+    keys.update(
+        ('homeroom', pk) for pk in Subject.homeroom.through.objects.filter(
+            subject_id__in=subject_pks).values_list('homeroom_id', flat=True))
+    _bump_on_commit(keys)
+
+
+def students_added(homeroom):
+    """ bulk_create() doesn't send any signals: bumps the versions of a HomeRoom whose
+        students were bulk created, and of its subjects and their lessons, once the
+        transaction commits.
+        params: homeroom (HomeRoom)
+        OUTPUT: None """
+    keys = [('homeroom', homeroom.pk)]
+    subject_pks = list(homeroom.subject_set.values_list('pk', flat=True))
+    keys.extend(('subject', pk) for pk in subject_pks)
+    keys.extend(
+        ('lesson', pk) for pk in Lesson.objects.filter(
+            subject__in=subject_pks).values_list('pk', flat=True))
+    _bump_on_commit(keys)
+
+
+def _score_changed(sender, instance, **kwargs):
+    field_name = SCORE_FIELDS[sender]
+    item_model_name = sender._meta.get_field(field_name).related_model._meta.model_name
+    keys = _item_keys(item_model_name, getattr(instance, '{}_id'.format(field_name)))
+    keys.append(('student', instance.student_id))
+    # A score moved to another student (see _score_moving()) leaves the old timeline behind
+    previous_key = getattr(instance, '_previous_best_score_key', None)
+    if previous_key:
+        keys.append(('student', previous_key[2]))
+    _bump_on_commit(keys)
+
+
+def _best_score_key(sender, instance):
+    field_name = SCORE_FIELDS[sender]
+    item_model_name = sender._meta.get_field(field_name).related_model._meta.model_name
+    return item_model_name, getattr(instance, '{}_id'.format(field_name)), instance.student_id
+
+
+def _score_moving(sender, instance, **kwargs):
+    """ Remembers which score model and student an existing score belonged to, so that
+        the old BestScore gets recalculated as well if the score was moved. """
+    instance._previous_best_score_key = None
+    if instance.pk:
+        field_name = SCORE_FIELDS[sender]
+        previous = sender.objects.filter(pk=instance.pk).values_list(
+            '{}_id'.format(field_name), 'student_id').first()
+        if previous:
+            instance._previous_best_score_key = (_best_score_key(sender, instance)[0],) + previous
+
+
+def _best_score_changed(sender, instance, **kwargs):
+    keys = {_best_score_key(sender, instance)}
+    previous_key = getattr(instance, '_previous_best_score_key', None)
+    if previous_key:
+        keys.add(previous_key)
+    for model_name, object_id, student_id in keys:
+        BestScore.refresh(model_name, object_id, student_id)
+
+
+for score_model in SCORE_FIELDS:
+    post_save.connect(_score_changed, sender=score_model, dispatch_uid='version_{}_save'.format(score_model.__name__))
+    pre_delete.connect(_score_changed, sender=score_model, dispatch_uid='version_{}_delete'.format(score_model.__name__))
+    pre_save.connect(_score_moving, sender=score_model, dispatch_uid='best_{}_presave'.format(score_model.__name__))
+    post_save.connect(_best_score_changed, sender=score_model, dispatch_uid='best_{}_save'.format(score_model.__name__))
+    post_delete.connect(_best_score_changed, sender=score_model, dispatch_uid='best_{}_delete'.format(score_model.__name__))
+
+
+def _item_changed(sender, instance, **kwargs):
+    """ The timelines show the score model's name and date, so they get bumped as well. """
+    model_name = sender._meta.model_name
+    _bump_on_commit(_item_keys(model_name, instance.pk) + _item_student_keys(model_name, instance.pk))
+
+
+def _item_rescaling(sender, instance, update_fields=None, **kwargs):
+    """ Remembers the score model's previous max_score, see _item_rescaled(). """
+    instance._previous_max_score = None
+    if instance.pk and (update_fields is None or 'max_score' in update_fields):
+        instance._previous_max_score = sender.objects.filter(pk=instance.pk).values_list(
+            'max_score', flat=True).first()
+
+
+def _item_rescaled(sender, instance, created, **kwargs):
+    """ The percentages depend on the score model's max_score, so its best scores are only
+        recalculated when that has changed (not when it's renamed or moved to another date). """
+    previous = getattr(instance, '_previous_max_score', None)
+    if not created and previous is not None and previous != instance.max_score:
+        BestScore.refresh_item(sender._meta.model_name, instance.pk)
+
+
+def _item_deleted(sender, instance, **kwargs):
+    BestScore.objects.filter(model=sender._meta.model_name, object_id=instance.pk).delete()
+
+
+for item_model in SCORED_ITEMS:
+    post_save.connect(_item_changed, sender=item_model, dispatch_uid='version_{}_save'.format(item_model.__name__))
+    pre_delete.connect(_item_changed, sender=item_model, dispatch_uid='version_{}_delete'.format(item_model.__name__))
+    pre_save.connect(_item_rescaling, sender=item_model, dispatch_uid='best_{}_presave'.format(item_model.__name__))
+    post_save.connect(_item_rescaled, sender=item_model, dispatch_uid='best_{}_save'.format(item_model.__name__))
+    post_delete.connect(_item_deleted, sender=item_model, dispatch_uid='best_{}_delete'.format(item_model.__name__))
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(pre_delete, sender=Lesson)
+def lesson_changed(sender, instance, **kwargs):
+    _bump_on_commit(_lesson_keys(instance.pk))
+
+
+@receiver(post_save, sender=Subject)
+@receiver(pre_delete, sender=Subject)
+def subject_changed(sender, instance, **kwargs):
+    _bump_on_commit(_subject_keys(instance.pk))
+
+
+@receiver(post_save, sender=HomeRoom)
+def homeroom_changed(sender, instance, **kwargs):
+    _bump_on_commit([('homeroom', instance.pk)])
+
+
+@receiver(pre_save, sender=Student)
+def student_moving(sender, instance, **kwargs):
+    """ Remembers the student's previous homeroom so that both the old
+        and the new homeroom get bumped in student_changed(). """
+    instance._previous_homeroom_id = None
+    if instance.pk:
+        instance._previous_homeroom_id = Student.objects.filter(
+            pk=instance.pk).values_list('homeroom_id', flat=True).first()
+
+
+@receiver(post_save, sender=Student)
+@receiver(pre_delete, sender=Student)
+def student_changed(sender, instance, **kwargs):
+    keys = _student_keys(instance)
+    previous_homeroom_id = getattr(instance, '_previous_homeroom_id', None)
+    if previous_homeroom_id:
+        keys.append(('homeroom', previous_homeroom_id))
+    _bump_on_commit(keys)
+
+
+@receiver(m2m_changed, sender=Student.subject.through)
+def student_subjects_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # subject.student_set.add(...) etc.
+        subject_pks = [instance.pk]
+    elif action == 'pre_clear':
+        subject_pks = list(instance.subject.values_list('pk', flat=True))
+    else:
+        subject_pks = list(pk_set)
+    keys = [('subject', pk) for pk in subject_pks]
+    keys.extend(
+        ('lesson', pk) for pk in Lesson.objects.filter(
+            subject__in=subject_pks).values_list('pk', flat=True))
+    _bump_on_commit(keys)
+
+
+@receiver(m2m_changed, sender=Subject.homeroom.through)
+def subject_homerooms_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # homeroom.subject_set.add(...) etc.
+        homeroom_pks = [instance.pk]
+    elif action == 'pre_clear':
+        homeroom_pks = list(instance.homeroom.values_list('pk', flat=True))
+    else:
+        homeroom_pks = list(pk_set)
+    _bump_on_commit(('homeroom', pk) for pk in homeroom_pks)
@@ -0,0 +1,195 @@
+""" Score statistics for many HomeRooms, Subjects or Lessons at once.
+    Graph.get_generalstats_dict() reports the mean of the score models' average scores,
+    the median of their median scores and the mean of their standard deviations, all
+    based on every student's best score (in percent of max_score) per score model.
+    The functions in here let the database do that work: the best scores are read from
+    BestScore and the per-score-model numbers (count, avg, min, max, stddev, median) are
+    SQL aggregates, so only one row per (group, score model) ever leaves the database,
+    no matter how many scores there are.
+    Medians use PERCENTILE_CONT on PostgreSQL, standard deviations STDDEV_SAMP wherever it
+    copes with single scores (not on SQLite, where Django's version raises). Otherwise the
+    (sorted) best scores are streamed instead, holding a single score model's scores at a
+    time, and the standard deviation is taken around their mean by statistics.stdev(). """
+
+from django.db import connection
+from django.db.models import (Aggregate, Avg, Count, Exists, F, FloatField,
+                                Max, Min, OuterRef, StdDev, Subquery)
+
+from .models import Exam, Assignment, LessonTest, Homework, Student, BestScore
+
+import itertools
+import statistics
+
+import pandas as pd
+
+SCORED_ITEMS = {
+    'exam': Exam,
+    'assignment': Assignment,
+    'lessontest': LessonTest,
+    'homework': Homework,
+}
+
+# Score model => lookups of the Subject and the Lesson it belongs to
+SUBJECT_LOOKUPS = {
+    'exam': 'subject',
+    'assignment': 'subject',
+    'lessontest': 'lesson__subject',
+    'homework': 'lesson__subject',
+}
+LESSON_LOOKUPS = {
+    'lessontest': 'lesson',
+    'homework': 'lesson',
+}
+
+ITEM_STAT_COLUMNS = ['Group', 'Model', 'Item', 'Count', 'Avg', 'Min', 'Max', 'Std', 'Median']
+
+
+class Median(Aggregate):
+    """ PostgreSQL's continuous median. """
+    function = 'PERCENTILE_CONT'
+    name = 'Median'
+    template = '%(function)s(0.5) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+
+def database_median():
+    """ Whether the database can calculate medians by itself. """
+    return connection.vendor == 'postgresql'
+
+
+def database_stddev():
+    """ Whether the database can calculate sample standard deviations by itself. """
+    return connection.vendor != 'sqlite'
+
+
+def _grouped_best_scores(model_name: str, group_by: str, pks):
+    """ Best scores of one kind of score model that count towards each
+        HomeRoom / Subject / Lesson in <pks>, with the group's pk annotated as 'group'.
+        OUTPUT: QuerySet or None (the score model can't belong to this kind of group) """
+    item_model = SCORED_ITEMS[model_name]
+    subject_lookup = SUBJECT_LOOKUPS[model_name]
+    scores = BestScore.objects.filter(model=model_name).order_by()
+
+    if group_by == 'homeroom':
+        # The students' own homerooms, for the subjects linked to them
+        linked = item_model.objects.filter(
+            pk=OuterRef('object_id'),
+            **{'{}__homeroom'.format(subject_lookup): OuterRef('student__homeroom')})
+        return scores.filter(student__homeroom__in=pks).filter(Exists(linked)).annotate(
+            group=F('student__homeroom'))
+
+    if group_by == 'subject':
+        group_lookup = subject_lookup
+        enrolled = Student.subject.through.objects.filter(
+            student=OuterRef('student'), subject=OuterRef('group'))
+    elif model_name in LESSON_LOOKUPS:
+        group_lookup = LESSON_LOOKUPS[model_name]
+        enrolled = Student.subject.through.objects.filter(
+            student=OuterRef('student'), subject__lesson=OuterRef('group'))
+    else:
+        return None
+    items = item_model.objects.filter(**{'{}__in'.format(group_lookup): pks})
+    # Scores of students that have left the subject don't count
+    return scores.filter(object_id__in=items.values('pk')).annotate(
+        group=Subquery(items.filter(pk=OuterRef('object_id')).values(group_lookup)[:1])
+    ).filter(Exists(enrolled))
+
+
+def _streamed_stats(scores):
+    """ Median and sample standard deviation per (group, score model), reading the sorted
+        scores one at a time and holding a single score model's scores.
+        OUTPUT: dict {(group, object_id): (median, std or None)} """
+    rows = scores.exclude(percent=None).order_by('group', 'object_id', 'percent').values_list(
+        'group', 'object_id', 'percent').iterator()
+    stats = {}
+    for key, group in itertools.groupby(rows, key=lambda row: (row[0], row[1])):
+        percents = [percent for _, _, percent in group]
+        stats[key] = (statistics.median(percents),
+                      statistics.stdev(percents) if len(percents) > 1 else None)
+    return stats
+
+
+def item_stats(group_by: str, pks):
+    """ Per score model statistics of the best scores, for each HomeRoom, Subject or
+        Lesson in <pks>: count, avg, min, max, sample standard deviation and median,
+        in percent of the score models' max_score.
+        params: group_by (str) = 'homeroom' / 'subject' / 'lesson', pks (list of int)
+        OUTPUT: DataFrame ['Group', 'Model', 'Item', 'Count', 'Avg', 'Min', 'Max', 'Std', 'Median'] """
+    records = []
+    for model_name in SCORED_ITEMS:
+        scores = _grouped_best_scores(model_name, group_by, pks)
+        if scores is None:
+            continue
+
+        aggregates = {
+            'count': Count('percent'),
+            'avg': Avg('percent'),
+            'min': Min('percent'),
+            'max': Max('percent'),
+        }
+        if database_median():
+            aggregates['median'] = Median('percent')
+        if database_stddev():
+            aggregates['std'] = StdDev('percent', sample=True)
+        rows = scores.values('group', 'object_id').annotate(**aggregates).order_by()
+
+        streamed = {} if database_median() and database_stddev() else _streamed_stats(scores)
+        for row in rows:
+            count = row['count']
+            if not count:
+                continue
+            median, std = streamed.get((row['group'], row['object_id']), (None, None))
+            if database_median():
+                median = row['median']
+            if database_stddev():
+                std = row['std']
+            records.append((
+                row['group'], model_name, row['object_id'], count,
+                row['avg'], row['min'], row['max'], std, median
+            ))
+
+    return pd.DataFrame.from_records(records, columns=ITEM_STAT_COLUMNS)
+
+
+def generalstats(group_by: str, objects):
+    """ Graph.get_generalstats_dict()'s numbers for every object in <objects>.
+        params: group_by (str) = 'homeroom' / 'subject' / 'lesson', objects (QuerySet or list)
+        OUTPUT: dict {object: {"Avg. score": ..., "Median score": ..., "Std. Dev.": ...}}
+                (NaNs for objects without scores) """
+    objects = list(objects)
+    stats = item_stats(group_by, [obj.pk for obj in objects])
+    per_group = stats.astype({'Avg': 'float64', 'Median': 'float64', 'Std': 'float64'}).groupby(
+        'Group').agg({'Avg': 'mean', 'Median': 'median', 'Std': 'mean'})
+    per_group = per_group.reindex([obj.pk for obj in objects])
+    return {
+        obj: {
+            "Avg. score": round(avg, 1),
+            "Median score": median,
+            "Std. Dev.": round(std, 2),
+        } for obj, (avg, median, std) in zip(
+            objects, per_group[['Avg', 'Median', 'Std']].itertuples(index=False))
+    }
+
+
+def homeroom_stats(homerooms):
+    """ Same stats as Graph(homeroom).get_generalstats_dict(), for many HomeRooms:
+        the scores of each HomeRoom's students for the subjects linked to that HomeRoom.
+        params: homerooms (QuerySet or list of HomeRoom)
+        OUTPUT: dict {homeroom: {"Avg. score": ..., "Median score": ..., "Std. Dev.": ...}} """
+    return generalstats('homeroom', homerooms)
+
+
+def subject_stats(subjects):
+    """ Same stats as Graph(subject).get_generalstats_dict(), for many Subjects:
+        the scores of each Subject's students for that Subject's score models.
+        params: subjects (QuerySet or list of Subject)
+        OUTPUT: dict {subject: {"Avg. score": ..., "Median score": ..., "Std. Dev.": ...}} """
+    return generalstats('subject', subjects)
+
+
+def lesson_stats(lessons):
+    """ Same stats as Graph(lesson).get_generalstats_dict(), for many Lessons:
+        the scores of each Lesson's students for its LessonTests and Homeworks.
+        params: lessons (QuerySet or list of Lesson)
+        OUTPUT: dict {lesson: {"Avg. score": ..., "Median score": ..., "Std. Dev.": ...}} """
+    return generalstats('lesson', lessons)
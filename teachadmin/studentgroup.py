@@ -0,0 +1,128 @@
+""" Class statistics of a HomeRoom or Subject over any number of score columns.
+    StudentGroup takes a student x score column DataFrame (by default every score model's
+    best scores in percent, see scorematrix.py) and computes count, mean, std, min, quartiles
+    and max of every column with a single DataFrame.describe() call; z-scores are derived from
+    the same numbers in one vectorized step.
+    student_group() keeps the result in Django's cache under the group's ScoreDataVersion,
+    so it is only computed again once the scores behind the group have changed.
+    Settings:
+        TEACHADMIN_STATS_CACHE_TIMEOUT (int): seconds a group's statistics are kept
+            (default: one day) """
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import ScoreDataVersion
+from .scorematrix import build_score_matrix, column_name
+from .scoretree import load_score_model_tree
+
+import pandas as pd
+
+DECIMALS = 2
+
+DEFAULT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# describe() row => name used in templates (which can't look up '25%')
+STAT_NAMES = {
+    'count': 'count',
+    'mean': 'mean',
+    'std': 'std',
+    'min': 'min',
+    '25%': 'q1',
+    '50%': 'median',
+    '75%': 'q3',
+    'max': 'max',
+}
+
+
+class StudentGroup():
+    """ Descriptive statistics of a group of students' scores.
+        params: scores (DataFrame, one row per student and one column per score column;
+                non-numeric columns such as 'Student' or 'Gender' are left out) """
+
+    def __init__(self, scores: pd.DataFrame):
+        self.scores = scores.select_dtypes('number').dropna(axis=1, how='all')
+        if self.scores.columns.empty:
+            self.summary = pd.DataFrame(index=list(STAT_NAMES), dtype='float64')
+        else:
+            self.summary = self.scores.describe().reindex(list(STAT_NAMES))
+
+    def __str__(self):
+        return self.summary.round(DECIMALS).to_string()
+
+    def __getitem__(self, column):
+        """ The statistics of a single score column.
+            OUTPUT: dict {'count': ..., 'mean': ..., ..., 'max': ...} (rounded) """
+        return self.summary[column].round(DECIMALS).rename(STAT_NAMES).to_dict()
+
+    @property
+    def columns(self):
+        return list(self.summary.columns)
+
+    @property
+    def mean(self):
+        return self.summary.loc['mean']
+
+    @property
+    def std(self):
+        return self.summary.loc['std']
+
+    @property
+    def min(self):
+        return self.summary.loc['min']
+
+    @property
+    def max(self):
+        return self.summary.loc['max']
+
+    def zscores(self):
+        """ How many (sample) standard deviations each score lies above its column's mean.
+            OUTPUT: DataFrame shaped like scores (NaN for missing scores and for columns
+                    without spread) """
+        std = self.std.where(self.std > 0)
+        return (self.scores - self.mean) / std
+
+    def rows(self):
+        """ One dict per score column, for tables in templates.
+            OUTPUT: list of {'column': ..., 'count': ..., 'mean': ..., 'q1': ..., ...} """
+        table = self.summary.round(DECIMALS).rename(index=STAT_NAMES).T
+        return [
+            dict(column=column, **stats)
+            for column, stats in zip(table.index, table.to_dict('records'))
+        ]
+
+
+def group_scores(group):
+    """ Every student's best score (in percent) per score model of a HomeRoom or Subject.
+        params: group (HomeRoom or Subject)
+        OUTPUT: DataFrame indexed by student pk, one column per score model (its name) """
+    load_score_model_tree(group)
+    students = list(group.students())
+    score_models = group.get_score_models()
+    matrix = build_score_matrix(students, score_models)
+    if matrix.empty:
+        return pd.DataFrame()
+    scores = matrix.drop(columns=['Student', 'Gender'])
+    scores.index = [student.pk for student in students]
+    # Score model names instead of the matrix's '<name>(<pk>)' labels, unless they're ambiguous
+    names = {column_name(item): str(item) for item in score_models}
+    names = {label: names[label] for label in scores.columns}
+    if len(set(names.values())) == len(names):
+        scores = scores.rename(columns=names)
+    return scores
+
+
+def _cache_key(group, version: int):
+    return "teachadmin-studentgroup-{}-{}-{}".format(group._meta.model_name, group.pk, version)
+
+
+def student_group(group):
+    """ The StudentGroup of a HomeRoom or Subject for the current version of its scores.
+        params: group (HomeRoom or Subject)
+        OUTPUT: StudentGroup """
+    key = _cache_key(group, ScoreDataVersion.get_for(group).version)
+    stats = cache.get(key)
+    if stats is None:
+        stats = StudentGroup(group_scores(group))
+        cache.set(key, stats, getattr(settings, 'TEACHADMIN_STATS_CACHE_TIMEOUT', DEFAULT_CACHE_TIMEOUT))
+    return stats
@@ -0,0 +1,137 @@
+""" Point layout for TeachAdmin's score graphs.
+    seaborn's swarmplot places every point one at a time while checking it against
+    all the points already placed, which gets very slow (and starts warning about
+    overlapping points) once a category holds hundreds of scores.
+    The layout in here bins the scores by height instead and spreads the points of
+    each bin sideways with a handful of NumPy operations, so drawing stays roughly
+    linear in the number of scores. Categories with more than
+    settings.TEACHADMIN_SWARM_MAX_POINTS scores (default: 500) are drawn as a
+    violin (density) plot instead. """
+
+from django.conf import settings
+
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+DEFAULT_MAX_POINTS = 500
+
+
+def beeswarm_offsets(values, bin_height: float, step: float):
+    """ Calculates the horizontal offset of every point in a beeswarm.
+        Points whose values fall within the same bin (of height <bin_height>) are
+        laid out side by side: 0, +step, -step, +2*step, -2*step ...
+        params: values (array-like), bin_height (float), step (float)
+        OUTPUT: numpy array with one x-offset per value """
+    values = np.asarray(values, dtype='float64')
+    if values.size == 0:
+        return np.zeros(0)
+    if bin_height <= 0:
+        bin_height = 1.0
+
+    bins = np.floor((values - values.min()) / bin_height).astype('int64')
+    order = np.lexsort((values, bins))
+    sorted_bins = bins[order]
+
+    # Position of every point within its own bin
+    starts = np.r_[0, np.flatnonzero(np.diff(sorted_bins)) + 1]
+    counts = np.diff(np.r_[starts, sorted_bins.size])
+    rank = np.arange(sorted_bins.size) - np.repeat(starts, counts)
+
+    # 0, +1, -1, +2, -2 ... with bins holding an even number of points shifted half a step
+    slots = (rank + 1) // 2 * np.where(rank % 2 == 1, 1, -1)
+    slots = slots - np.where(np.repeat(counts % 2 == 0, counts), 0.5, 0.0)
+
+    offsets = np.empty(values.size)
+    offsets[order] = slots * step
+    return offsets
+
+
+def _point_size_in_data_units(axes, n_categories: int, size: float):
+    """ Converts a marker diameter (in points) into data units along both axes. """
+    fig = axes.figure
+    bbox = axes.get_position()
+    width_px = bbox.width * fig.get_figwidth() * fig.dpi
+    height_px = bbox.height * fig.get_figheight() * fig.dpi
+    diameter_px = size * fig.dpi / 72
+
+    ymin, ymax = axes.get_ylim()
+    bin_height = (ymax - ymin) * diameter_px / height_px
+    step = n_categories * diameter_px / width_px
+    return bin_height, step
+
+
+def swarmplot(axes, data: pd.DataFrame, hue: pd.Series = None, palette='bright',
+                size: float = 8, edgecolor='white', linewidth: float = 1,
+                width: float = 0.8, max_points: int = None):
+    """ Draws one swarm per (numeric) column of <data> onto <axes>.
+        The axes' y-limits should be set BEFORE calling this, as they decide how
+        close points can get before they have to move aside.
+        params:
+            axes (Axes)
+            data (DataFrame): one column per category, NaN for missing scores
+            hue (Series): optional, aligned with data's rows - colours the points
+                per hue level (e.g. Gender) and adds a legend entry for each level
+            width (float): maximum width of a swarm (1 = distance between categories)
+            max_points (int): categories with more points are drawn as violins
+        OUTPUT: None """
+    if max_points is None:
+        max_points = getattr(settings, 'TEACHADMIN_SWARM_MAX_POINTS', DEFAULT_MAX_POINTS)
+
+    columns = list(data.columns)
+    n_categories = max(len(columns), 1)
+    bin_height, step = _point_size_in_data_units(axes, n_categories, size)
+
+    if hue is not None:
+        hue = pd.Series(hue).reset_index(drop=True)
+        levels = list(pd.unique(hue.dropna()))
+        colors = dict(zip(levels, sns.color_palette(palette, len(levels))))
+    else:
+        colors = sns.color_palette(palette, n_categories)
+
+    points = {}
+    for position, column in enumerate(columns):
+        values = data[column].reset_index(drop=True)
+        present = values.notna().to_numpy()
+        y = values[present].to_numpy(dtype='float64')
+        if y.size == 0:
+            continue
+
+        if y.size > max_points:
+            parts = axes.violinplot(y, positions=[position], widths=width,
+                                    showmedians=True, showextrema=False)
+            color = colors[position] if hue is None else 'grey'
+            for body in parts['bodies']:
+                body.set_facecolor(color)
+                body.set_edgecolor(edgecolor)
+                body.set_alpha(0.8)
+            parts['cmedians'].set_color(edgecolor)
+            continue
+
+        offsets = beeswarm_offsets(y, bin_height, step)
+        widest = np.abs(offsets).max()
+        if widest > width / 2:
+            # Squeeze the swarm back into its category, letting points overlap
+            offsets = offsets * (width / 2) / widest
+        x = position + offsets
+
+        if hue is None:
+            points.setdefault(position, []).append((x, y))
+        else:
+            levels_here = hue[present].to_numpy()
+            for level in levels:
+                mask = levels_here == level
+                points.setdefault(level, []).append((x[mask], y[mask]))
+
+    for key, parts in points.items():
+        color = colors[key]
+        axes.scatter(
+            np.concatenate([x for x, _ in parts]),
+            np.concatenate([y for _, y in parts]),
+            s=size ** 2, color=color, edgecolors=edgecolor, linewidths=linewidth,
+            label=key if hue is not None else None, zorder=3
+        )
+
+    axes.set_xticks(range(len(columns)))
+    axes.set_xticklabels([str(column) for column in columns])
+    axes.set_xlim(-0.5, n_categories - 0.5)
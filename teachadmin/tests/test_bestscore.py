@@ -0,0 +1,104 @@
+from django.test import TestCase
+
+from ..models import Exam, ExamScore, Lesson, Homework, HomeworkScore, BestScore
+from .utils import make_teacher, make_class
+
+
+class BestScoreSignalTests(TestCase):
+    """ The signal handlers keep BestScore in step with the score tables. """
+
+    @classmethod
+    def setUpTestData(cls):
+        teacher = make_teacher()
+        _, cls.subject, cls.students = make_class(teacher)
+        cls.exam = Exam.objects.create(name="Midterm", subject=cls.subject, max_score=50)
+        cls.other_exam = Exam.objects.create(name="Final", subject=cls.subject)
+
+    def best(self, student, item=None):
+        item = item or self.exam
+        return BestScore.objects.filter(
+            student=student, model=item._meta.model_name, object_id=item.pk).first()
+
+    def test_save_keeps_the_best_score(self):
+        student = self.students[0]
+        ExamScore.objects.create(exam=self.exam, student=student, score=20)
+        ExamScore.objects.create(exam=self.exam, student=student, score=35)
+        ExamScore.objects.create(exam=self.exam, student=student, score=30)
+        best = self.best(student)
+        self.assertEqual(best.score, 35)
+        self.assertEqual(best.percent, 70.0)
+
+    def test_lowering_a_score_lowers_the_best_score(self):
+        score = ExamScore.objects.create(exam=self.exam, student=self.students[0], score=40)
+        score.score = 10
+        score.save()
+        self.assertEqual(self.best(self.students[0]).score, 10)
+
+    def test_delete_falls_back_to_the_next_best_score(self):
+        student = self.students[0]
+        ExamScore.objects.create(exam=self.exam, student=student, score=20)
+        top = ExamScore.objects.create(exam=self.exam, student=student, score=45)
+        top.delete()
+        self.assertEqual(self.best(student).score, 20)
+
+    def test_deleting_the_last_score_removes_the_best_score(self):
+        score = ExamScore.objects.create(exam=self.exam, student=self.students[0], score=20)
+        score.delete()
+        self.assertIsNone(self.best(self.students[0]))
+
+    def test_moving_a_score_to_another_student(self):
+        first, second = self.students[:2]
+        ExamScore.objects.create(exam=self.exam, student=first, score=10)
+        score = ExamScore.objects.create(exam=self.exam, student=first, score=40)
+        score.student = second
+        score.save()
+        self.assertEqual(self.best(first).score, 10)
+        self.assertEqual(self.best(second).score, 40)
+
+    def test_moving_a_score_to_another_exam(self):
+        student = self.students[0]
+        score = ExamScore.objects.create(exam=self.exam, student=student, score=40)
+        score.exam = self.other_exam
+        score.save()
+        self.assertIsNone(self.best(student))
+        self.assertEqual(self.best(student, self.other_exam).score, 40)
+
+    def test_changing_max_score_recalculates_percentages(self):
+        ExamScore.objects.create(exam=self.exam, student=self.students[0], score=40)
+        self.exam.max_score = 80
+        self.exam.save()
+        self.assertEqual(self.best(self.students[0]).percent, 50.0)
+
+    def test_other_changes_leave_the_best_scores_alone(self):
+        exam = Exam.objects.create(name="Quiz", subject=self.subject, max_score=50)
+        ExamScore.objects.create(exam=exam, student=self.students[0], score=40)
+        best = self.best(self.students[0], exam)
+        exam.name = "Pop quiz"
+        exam.save()
+        exam.max_score = 80
+        exam.save(update_fields=['name'])
+        self.assertEqual(self.best(self.students[0], exam).pk, best.pk)
+        self.assertEqual(self.best(self.students[0], exam).percent, 80.0)
+
+    def test_max_score_of_zero_has_no_percentage(self):
+        homework = Homework.objects.create(
+            name="Reading", lesson=Lesson.objects.create(name="Fractions", subject=self.subject),
+            max_score=0)
+        HomeworkScore.objects.create(homework=homework, student=self.students[0], score=0)
+        self.assertIsNone(self.best(self.students[0], homework).percent)
+
+    def test_deleting_the_exam_removes_its_best_scores(self):
+        exam = Exam.objects.create(name="Quiz", subject=self.subject)
+        ExamScore.objects.create(exam=exam, student=self.students[0], score=5)
+        exam_pk = exam.pk
+        exam.delete()
+        self.assertFalse(BestScore.objects.filter(model='exam', object_id=exam_pk).exists())
+
+    def test_rebuild_matches_the_signals(self):
+        for score, student in zip((10, 25, 50), self.students):
+            ExamScore.objects.create(exam=self.exam, student=student, score=score)
+        kept = set(BestScore.objects.values_list('student', 'model', 'object_id', 'score', 'percent'))
+        BestScore.objects.all().delete()
+        self.assertEqual(BestScore.rebuild(), 3)
+        rebuilt = set(BestScore.objects.values_list('student', 'model', 'object_id', 'score', 'percent'))
+        self.assertEqual(rebuilt, kept)
@@ -0,0 +1,106 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from ..bulkscores import enter_scores, best_scores
+from ..models import Exam, ExamScore, Lesson, LessonTest, LessonTestScore, BestScore
+from .utils import make_teacher, make_class
+
+
+class EnterScoresTests(TestCase):
+    """ A whole class's scores are saved together, or not at all. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_teacher()
+        _, cls.subject, cls.students = make_class(cls.teacher)
+        cls.exam = Exam.objects.create(name="Midterm", subject=cls.subject, min_score=10, max_score=50)
+        ExamScore.objects.create(exam=cls.exam, student=cls.students[0], score=30)
+
+    def best(self):
+        return {pk: best.score for pk, best in best_scores(self.exam).items()}
+
+    def test_valid_scores_are_saved(self):
+        first, second, third = self.students
+        entries, errors = enter_scores(self.exam, {first: 40, second: 25, third: 50})
+        self.assertEqual(errors, {})
+        self.assertEqual(len(entries), 3)
+        self.assertEqual(ExamScore.objects.filter(exam=self.exam).count(), 4)
+        self.assertEqual(self.best(), {first.pk: 40, second.pk: 25, third.pk: 50})
+        self.assertEqual(BestScore.objects.get(student=third, model='exam').percent, 100.0)
+
+    def test_invalid_rows_are_reported_and_nothing_is_saved(self):
+        first, second, third = self.students
+        entries, errors = enter_scores(self.exam, {first: 20, second: 51, third: 5})
+        self.assertEqual(entries, [])
+        self.assertEqual(sorted(errors), [first.pk, second.pk, third.pk])
+        self.assertIn("already has a higher score", errors[first.pk][0])
+        self.assertIn("higher than exam's maximum", errors[second.pk][0])
+        self.assertIn("lower than exam's minimum", errors[third.pk][0])
+        self.assertEqual(ExamScore.objects.filter(exam=self.exam).count(), 1)
+        self.assertEqual(self.best(), {first.pk: 30})
+
+    def test_one_invalid_row_stops_the_batch(self):
+        first, second, third = self.students
+        entries, errors = enter_scores(self.exam, {first: 45, second: 60, third: 20})
+        self.assertEqual(list(errors), [second.pk])
+        self.assertEqual(ExamScore.objects.filter(exam=self.exam).count(), 1)
+
+    def test_lesson_tests_need_a_better_score(self):
+        test = LessonTest.objects.create(
+            name="Quiz", lesson=Lesson.objects.create(name="Fractions", subject=self.subject))
+        LessonTestScore.objects.create(lessonTest=test, student=self.students[0], score=60)
+        _, errors = enter_scores(test, {self.students[0]: 60})
+        self.assertIn(self.students[0].pk, errors)
+
+    def test_best_scores_are_read_once(self):
+        scores = {student: 40 for student in self.students}
+        # Best scores, the insert of the scores, the insert and update of BestScores,
+        # the homerooms of the subject (for the version bumps), plus the savepoint
+        with self.assertNumQueries(7):
+            enter_scores(self.exam, scores)
+
+
+class BulkScoreViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_teacher()
+        _, cls.subject, cls.students = make_class(cls.teacher)
+        cls.exam = Exam.objects.create(name="Midterm", subject=cls.subject)
+
+    def setUp(self):
+        self.client.force_login(self.teacher.user)
+        self.url = reverse("teachadmin:exam_bulk_scores", kwargs={
+            "subject_pk": self.subject.pk, "exam_pk": self.exam.pk})
+
+    def test_grid_has_a_field_per_student(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.context['form'].fields),
+                         sorted('student_{}'.format(student.pk) for student in self.students))
+
+    def test_errors_are_shown_per_student(self):
+        first, second, _ = self.students
+        response = self.client.post(self.url, {
+            'student_{}'.format(first.pk): 80,
+            'student_{}'.format(second.pk): 101,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('student_{}'.format(second.pk), response.context['form'].errors)
+        self.assertFalse(ExamScore.objects.exists())
+
+    def test_empty_fields_are_skipped(self):
+        response = self.client.post(self.url, {'student_{}'.format(self.students[0].pk): 80})
+        self.assertRedirects(response, self.exam.get_absolute_url(), fetch_redirect_response=False)
+        self.assertEqual(list(ExamScore.objects.values_list('student', 'score')),
+                         [(self.students[0].pk, 80)])
+
+    def test_anonymous_requests_are_redirected_first(self):
+        self.client.logout()
+        missing = reverse("teachadmin:exam_bulk_scores", kwargs={
+            "subject_pk": self.subject.pk, "exam_pk": self.exam.pk + 100})
+        for url in (self.url, missing):
+            with self.assertNumQueries(0):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 302)
+            self.assertIn('login', response['Location'])
@@ -0,0 +1,82 @@
+from django.test import TestCase, SimpleTestCase
+from django.urls import reverse
+
+from ..comments import (CommentRule, CommentEngine, compile_template, group_comments,
+                        group_comment_sections)
+from ..models import Student, Exam, ExamScore, Assignment, AssignmentScore
+from .utils import make_teacher, make_class
+
+import numpy as np
+import pandas as pd
+
+RULE = CommentRule("Exams", 'exam', [
+    (90, "{name} aced it with {score}%."),
+    (60, "{They} passed, {their} score was {score}%."),
+    (None, "{name} missed {lost}%."),
+], above_average=" Above {average}%.")
+
+
+class CommentRuleTests(SimpleTestCase):
+
+    def test_templates_are_checked_up_front(self):
+        self.assertEqual(compile_template("{name} scored {score}%."),
+                         [("", 'name'), (" scored ", 'score'), ("%.", None)])
+        with self.assertRaises(ValueError):
+            compile_template("{nmae} scored")
+        with self.assertRaises(ValueError):
+            compile_template("{score:.2f}")
+        with self.assertRaises(ValueError):
+            CommentRule("Exams", 'exam', [(90, "{name}")])
+
+    def test_every_student_gets_their_bin(self):
+        scores = pd.Series([95.0, 90.0, 72.5, 10.0, np.nan])
+        self.assertEqual(list(RULE.bins(scores)), [0, 0, 1, 2, -1])
+
+    def test_generate(self):
+        frame = pd.DataFrame({
+            'Name': [" ann ", "bo", "cy"],
+            'Gender': ['F', 'M', 'X'],
+            'exam': [95.0, 60.0, np.nan],
+        })
+        comments = CommentEngine([RULE]).generate(frame)
+        self.assertEqual(list(comments), [
+            "Exams:\n\tAnn aced it with 95%. Above 77.5%.",
+            "Exams:\n\tHe passed, his score was 60%.",
+            "",
+        ])
+
+
+class GroupCommentTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_teacher()
+        cls.homeroom, cls.subject, cls.students = make_class(cls.teacher)
+        exam = Exam.objects.create(name="Midterm", subject=cls.subject, max_score=50)
+        assignment = Assignment.objects.create(name="Essay", subject=cls.subject)
+        first, second, _ = cls.students
+        ExamScore.objects.create(exam=exam, student=first, score=50)
+        ExamScore.objects.create(exam=exam, student=second, score=20)
+        AssignmentScore.objects.create(assignment=assignment, student=first, score=70)
+        Student.objects.filter(pk=second.pk).update(gender=Student.MALE)
+
+    def test_sections_per_student(self):
+        sections = group_comment_sections(self.subject)
+        first, second, third = self.students
+        self.assertEqual([title for title, _ in sections[first]], ["Exams", "Assignments", "Overall"])
+        self.assertEqual([title for title, _ in sections[second]], ["Exams", "Overall"])
+        self.assertEqual(sections[third], [])
+        self.assertTrue(sections[first][0][1].startswith("Student1 got a perfect score on the exams!"))
+        self.assertIn("guidance, I have no doubt Student2's", sections[second][0][1])
+
+    def test_homerooms_and_subjects_agree(self):
+        self.assertEqual(group_comments(self.homeroom), group_comments(self.subject))
+
+    def test_download(self):
+        self.client.force_login(self.teacher.user)
+        response = self.client.get(reverse("teachadmin:subject_comments", kwargs={"pk": self.subject.pk}))
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertIn('attachment', response['Content-Disposition'])
+        text = response.content.decode()
+        self.assertIn("Student1 1A\n-----------\n\nExams:", text)
+        self.assertIn("Student3 1A\n-----------\n\nNo scores yet.", text)
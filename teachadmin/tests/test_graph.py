@@ -0,0 +1,57 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from ..graph import Graph
+from ..graphcache import graph_cache
+from ..models import Exam, ExamScore
+from .utils import make_teacher, make_class
+
+import shutil
+import tempfile
+
+
+class LazyGraphTests(TestCase):
+    """ Graph only builds its DataFrame, image and stats when they are asked for, once. """
+
+    @classmethod
+    def setUpTestData(cls):
+        _, cls.subject, students = make_class(make_teacher())
+        cls.exam = Exam.objects.create(name="Midterm", subject=cls.subject)
+        for score, student in zip((40, 70, 90), students):
+            ExamScore.objects.create(exam=cls.exam, student=student, score=score)
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        patcher = mock.patch.object(graph_cache, 'directory', directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_construction_runs_no_queries(self):
+        with self.assertNumQueries(0):
+            Graph(self.exam)
+            Graph(self.subject, 'df')
+
+    def test_dataframe_is_built_once(self):
+        graph = Graph(self.exam)
+        self.assertEqual(sorted(graph.df['Midterm']), [40, 70, 90])
+        with self.assertNumQueries(0):
+            graph.df
+
+    def test_image_is_rendered_once(self):
+        graph = Graph(self.subject)
+        png = graph.get_image('png')
+        self.assertTrue(png.startswith(b'\x89PNG'))
+        with self.assertNumQueries(0), mock.patch.object(Graph, '_render') as render:
+            self.assertEqual(graph.get_image('png'), png)
+            self.assertTrue(graph.uri)
+        render.assert_not_called()
+
+    def test_stats_are_read_once(self):
+        graph = Graph(self.subject)
+        stats = graph.get_generalstats_dict()
+        self.assertEqual(stats["Avg. score"], 66.7)
+        with self.assertNumQueries(0):
+            self.assertEqual(graph.get_generalstats_dict(), stats)
+        self.assertFalse(Graph(self.exam).get_generalstats_dict())
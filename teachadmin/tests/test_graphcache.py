@@ -0,0 +1,88 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from ..graph import Graph, graph_image
+from ..graphcache import GraphCache, graph_cache
+from ..models import Exam, ExamScore, ScoreDataVersion
+from .utils import make_teacher, make_class
+
+import os
+import shutil
+import tempfile
+
+
+class GraphCacheTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.cache = GraphCache(self.directory, max_bytes=100)
+
+    def test_get_and_set(self):
+        self.assertIsNone(self.cache.get('exam', 1, 0))
+        self.cache.set('exam', 1, 0, b'png bytes')
+        self.assertEqual(self.cache.get('exam', 1, 0), b'png bytes')
+        self.assertIsNone(self.cache.get('exam', 1, 0, 'svg'))
+        self.assertIsNone(self.cache.get('exam', 1, 1))
+
+    def test_new_version_replaces_the_old_one(self):
+        self.cache.set('exam', 1, 0, b'old')
+        self.cache.set('exam', 1, 0, b'<svg/>', 'svg')
+        self.cache.set('exam', 1, 1, b'new')
+        self.assertIsNone(self.cache.get('exam', 1, 0))
+        self.assertEqual(self.cache.get('exam', 1, 1), b'new')
+        # Other formats are only replaced by their own new versions
+        self.assertEqual(self.cache.get('exam', 1, 0, 'svg'), b'<svg/>')
+
+    def test_least_recently_used_graphs_are_evicted(self):
+        self.cache.set('exam', 1, 0, b'a' * 40)
+        self.cache.set('exam', 2, 0, b'b' * 40)
+        # Make exam 1 the most recently used one
+        old = os.path.getmtime(self.cache._path('exam', 2, 0, 'png')) - 60
+        os.utime(self.cache._path('exam', 2, 0, 'png'), (old, old))
+        self.cache.get('exam', 1, 0)
+        self.cache.set('exam', 3, 0, b'c' * 40)
+        self.assertIsNone(self.cache.get('exam', 2, 0))
+        self.assertIsNotNone(self.cache.get('exam', 1, 0))
+        self.assertIsNotNone(self.cache.get('exam', 3, 0))
+        self.assertLessEqual(self.cache.size(), 100)
+
+    def test_clear(self):
+        self.cache.set('exam', 1, 0, b'png bytes')
+        self.cache.clear()
+        self.assertEqual(self.cache.size(), 0)
+
+
+class CachedGraphTests(TestCase):
+    """ Graphs are rendered once per ScoreDataVersion. """
+
+    @classmethod
+    def setUpTestData(cls):
+        _, subject, students = make_class(make_teacher())
+        cls.exam = Exam.objects.create(name="Midterm", subject=subject)
+        for score, student in zip((40, 70, 90), students):
+            ExamScore.objects.create(exam=cls.exam, student=student, score=score)
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        patcher = mock.patch.object(graph_cache, 'directory', directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_graph_is_rendered_once_per_version(self):
+        image = graph_image(self.exam, 'png')
+        self.assertTrue(image.startswith(b'\x89PNG'))
+
+        with mock.patch.object(Graph, '_render', side_effect=AssertionError("rendered again")):
+            self.assertEqual(graph_image(self.exam, 'png'), image)
+
+        ScoreDataVersion.bump([('exam', self.exam.pk)])
+        with mock.patch.object(Graph, '_render', return_value=b'new graph') as render:
+            self.assertEqual(graph_image(self.exam, 'png'), b'new graph')
+        render.assert_called_once_with('png')
+
+    def test_no_scores_no_graph(self):
+        exam = Exam.objects.create(name="Final", subject=self.exam.subject)
+        self.assertIsNone(graph_image(exam, 'png'))
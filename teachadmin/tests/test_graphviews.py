@@ -0,0 +1,65 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from ..graphcache import graph_cache
+from ..models import Exam, ExamScore, ScoreDataVersion
+from .utils import make_teacher, make_class
+
+import shutil
+import tempfile
+
+
+class GraphImageViewTests(TestCase):
+    """ The graph endpoint serves raw images with an ETag that follows the ScoreDataVersion. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_teacher()
+        _, subject, students = make_class(cls.teacher)
+        cls.exam = Exam.objects.create(name="Midterm", subject=subject)
+        for score, student in zip((40, 70, 90), students):
+            ExamScore.objects.create(exam=cls.exam, student=student, score=score)
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        patcher = mock.patch.object(graph_cache, 'directory', directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_login(self.teacher.user)
+        self.url = reverse("teachadmin:graph", kwargs={"model": 'exam', "pk": self.exam.pk, "fmt": 'png'})
+
+    def test_png_with_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['ETag'], '"exam-{}-0-png"'.format(self.exam.pk))
+        self.assertTrue(response.content.startswith(b'\x89PNG'))
+
+    def test_not_modified_until_the_version_changes(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        ScoreDataVersion.bump([('exam', self.exam.pk)])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"exam-{}-1-png"'.format(self.exam.pk))
+
+    def test_version_is_read_once(self):
+        self.client.get(self.url)
+        # Session, user, the version, the exam (the graph itself comes from the cache)
+        with self.assertNumQueries(4):
+            self.client.get(self.url)
+
+    def test_unknown_graphs(self):
+        for model, pk, fmt in (('teacher', self.teacher.pk, 'png'), ('exam', self.exam.pk, 'gif'),
+                               ('exam', self.exam.pk + 100, 'png')):
+            url = reverse("teachadmin:graph", kwargs={"model": model, "pk": pk, "fmt": fmt})
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_login_required(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
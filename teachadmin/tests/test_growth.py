@@ -0,0 +1,108 @@
+from django.test import TestCase, SimpleTestCase
+
+from ..growth import growth, improvement_extremes, group_growth, series_items
+from ..models import Subject, Exam, ExamScore, Lesson, LessonTest, LessonTestScore
+from .utils import make_teacher, make_class
+
+import datetime
+import math
+import pandas as pd
+
+
+def scores(*rows):
+    return pd.DataFrame.from_records(
+        rows, columns=['Student', 'Category', 'Number', 'Date', 'Percent'])
+
+
+class GrowthTests(SimpleTestCase):
+    """ Improvement and slope per student and category, checked against hand-computed values. """
+
+    def setUp(self):
+        self.growth = growth(scores(
+            (1, 'A', 0, None, 40.0), (1, 'A', 1, None, 60.0), (1, 'A', 2, None, 50.0),
+            (1, 'B', 0, None, 80.0), (1, 'B', 1, None, 70.0),
+            # Student 2 missed A's second assessment
+            (2, 'A', 2, None, 60.0), (2, 'A', 0, None, 30.0),
+            (2, 'B', 0, None, 50.0), (2, 'B', 1, None, 90.0),
+            (3, 'A', 0, None, 70.0),
+        ))
+
+    def test_growth(self):
+        self.assertEqual(self.growth.loc[(1, 'A')].to_dict(), {
+            'Assessments': 3, 'First': 40.0, 'Last': 50.0, 'Improvement': 10.0,
+            # Numbers 0, 1, 2 around 1, percents 40, 60, 50 around 50: (10 + 0 + 0) / 2
+            'Slope': 5.0,
+        })
+        self.assertEqual(tuple(self.growth.loc[(1, 'B'), ['Improvement', 'Slope']]), (-10.0, -10.0))
+        # Numbers 0 and 2: thirty points over two assessments
+        self.assertEqual(tuple(self.growth.loc[(2, 'A'), ['Improvement', 'Slope']]), (30.0, 15.0))
+        single = self.growth.loc[(3, 'A')]
+        self.assertEqual((single['Assessments'], single['First'], single['Last']), (1, 70.0, 70.0))
+        self.assertTrue(math.isnan(single['Improvement']) and math.isnan(single['Slope']))
+
+    def test_improvement_extremes(self):
+        extremes = improvement_extremes(self.growth)
+        self.assertEqual(list(extremes.index), [1, 2])
+        self.assertEqual(extremes.loc[1].to_dict(), {
+            'Max Category': 'A', 'Max Improvement': 10.0,
+            'Min Category': 'B', 'Min Improvement': -10.0,
+        })
+        self.assertEqual(extremes.loc[2].to_dict(), {
+            'Max Category': 'B', 'Max Improvement': 40.0,
+            'Min Category': 'A', 'Min Improvement': 30.0,
+        })
+        slopes = improvement_extremes(self.growth, 'Slope')
+        self.assertEqual(tuple(slopes.loc[2, ['Max Improvement', 'Min Improvement']]), (40.0, 15.0))
+
+    def test_no_scores(self):
+        empty = growth(scores())
+        self.assertTrue(empty.empty)
+        self.assertEqual(list(empty.columns), ['Assessments', 'First', 'Last', 'Improvement', 'Slope'])
+        self.assertTrue(improvement_extremes(empty).empty)
+
+
+class GroupGrowthTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.homeroom, cls.subject, cls.students = make_class(make_teacher(), students=2)
+        first, second = cls.students
+        # Created out of order: the series follows the dates
+        final = Exam.objects.create(name="Final", subject=cls.subject, max_score=50,
+                                    date=datetime.date(2020, 6, 1))
+        midterm = Exam.objects.create(name="Midterm", subject=cls.subject, max_score=50,
+                                      date=datetime.date(2020, 3, 1))
+        ExamScore.objects.create(exam=midterm, student=first, score=20)
+        ExamScore.objects.create(exam=final, student=first, score=40)
+        ExamScore.objects.create(exam=final, student=second, score=40)
+        lesson = Lesson.objects.create(name="Fractions", subject=cls.subject)
+        for day, score in ((1, 90), (2, 60)):
+            test = LessonTest.objects.create(name="Quiz {}".format(day), lesson=lesson,
+                                             test_date=datetime.date(2020, 4, day))
+            LessonTestScore.objects.create(lessonTest=test, student=first, score=score)
+        cls.science = Subject.objects.create(name="Science", school=cls.homeroom.school)
+        cls.science.homeroom.add(cls.homeroom)
+        for day, score in ((1, 50), (2, 55)):
+            exam = Exam.objects.create(name="Lab {}".format(day), subject=cls.science,
+                                       date=datetime.date(2020, 5, day))
+            ExamScore.objects.create(exam=exam, student=first, score=score)
+
+    def test_series_items(self):
+        items = series_items(self.subject)
+        self.assertEqual(list(items['Name']), ["Midterm", "Final", "Quiz 1", "Quiz 2"])
+        self.assertEqual(list(items['Category']), ["Exams", "Exams", "Lesson tests", "Lesson tests"])
+
+    def test_subject_categories_are_kinds_of_assessment(self):
+        rows = group_growth(self.subject)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0], {
+            'student': self.students[0],
+            'max_category': "Exams", 'max_improvement': 40.0,
+            'min_category': "Lesson tests", 'min_improvement': -30.0,
+        })
+
+    def test_homeroom_categories_are_subjects(self):
+        rows = group_growth(self.homeroom)
+        self.assertEqual([row['student'] for row in rows], [self.students[0]])
+        self.assertEqual((rows[0]['max_category'], rows[0]['max_improvement']), ("Math 1A", 40.0))
+        self.assertEqual((rows[0]['min_category'], rows[0]['min_improvement']), ("Science", 5.0))
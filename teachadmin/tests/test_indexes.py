@@ -0,0 +1,27 @@
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from ..models import ExamScore, AssignmentScore, LessonTestScore, HomeworkScore
+
+import io
+
+
+class ScoreIndexTests(TestCase):
+
+    def test_score_tables_have_the_composite_indexes(self):
+        for score_model in (ExamScore, AssignmentScore, LessonTestScore, HomeworkScore):
+            item_column = score_model._meta.get_field(score_model.ITEM_FIELD).column
+            with connection.cursor() as cursor:
+                constraints = connection.introspection.get_constraints(cursor, score_model._meta.db_table)
+            indexes = [tuple(info['columns']) for info in constraints.values() if info['index']]
+            self.assertIn((item_column, 'student_id', 'score'), indexes, score_model.__name__)
+            self.assertIn(('student_id', item_column), indexes, score_model.__name__)
+
+    def test_benchmark_leaves_nothing_behind(self):
+        out = io.StringIO()
+        call_command('benchmarkscores', scores=200, exams=2, repeat=1, plans=False, stdout=out, stderr=out)
+        self.assertIn("Score tables are unordered by default.", out.getvalue())
+        self.assertIn("Index timings (ms)", out.getvalue())
+        self.assertFalse(ExamScore.objects.exists())
+        self.test_score_tables_have_the_composite_indexes()
@@ -0,0 +1,97 @@
+from django.test import TestCase
+
+from ..models import (HomeRoom, Subject, Exam, ExamScore, Assignment, AssignmentScore,
+                        Lesson, Homework, HomeworkScore, ScoreEntry)
+from .utils import make_teacher, make_class
+
+
+class CachedRelationTests(TestCase):
+    """ The model helper methods fetch a relation once and keep it. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.homeroom, cls.subject, cls.students = make_class(make_teacher())
+        cls.exam = Exam.objects.create(name="Midterm", subject=cls.subject)
+        ExamScore.objects.create(exam=cls.exam, student=cls.students[0], score=50)
+
+    def test_fetched_once(self):
+        homeroom = HomeRoom.objects.get(pk=self.homeroom.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(homeroom.students())
+            self.assertEqual(len(homeroom.students()), 3)
+            self.assertEqual(homeroom.students(as_list=True)[0], "Student1 1A")
+
+    def test_empty_relations_are_falsy(self):
+        subject = Subject.objects.get(pk=self.subject.pk)
+        with self.assertNumQueries(2):
+            self.assertFalse(subject.get_assignments())
+            self.assertFalse(subject.get_assignments())
+            self.assertFalse(subject.get_lessons())
+
+    def test_prefetched_relations_cost_nothing(self):
+        subject = Subject.objects.prefetch_related('exam_set', 'student_set').get(pk=self.subject.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(list(subject.get_exams()), [self.exam])
+            self.assertEqual(len(subject.students()), 3)
+
+    def test_scores_come_with_their_students(self):
+        exam = Exam.objects.get(pk=self.exam.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual([score.student for score in exam.scores()], self.students[:1])
+            exam.scores()
+
+
+class ScoredItemTests(TestCase):
+    """ Students with several scores for a score model are only listed once. """
+
+    @classmethod
+    def setUpTestData(cls):
+        _, subject, cls.students = make_class(make_teacher())
+        cls.exam = Exam.objects.create(name="Midterm", subject=subject)
+        for score in (20, 40, 60):
+            ExamScore.objects.create(exam=cls.exam, student=cls.students[0], score=score)
+        ExamScore.objects.create(exam=cls.exam, student=cls.students[2], score=80)
+
+    def test_unique_students(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(list(self.exam.students()), [self.students[0], self.students[2]])
+
+    def test_has_score(self):
+        self.assertTrue(self.exam.has_score())
+        self.assertFalse(Exam.objects.create(name="Final", subject=self.exam.subject).has_score())
+
+
+class ScoreEntryTests(TestCase):
+    """ The four score tables share ScoreEntry's helpers and percentages() rows. """
+
+    @classmethod
+    def setUpTestData(cls):
+        _, subject, cls.students = make_class(make_teacher())
+        cls.exam = Exam.objects.create(name="Midterm", subject=subject, max_score=50)
+        cls.assignment = Assignment.objects.create(name="Essay", subject=subject, max_score=20)
+        cls.homework = Homework.objects.create(
+            name="Reading", lesson=Lesson.objects.create(name="Fractions", subject=subject), max_score=0)
+        first, second, _ = cls.students
+        cls.exam_score = ExamScore.objects.create(exam=cls.exam, student=first, score=40)
+        AssignmentScore.objects.create(assignment=cls.assignment, student=second, score=5)
+        HomeworkScore.objects.create(homework=cls.homework, student=first, score=0)
+
+    def test_item_and_percent(self):
+        self.assertEqual(self.exam_score.item, self.exam)
+        self.assertEqual(self.exam_score.percent, 80.0)
+        self.assertEqual(self.exam_score.best_score_key(), ('exam', self.exam.pk, self.students[0].pk))
+
+    def test_percentages_of_every_kind_in_one_query(self):
+        with self.assertNumQueries(1):
+            rows = sorted(ScoreEntry.percentages([self.exam, self.assignment, self.homework]))
+        first, second, _ = self.students
+        self.assertEqual(rows, [
+            ('assignment', self.assignment.pk, second.pk, 5, 25.0),
+            ('exam', self.exam.pk, first.pk, 40, 80.0),
+            ('homework', self.homework.pk, first.pk, 0, None),
+        ])
+
+    def test_percentages_of_some_students(self):
+        rows = list(ScoreEntry.percentages([self.exam, self.assignment], students=self.students[1:]))
+        self.assertEqual([row[0] for row in rows], ['assignment'])
+        self.assertIsNone(ScoreEntry.percentages([]))
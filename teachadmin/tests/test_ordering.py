@@ -0,0 +1,49 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..models import Exam, ExamScore
+from .utils import make_teacher, make_class
+
+
+class ScoreOrderingTests(TestCase):
+    """ The score tables have no Meta.ordering: only for_display() sorts them. """
+
+    @classmethod
+    def setUpTestData(cls):
+        teacher = make_teacher()
+        _, subject, cls.students = make_class(teacher)
+        cls.exam = Exam.objects.create(name="Midterm", subject=subject)
+        for score, student in zip((40, 70, 90), cls.students):
+            ExamScore.objects.create(exam=cls.exam, student=student, score=score)
+
+    def assertNoOrderBy(self, queries):
+        for query in queries:
+            self.assertNotIn("ORDER BY", query['sql'].upper())
+
+    def test_exists_and_count_are_unordered(self):
+        scores = ExamScore.objects.filter(exam=self.exam)
+        with CaptureQueriesContext(connection) as ctx:
+            with self.assertNumQueries(2):
+                self.assertTrue(scores.exists())
+                self.assertEqual(scores.count(), 3)
+        self.assertNoOrderBy(ctx.captured_queries)
+
+    def test_plain_queryset_is_unordered(self):
+        self.assertFalse(ExamScore.objects.filter(exam=self.exam).ordered)
+
+    def test_unordered_drops_display_order(self):
+        scores = ExamScore.objects.filter(exam=self.exam).for_display().unordered()
+        with CaptureQueriesContext(connection) as ctx:
+            with self.assertNumQueries(1):
+                self.assertEqual(len(scores), 3)
+        self.assertNoOrderBy(ctx.captured_queries)
+
+    def test_for_display_keeps_display_ordering(self):
+        scores = ExamScore.objects.filter(exam=self.exam).for_display()
+        self.assertEqual(list(scores.query.order_by), ExamScore.DISPLAY_ORDERING)
+        with CaptureQueriesContext(connection) as ctx:
+            with self.assertNumQueries(1):
+                rows = [score.score for score in scores]
+        self.assertIn("ORDER BY", ctx.captured_queries[0]['sql'].upper())
+        self.assertEqual(rows, [40, 70, 90])
@@ -0,0 +1,54 @@
+from django.test import SimpleTestCase
+
+from ..plotting import figure, to_bytes, graph_style, LIGHT, _RC_LOCK
+
+from concurrent.futures import ThreadPoolExecutor
+import matplotlib
+import threading
+
+
+def draw(fmt='png'):
+    with figure() as (fig, axes):
+        axes.plot([1, 2, 3], [40, 70, 90], marker='o', label="Scores")
+        axes.set_title("Midterm scores")
+        axes.legend(loc='lower left')
+        fig.tight_layout()
+        return to_bytes(fig, fmt)
+
+
+class FigureTests(SimpleTestCase):
+    """ Figures carry their own style instead of changing the global rcParams. """
+
+    def test_rcparams_are_left_alone(self):
+        before = dict(matplotlib.rcParams)
+        with figure() as (fig, axes):
+            self.assertEqual(axes.get_facecolor()[:3], matplotlib.colors.to_rgb(
+                graph_style()['axes.facecolor']))
+            self.assertEqual(dict(matplotlib.rcParams), before)
+
+    def test_light_theme(self):
+        with figure(LIGHT) as (fig, axes):
+            self.assertEqual(axes.get_facecolor()[:3], matplotlib.colors.to_rgb(
+                graph_style(LIGHT)['axes.facecolor']))
+
+    def test_lock_is_free_while_drawing(self):
+        acquired = []
+
+        def other_thread():
+            acquired.append(_RC_LOCK.acquire(timeout=5))
+            _RC_LOCK.release()
+        with figure() as (fig, axes):
+            thread = threading.Thread(target=other_thread)
+            thread.start()
+            thread.join()
+        self.assertEqual(acquired, [True])
+
+    def test_formats(self):
+        self.assertTrue(draw('png').startswith(b'\x89PNG'))
+        self.assertIn(b'<svg', draw('svg'))
+
+    def test_concurrent_renders_match(self):
+        expected = draw()
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            images = list(pool.map(lambda _: draw(), range(8)))
+        self.assertTrue(all(image == expected for image in images))
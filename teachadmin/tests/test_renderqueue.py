@@ -0,0 +1,104 @@
+from unittest import mock
+
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..graphcache import graph_cache
+from ..management.commands.rendergraphs import Command
+from ..models import Exam, ExamScore, GraphRenderJob
+from ..signals import _bump
+from .utils import make_teacher, make_class
+
+import datetime
+import shutil
+import tempfile
+
+
+def pending():
+    return sorted(GraphRenderJob.objects.filter(
+        status=GraphRenderJob.PENDING).values_list('model', 'object_id'))
+
+
+class GraphRenderJobTests(TestCase):
+
+    def test_enqueue_skips_pending_jobs(self):
+        GraphRenderJob.enqueue([('exam', 1), ('subject', 1)])
+        GraphRenderJob.objects.filter(model='subject').update(status=GraphRenderJob.DONE)
+        GraphRenderJob.enqueue([('exam', 1), ('subject', 1), ('homeroom', 2), ('lesson', None)])
+        self.assertEqual(pending(), [('exam', 1), ('homeroom', 2), ('subject', 1)])
+
+    def test_enqueue_is_one_batch(self):
+        # One read of the pending jobs and one insert, however many graphs
+        with self.assertNumQueries(2):
+            GraphRenderJob.enqueue(('exam', pk) for pk in range(1, 60))
+        self.assertEqual(len(pending()), 59)
+
+    def test_one_pending_job_per_graph(self):
+        GraphRenderJob.enqueue([('exam', 1)])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            GraphRenderJob.objects.create(model='exam', object_id=1)
+        # Finished jobs don't count
+        GraphRenderJob.objects.update(status=GraphRenderJob.DONE)
+        GraphRenderJob.objects.create(model='exam', object_id=1)
+
+    @override_settings(TEACHADMIN_GRAPH_WORKER=True)
+    def test_bump_queues_everything_but_timelines(self):
+        _bump([('exam', 1), ('subject', 2), ('student', 3)])
+        self.assertEqual(pending(), [('exam', 1), ('subject', 2)])
+
+    @override_settings(TEACHADMIN_GRAPH_WORKER=False)
+    def test_bump_without_worker(self):
+        _bump([('exam', 1)])
+        self.assertEqual(pending(), [])
+
+    def test_stale_jobs_are_queued_again(self):
+        long_ago = timezone.now() - datetime.timedelta(hours=1)
+        GraphRenderJob.objects.create(model='exam', object_id=1, status=GraphRenderJob.RUNNING, started=long_ago)
+        GraphRenderJob.objects.create(model='exam', object_id=2, status=GraphRenderJob.RUNNING, started=long_ago)
+        GraphRenderJob.objects.create(model='exam', object_id=2)
+        GraphRenderJob.objects.create(model='exam', object_id=3, status=GraphRenderJob.RUNNING,
+                                      started=timezone.now())
+        Command()._requeue_stale()
+        self.assertEqual(pending(), [('exam', 1), ('exam', 2)])
+        self.assertEqual(GraphRenderJob.objects.filter(status=GraphRenderJob.RUNNING).count(), 1)
+
+    def test_claim_marks_jobs_running(self):
+        GraphRenderJob.enqueue([('exam', 1), ('exam', 2), ('exam', 3)])
+        jobs = Command()._claim(2)
+        self.assertEqual(len(jobs), 2)
+        self.assertEqual(GraphRenderJob.objects.filter(status=GraphRenderJob.RUNNING).count(), 2)
+        self.assertEqual(len(pending()), 1)
+
+
+@override_settings(TEACHADMIN_GRAPH_WORKER=True)
+class WorkerGraphViewTests(TestCase):
+    """ With the background renderer, requests only read pre-rendered graphs. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_teacher()
+        _, subject, students = make_class(cls.teacher)
+        cls.exam = Exam.objects.create(name="Midterm", subject=subject)
+        ExamScore.objects.create(exam=cls.exam, student=students[0], score=50)
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        patcher = mock.patch.object(graph_cache, 'directory', directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_login(self.teacher.user)
+        self.url = reverse("teachadmin:graph", kwargs={"model": 'exam', "pk": self.exam.pk, "fmt": 'png'})
+
+    def test_placeholder_until_rendered(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertIn('no-store', response['Cache-Control'])
+        self.assertEqual(pending(), [('exam', self.exam.pk)])
+
+        graph_cache.set('exam', self.exam.pk, 0, b'\x89PNG rendered')
+        response = self.client.get(self.url)
+        self.assertEqual(response.content, b'\x89PNG rendered')
+        self.assertEqual(response['Content-Type'], 'image/png')
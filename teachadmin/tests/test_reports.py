@@ -0,0 +1,73 @@
+from django.test import TestCase, SimpleTestCase
+from django.urls import reverse
+
+from ..models import Exam, ExamScore
+from ..reports import render_reports, stream_reports, stream_zip
+from .utils import make_teacher, make_class
+
+import io
+import zipfile
+
+
+def unzip(chunks):
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        return {name: archive.read(name).decode('utf-8') for name in archive.namelist()}
+
+
+class StreamZipTests(SimpleTestCase):
+
+    def test_archive_is_streamed_file_by_file(self):
+        chunks = list(stream_zip([("a/1.txt", b"one"), ("a/2.txt", b"two"), ("b/3.txt", b"three")]))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(unzip(chunks), {"a/1.txt": "one", "a/2.txt": "two", "b/3.txt": "three"})
+
+    def test_empty_archive(self):
+        self.assertEqual(unzip(stream_zip([])), {})
+
+    def test_reports_keep_their_order(self):
+        reports = [('txt', "{}.txt".format(n), "Student{}".format(n), "1A", []) for n in range(10)]
+        for processes in (0, 2):
+            with self.subTest(processes=processes):
+                rendered = list(render_reports(iter(reports), processes))
+                self.assertEqual([name for name, _ in rendered], ["{}.txt".format(n) for n in range(10)])
+                self.assertTrue(rendered[3][1].startswith(b"Student3\n--------\n1A"))
+
+
+class StreamReportsTests(TestCase):
+    """ One report per student of the School, in a folder per HomeRoom. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_teacher()
+        cls.homeroom, subject, students = make_class(cls.teacher, students=2)
+        exam = Exam.objects.create(name="Midterm", subject=subject, max_score=50)
+        ExamScore.objects.create(exam=exam, student=students[0], score=45)
+        cls.school = cls.homeroom.school
+
+    def test_txt(self):
+        files = unzip(stream_reports(self.school, 'txt'))
+        self.assertEqual(sorted(files), ["1a/1-student1-1a.txt", "1a/2-student2-1a.txt"])
+        self.assertIn("Exams:\n\t", files["1a/1-student1-1a.txt"])
+        self.assertTrue(files["1a/2-student2-1a.txt"].endswith("No scores yet."))
+
+    def test_html(self):
+        files = unzip(stream_reports(self.school, 'html'))
+        self.assertEqual(sorted(files), ["1a/1-student1-1a.html", "1a/2-student2-1a.html"])
+        self.assertIn("<h2>Exams</h2>", files["1a/1-student1-1a.html"])
+        self.assertIn("<p>No scores yet.</p>", files["1a/2-student2-1a.html"])
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            stream_reports(self.school, 'doc')
+
+    def test_download(self):
+        self.client.force_login(self.teacher.user)
+        response = self.client.get(reverse("teachadmin:school_reports",
+                                           kwargs={"pk": self.school.pk, "fmt": 'txt'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertEqual(len(unzip(response.streaming_content)), 2)
+        response = self.client.get(reverse("teachadmin:school_reports",
+                                           kwargs={"pk": self.school.pk, "fmt": 'doc'}))
+        self.assertEqual(response.status_code, 404)
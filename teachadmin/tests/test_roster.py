@@ -0,0 +1,75 @@
+from django.test import TestCase
+
+from ..models import Student
+from ..roster import read_roster, clean_roster, import_roster
+from .utils import make_teacher, make_class
+
+import io
+
+
+def roster(*lines, header="Number,First,Last,Gender"):
+    return read_roster(io.StringIO("\n".join((header,) + lines) + "\n"))
+
+
+class CleanRosterTests(TestCase):
+    """ Every row is checked at once, and every rejected row is reported with its line. """
+
+    def test_values_are_kept_as_text(self):
+        rows, errors = clean_roster(roster("007,Ann,Nan,f", "008,Bo,, m ", "009,Cy,NA,O"))
+        self.assertEqual(errors, [])
+        self.assertEqual(list(rows['student_number']), ['007', '008', '009'])
+        self.assertEqual(list(rows['last_name']), ['Nan', '', 'NA'])
+        self.assertEqual(list(rows['gender']), ['F', 'M', 'O'])
+
+    def test_errors_name_their_lines(self):
+        rows, errors = clean_roster(roster(
+            "1,Ann,Lee,F",
+            "2,,Lee,F",
+            "3,Bo,Lee,X",
+            "1,Cy,Lee,M",
+            "4,{},Lee,F".format("x" * 51),
+            "5,Di,Lee,F",
+        ), existing_numbers=['5'])
+        self.assertEqual(list(rows['first_name']), ['Ann'])
+        self.assertEqual(errors, [
+            (3, "First name is missing."),
+            (4, "Gender has to be one of F, M, O."),
+            (5, "Student number appears more than once in the file."),
+            (6, "First name is longer than 50 characters."),
+            (7, "A student with this student number already exists in the homeroom."),
+        ])
+
+    def test_students_without_numbers_are_not_duplicates(self):
+        rows, errors = clean_roster(roster(",Ann,Lee,F", ",Bo,Lee,M"))
+        self.assertEqual((len(rows), errors), (2, []))
+
+    def test_missing_columns(self):
+        rows, errors = clean_roster(roster("1,Ann", header="Number,First"))
+        self.assertTrue(rows.empty)
+        self.assertEqual(errors, [(1, "Missing column(s): Last, Gender")])
+
+
+class ImportRosterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_teacher()
+        cls.homeroom, cls.subject, _ = make_class(cls.teacher, students=1)
+
+    def test_students_are_linked_to_the_teacher_and_subjects(self):
+        students, errors = import_roster(roster("2,Ann,Lee,F", "3,Bo,Nan,M"), self.homeroom, self.teacher)
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(student.first_name for student in students), ['Ann', 'Bo'])
+        imported = Student.objects.filter(pk__in=[student.pk for student in students])
+        self.assertEqual(imported.filter(teacher=self.teacher, subject=self.subject).count(), 2)
+        self.assertEqual(imported.get(first_name='Bo').last_name, 'Nan')
+
+    def test_existing_numbers_are_rejected(self):
+        students, errors = import_roster(roster("1,Ann,Lee,F", "4,Bo,Lee,M"), self.homeroom)
+        self.assertEqual([student.first_name for student in students], ['Bo'])
+        self.assertEqual(errors, [(2, "A student with this student number already exists in the homeroom.")])
+
+    def test_nothing_to_import(self):
+        with self.assertNumQueries(1):
+            students, errors = import_roster(roster("1,Ann,Lee,F"), self.homeroom)
+        self.assertEqual((students, len(errors)), ([], 1))
@@ -0,0 +1,179 @@
+from django.contrib.messages import get_messages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Student, Exam, ExamScore, Assignment, Lesson, Homework, BestScore
+from ..scoreimport import import_scores, score_columns
+from .utils import make_teacher, make_class
+
+import io
+import os
+import tempfile
+
+
+def sheet(*lines):
+    return io.StringIO("\n".join(lines) + "\n")
+
+
+class ScoreImportTests(TestCase):
+    """ Score sheets are imported chunk by chunk and every skipped cell is reported. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_teacher()
+        _, cls.subject, cls.students = make_class(cls.teacher, students=4)
+        cls.exam = Exam.objects.create(name="Midterm", subject=cls.subject, max_score=50)
+
+    def import_exams(self, *lines, **kwargs):
+        return import_scores(sheet(*lines), 'exam', self.subject, filename='scores.csv', **kwargs)
+
+    def test_score_columns(self):
+        self.assertEqual(score_columns(['Number', 'Name', 'Quiz 1:0-20', 'Final', ' ']), {
+            'Quiz 1:0-20': ('Quiz 1', 0, 20),
+            'Final': ('Final', None, None),
+        })
+
+    def test_scores_and_new_score_models(self):
+        report = self.import_exams("Number,Name,Midterm,Quiz:0-20", "1,Ann,40,15", "2,Bo,,20", "3,Cy,50,")
+        self.assertEqual(report, {'rows': 3, 'created': 4, 'skipped': 0, 'error_count': 0, 'errors': []})
+        quiz = Exam.objects.get(subject=self.subject, name="Quiz")
+        self.assertEqual((quiz.min_score, quiz.max_score), (0, 20))
+        self.assertEqual(BestScore.objects.get(student=self.students[0], model='exam',
+                                               object_id=self.exam.pk).score, 40)
+
+    def test_reimporting_skips_the_scores_already_there(self):
+        lines = ("Number,Midterm", "1,40", "2,30")
+        self.import_exams(*lines)
+        report = self.import_exams(*lines)
+        self.assertEqual((report['created'], report['skipped']), (0, 2))
+        self.assertEqual(ExamScore.objects.count(), 2)
+
+    def test_row_errors_are_reported_with_their_lines(self):
+        report = self.import_exams(
+            "Number,Midterm",
+            "1,40",
+            "9,40",
+            "2,abc",
+            "3,60",
+            "4,-1",
+        )
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(report['errors'], [
+            (3, 'Number', "No student with number '9' in {}.".format(self.subject)),
+            (4, 'Midterm', "'abc' isn't a whole, positive number."),
+            (6, 'Midterm', "'-1' isn't a whole, positive number."),
+            (5, 'Midterm', "Score cannot be higher than exam's maximum score."),
+        ])
+        self.assertEqual(report['error_count'], 4)
+
+    def test_repeated_rows_across_chunks(self):
+        report = self.import_exams("Number,Midterm", "1,40", "2,30", "1,45", "1,50", chunksize=2)
+        self.assertEqual(report['created'], 2)
+        self.assertEqual([error[:2] for error in report['errors']], [(4, 'Number'), (5, 'Number')])
+        self.assertEqual(report['errors'][0][2],
+                         "Student number '1' appears more than once in the sheet (first on line 2).")
+        self.assertEqual(BestScore.objects.get(student=self.students[0], model='exam').score, 40)
+
+    def test_ambiguous_student_numbers(self):
+        twin = Student.objects.create(first_name="Twin", student_number="1")
+        twin.subject.add(self.subject)
+        report = self.import_exams("Number,Midterm", "1,40")
+        self.assertEqual(report['created'], 0)
+        self.assertEqual(report['errors'], [
+            (2, 'Number', "More than one student in {} has the number '1'.".format(self.subject))])
+
+    def test_header_mismatch_drops_the_column(self):
+        report = self.import_exams("Number,Midterm:0-100,Quiz:0-20", "1,90,10")
+        self.assertEqual(report['errors'], [
+            (1, 'Midterm:0-100', "Midterm already exists with scores from 0 to 50.")])
+        self.assertEqual(report['created'], 1)
+        self.assertFalse(ExamScore.objects.filter(exam=self.exam).exists())
+
+    def test_sheet_errors(self):
+        self.assertEqual(self.import_exams("First,Midterm", "Ann,40")['errors'],
+                         [(1, 'Number', "The sheet needs a 'Number' column.")])
+        self.assertEqual(self.import_exams("Number,Quiz:20-10", "1,15")['errors'], [
+            (1, 'Quiz:20-10', "Minimum score cannot be higher than maximum score."),
+            (1, '', "The sheet doesn't have any score columns."),
+        ])
+
+    def test_new_assignments_get_their_creator(self):
+        import_scores(sheet("Number,Essay", "1,80"), 'assignment', self.subject,
+                      filename='scores.csv', teacher=self.teacher)
+        self.assertEqual(list(Assignment.objects.get(name="Essay").creator.all()), [self.teacher])
+
+    def test_lesson_homework(self):
+        lesson = Lesson.objects.create(name="Fractions", subject=self.subject)
+        report = import_scores(sheet("Number,Reading", "2,70"), 'homework', lesson, filename='hw.csv')
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(Homework.objects.get(lesson=lesson).homeworkscore_set.get().score, 70)
+
+    def test_queries_per_chunk(self):
+        lines = ["Number,Midterm"] + ["{},{}".format(number, number * 10) for number in (1, 2, 3)]
+        self.import_exams(*lines[:2])
+        # The score models, then per chunk: students, scores already there, best scores,
+        # the bulk inserts and the version bump's homerooms (plus the savepoint)
+        with self.assertNumQueries(9):
+            self.import_exams(lines[0], *lines[2:])
+
+
+class ScoreImportViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_teacher()
+        _, cls.subject, _ = make_class(cls.teacher)
+
+    def test_outcome_is_reported(self):
+        self.client.force_login(self.teacher.user)
+        upload = SimpleUploadedFile("scores.csv", b"Number,Essay\n1,80\n7,50\n")
+        response = self.client.post(
+            reverse("teachadmin:subject_import_scores", kwargs={"subject_pk": self.subject.pk}),
+            {'file': upload, 'model': 'assignment'})
+        self.assertRedirects(response, self.subject.get_absolute_url(), fetch_redirect_response=False)
+        self.assertEqual([str(message) for message in get_messages(response.wsgi_request)], [
+            "Imported 1 score(s) from 2 row(s) into {}.".format(self.subject),
+            "Line 3 (Number): No student with number '7' in {}.".format(self.subject),
+        ])
+        self.assertEqual(list(Assignment.objects.get(name="Essay").creator.all()), [self.teacher])
+
+    def test_anonymous_requests_are_redirected_first(self):
+        for subject_pk in (self.subject.pk, self.subject.pk + 100):
+            with self.assertNumQueries(0):
+                response = self.client.get(
+                    reverse("teachadmin:subject_import_scores", kwargs={"subject_pk": subject_pk}))
+            self.assertEqual(response.status_code, 302)
+            self.assertIn('login', response['Location'])
+
+
+class ImportScoresCommandTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_teacher()
+        _, cls.subject, _ = make_class(cls.teacher)
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as sheet_file:
+            sheet_file.write("Number,Essay\n1,80\n")
+        self.addCleanup(os.remove, self.path)
+
+    def test_import(self):
+        out = io.StringIO()
+        call_command('importscores', self.path, model='assignment', subject=self.subject.pk,
+                     teacher=self.teacher.user.username, stdout=out)
+        self.assertIn("Imported 1 scores from 1 rows", out.getvalue())
+        self.assertEqual(list(Assignment.objects.get(name="Essay").creator.all()), [self.teacher])
+
+    def test_unknown_teacher(self):
+        with self.assertRaises(CommandError):
+            call_command('importscores', self.path, model='assignment', subject=self.subject.pk,
+                         teacher='nobody')
+        self.assertFalse(Assignment.objects.exists())
+
+    def test_missing_owner(self):
+        with self.assertRaises(CommandError):
+            call_command('importscores', self.path, model='homework', subject=self.subject.pk)
@@ -0,0 +1,44 @@
+from django.test import TestCase
+
+from ..models import Exam, ExamScore, Lesson, Homework, HomeworkScore
+from ..scorematrix import build_score_matrix, column_name
+from .utils import make_teacher, make_class
+
+import math
+
+
+class ScoreMatrixTests(TestCase):
+    """ One row per student, one column of best-score percentages per score model. """
+
+    @classmethod
+    def setUpTestData(cls):
+        _, subject, cls.students = make_class(make_teacher())
+        cls.exam = Exam.objects.create(name="Midterm", subject=subject, max_score=50)
+        cls.homework = Homework.objects.create(
+            name="Reading", lesson=Lesson.objects.create(name="Fractions", subject=subject))
+        first, second, _ = cls.students
+        ExamScore.objects.create(exam=cls.exam, student=first, score=20)
+        ExamScore.objects.create(exam=cls.exam, student=first, score=45)
+        ExamScore.objects.create(exam=cls.exam, student=second, score=25)
+        HomeworkScore.objects.create(homework=cls.homework, student=second, score=77)
+
+    def test_best_percentages(self):
+        with self.assertNumQueries(1):
+            df = build_score_matrix(self.students, [self.exam, self.homework])
+        self.assertEqual(list(df.columns), ['Student', 'Gender', column_name(self.exam),
+                                            column_name(self.homework)])
+        self.assertEqual(list(df['Student']), self.students)
+        self.assertEqual(list(df['Gender']), ['Female'] * 3)
+        exam, homework = df[column_name(self.exam)], df[column_name(self.homework)]
+        self.assertEqual(list(exam[:2]), [90.0, 50.0])
+        self.assertTrue(math.isnan(exam[2]))
+        self.assertTrue(math.isnan(homework[0]))
+        self.assertEqual(homework[1], 77.0)
+
+    def test_repeated_score_models_get_one_column(self):
+        df = build_score_matrix(self.students, [self.exam, self.exam])
+        self.assertEqual(list(df.columns), ['Student', 'Gender', column_name(self.exam)])
+
+    def test_nothing_to_build(self):
+        self.assertTrue(build_score_matrix([], [self.exam]).empty)
+        self.assertTrue(build_score_matrix(self.students, []).empty)
@@ -0,0 +1,53 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..models import (HomeRoom, Subject, Exam, ExamScore, Assignment, Lesson,
+                        LessonTest, LessonTestScore, Homework)
+from ..scoretree import load_score_model_tree
+from .utils import make_teacher, make_class
+
+
+class ScoreModelTreeTests(TestCase):
+    """ get_score_models() returns the same lists, without queries, once the tree is loaded. """
+
+    @classmethod
+    def setUpTestData(cls):
+        teacher = make_teacher()
+        cls.homeroom, subject, students = make_class(teacher)
+        _, other_subject, _ = make_class(teacher, students=0, name="1B")
+        other_subject.homeroom.add(cls.homeroom)
+        for subj in (subject, other_subject):
+            exam = Exam.objects.create(name="Midterm", subject=subj)
+            ExamScore.objects.create(exam=exam, student=students[0], score=50)
+            Assignment.objects.create(name="Essay", subject=subj)
+            lesson = Lesson.objects.create(name="Fractions", subject=subj)
+            test = LessonTest.objects.create(name="Quiz", lesson=lesson)
+            LessonTestScore.objects.create(lessonTest=test, student=students[0], score=50)
+            # Lesson tests and homework without scores are left out
+            LessonTest.objects.create(name="Retake", lesson=lesson)
+            Homework.objects.create(name="Reading", lesson=lesson)
+
+    def test_same_score_models_without_queries(self):
+        expected = HomeRoom.objects.get(pk=self.homeroom.pk).get_score_models()
+        self.assertEqual(len(expected), 6)
+
+        homeroom = HomeRoom.objects.get(pk=self.homeroom.pk)
+        load_score_model_tree(homeroom)
+        with self.assertNumQueries(0):
+            self.assertEqual(homeroom.get_score_models(), expected)
+            self.assertEqual(homeroom.get_score_models(as_tuples=True),
+                             [(subject, item) for subject in homeroom.subjects()
+                              for item in subject.get_score_models()])
+
+    def test_queries_dont_grow_with_the_tree(self):
+        with CaptureQueriesContext(connection) as one:
+            load_score_model_tree(list(Subject.objects.all()[:1]))
+        with CaptureQueriesContext(connection) as many:
+            load_score_model_tree(list(Subject.objects.all()))
+        self.assertEqual(len(many), len(one))
+
+    def test_loaded_objects_are_not_queried_again(self):
+        homeroom = load_score_model_tree(HomeRoom.objects.filter(pk=self.homeroom.pk))[0]
+        with self.assertNumQueries(0):
+            load_score_model_tree(homeroom)
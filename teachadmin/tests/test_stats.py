@@ -0,0 +1,142 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import (HomeRoom, Exam, ExamScore, Assignment, AssignmentScore,
+                        Lesson, Homework, HomeworkScore)
+from ..scorematrix import build_score_matrix
+from ..stats import generalstats, homeroom_stats, subject_stats, lesson_stats, item_stats
+from .utils import make_teacher, make_class
+
+import math
+import random
+
+
+def pandas_stats(students, score_models):
+    """ get_generalstats_dict()'s numbers the way they used to be calculated:
+        with pandas, over the whole score matrix. """
+    df = build_score_matrix(students, score_models)
+    if df.empty:
+        return {"Avg. score": math.nan, "Median score": math.nan, "Std. Dev.": math.nan}
+    scores = df.select_dtypes(include=['float64'])
+    return {
+        "Avg. score": round(scores.mean().mean(), 1),
+        "Median score": scores.median().median(),
+        "Std. Dev.": round(scores.std().mean(), 2),
+    }
+
+
+class StatsParityTests(TestCase):
+    """ The database aggregates give the same numbers as pandas over the fetched scores. """
+
+    @classmethod
+    def setUpTestData(cls):
+        rand = random.Random(4)
+        teacher = make_teacher()
+        cls.classes = []
+        for name, size in (("1A", 7), ("1B", 4)):
+            homeroom, subject, students = make_class(teacher, students=size, name=name)
+            lesson = Lesson.objects.create(name="Fractions", subject=subject)
+            items = [
+                Exam.objects.create(name="Midterm", subject=subject, max_score=80),
+                Exam.objects.create(name="Final", subject=subject),
+                Assignment.objects.create(name="Essay", subject=subject, max_score=30),
+                Homework.objects.create(name="Reading", lesson=lesson, max_score=10),
+            ]
+            for student in students:
+                for item in items:
+                    # Some students skip some work, some hand it in twice
+                    for _ in range(rand.choice((0, 1, 1, 2))):
+                        score = rand.randint(item.min_score, item.max_score)
+                        if isinstance(item, Exam):
+                            ExamScore.objects.create(exam=item, student=student, score=score)
+                        elif isinstance(item, Assignment):
+                            AssignmentScore.objects.create(assignment=item, student=student, score=score)
+                        else:
+                            HomeworkScore.objects.create(homework=item, student=student, score=score)
+            cls.classes.append((homeroom, subject, lesson, students, items))
+
+        # A single score: no standard deviation for that homework
+        homeroom, subject, lesson, students, items = cls.classes[1]
+        single = Homework.objects.create(name="Essay", lesson=lesson)
+        HomeworkScore.objects.create(homework=single, student=students[0], score=64)
+        items.append(single)
+
+    def assertStatsEqual(self, stats, expected):
+        for key, value in expected.items():
+            if isinstance(value, float) and math.isnan(value):
+                self.assertTrue(math.isnan(stats[key]), key)
+            else:
+                self.assertAlmostEqual(stats[key], value, places=6, msg=key)
+
+    def test_homerooms(self):
+        stats = homeroom_stats([homeroom for homeroom, *_ in self.classes])
+        for homeroom, subject, lesson, students, items in self.classes:
+            self.assertStatsEqual(stats[homeroom], pandas_stats(students, items))
+
+    def test_subjects(self):
+        stats = subject_stats([subject for _, subject, *_ in self.classes])
+        for homeroom, subject, lesson, students, items in self.classes:
+            self.assertStatsEqual(stats[subject], pandas_stats(students, items))
+
+    def test_lessons(self):
+        stats = lesson_stats([lesson for _, _, lesson, *_ in self.classes])
+        for homeroom, subject, lesson, students, items in self.classes:
+            lesson_items = [item for item in items if isinstance(item, Homework)]
+            self.assertStatsEqual(stats[lesson], pandas_stats(students, lesson_items))
+
+    def test_students_who_left_the_subject_dont_count(self):
+        homeroom, subject, lesson, students, items = self.classes[0]
+        students[0].subject.remove(subject)
+        stats = subject_stats([subject])[subject]
+        self.assertStatsEqual(stats, pandas_stats(students[1:], items))
+
+    def test_item_stats(self):
+        homeroom, subject, lesson, students, items = self.classes[0]
+        stats = item_stats('subject', [subject.pk]).set_index(['Model', 'Item'])
+        scores = build_score_matrix(students, items)
+        for item in items:
+            column = scores["{}({})".format(item, item.pk)].dropna()
+            row = stats.loc[(item._meta.model_name, item.pk)]
+            self.assertEqual(row['Count'], column.count())
+            self.assertAlmostEqual(row['Avg'], column.mean())
+            self.assertAlmostEqual(row['Min'], column.min())
+            self.assertAlmostEqual(row['Max'], column.max())
+            self.assertAlmostEqual(row['Std'], column.std())
+            self.assertAlmostEqual(row['Median'], column.median())
+
+    def test_std_of_equal_scores(self):
+        _, subject, students = make_class(make_teacher('other'), students=3, name="2A")
+        exam = Exam.objects.create(name="Quiz", subject=subject, max_score=3)
+        for student in students:
+            ExamScore.objects.create(exam=exam, student=student, score=1)
+        only = Exam.objects.create(name="Retake", subject=subject)
+        ExamScore.objects.create(exam=only, student=students[0], score=50)
+        stats = item_stats('subject', [subject.pk]).set_index('Item')
+        # Exactly 0, no rounding noise from summing squares of 33.33...%
+        self.assertEqual(stats.loc[exam.pk, 'Std'], 0.0)
+        self.assertTrue(math.isnan(stats.loc[only.pk, 'Std']))
+
+    def test_queries_dont_grow_with_the_homerooms(self):
+        homerooms = [homeroom for homeroom, *_ in self.classes]
+        with CaptureQueriesContext(connection) as one:
+            homeroom_stats(homerooms[:1])
+        with CaptureQueriesContext(connection) as many:
+            homeroom_stats(homerooms)
+        self.assertEqual(len(many), len(one))
+
+    def test_school_page_shows_every_homeroom(self):
+        homeroom = self.classes[0][0]
+        HomeRoom.objects.filter(pk=self.classes[1][0].pk).update(school=homeroom.school)
+        self.client.force_login(homeroom.teacher.first().user)
+        response = self.client.get(reverse("teachadmin:school_detail", kwargs={"pk": homeroom.school_id}))
+        self.assertEqual(response.status_code, 200)
+        stats = homeroom_stats([homeroom for homeroom, *_ in self.classes])
+        self.assertEqual(response.context['homerooms_stats_dict'],
+                         {str(homeroom): stats[homeroom] for homeroom in stats})
+
+    def test_no_scores(self):
+        _, subject, _ = make_class(make_teacher('other'), students=0, name="2A")
+        stats = generalstats('subject', [subject])[subject]
+        self.assertTrue(all(math.isnan(value) for value in stats.values()))
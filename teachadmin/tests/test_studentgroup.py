@@ -0,0 +1,88 @@
+from django.core.cache import cache
+from django.test import TestCase, SimpleTestCase
+
+from ..models import Exam, ExamScore, Assignment, AssignmentScore, ScoreDataVersion
+from ..studentgroup import StudentGroup, group_scores, student_group
+from .utils import make_teacher, make_class
+
+import math
+import numpy as np
+import pandas as pd
+
+
+class StudentGroupTests(SimpleTestCase):
+
+    def setUp(self):
+        self.scores = pd.DataFrame({
+            'Student': ["Ann", "Bo", "Cy", "Di"],
+            'Exam': [40.0, 60.0, 80.0, np.nan],
+            'Quiz': [50.0, 50.0, 50.0, 50.0],
+            'Essay': [np.nan] * 4,
+        })
+        self.stats = StudentGroup(self.scores)
+
+    def test_columns_without_numbers_or_scores_are_left_out(self):
+        self.assertEqual(self.stats.columns, ['Exam', 'Quiz'])
+
+    def test_statistics_of_a_column(self):
+        self.assertEqual(self.stats['Exam'], {
+            'count': 3.0, 'mean': 60.0, 'std': 20.0, 'min': 40.0,
+            'q1': 50.0, 'median': 60.0, 'q3': 70.0, 'max': 80.0,
+        })
+        self.assertEqual(self.stats['Quiz']['std'], 0.0)
+
+    def test_zscores(self):
+        zscores = self.stats.zscores()
+        self.assertEqual(list(zscores['Exam'][:3]), [-1.0, 0.0, 1.0])
+        self.assertTrue(zscores['Exam'].isna()[3])
+        # No spread, no z-scores
+        self.assertTrue(zscores['Quiz'].isna().all())
+
+    def test_rows(self):
+        rows = self.stats.rows()
+        self.assertEqual([row['column'] for row in rows], ['Exam', 'Quiz'])
+        self.assertEqual((rows[0]['mean'], rows[0]['q3']), (60.0, 70.0))
+
+    def test_no_scores(self):
+        stats = StudentGroup(pd.DataFrame())
+        self.assertEqual(stats.columns, [])
+        self.assertEqual(stats.rows(), [])
+        self.assertEqual(len(stats.mean), 0)
+
+
+class GroupScoresTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.homeroom, cls.subject, cls.students = make_class(make_teacher())
+        exam = Exam.objects.create(name="Midterm", subject=cls.subject, max_score=50)
+        assignment = Assignment.objects.create(name="Essay", subject=cls.subject)
+        first, second, _ = cls.students
+        ExamScore.objects.create(exam=exam, student=first, score=40)
+        ExamScore.objects.create(exam=exam, student=second, score=20)
+        AssignmentScore.objects.create(assignment=assignment, student=first, score=70)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_best_scores_in_percent_per_student(self):
+        scores = group_scores(self.subject)
+        first, second, third = self.students
+        self.assertEqual(sorted(scores.columns), ["Essay", "Midterm"])
+        self.assertEqual(list(scores.index), [first.pk, second.pk, third.pk])
+        self.assertEqual(list(scores['Midterm'][:2]), [80.0, 40.0])
+        self.assertTrue(math.isnan(scores.loc[third.pk, 'Midterm']))
+        self.assertEqual(student_group(self.subject)['Midterm']['mean'], 60.0)
+
+    def test_homerooms_and_subjects_agree(self):
+        pd.testing.assert_frame_equal(group_scores(self.homeroom), group_scores(self.subject))
+
+    def test_statistics_are_cached_per_version(self):
+        stats = student_group(self.homeroom)
+        with self.assertNumQueries(1):
+            self.assertEqual(str(student_group(self.homeroom)), str(stats))
+        ExamScore.objects.create(exam=Exam.objects.get(), student=self.students[2], score=50)
+        self.assertEqual(student_group(self.homeroom)['Midterm']['count'], 2.0)
+        ScoreDataVersion.bump([('homeroom', self.homeroom.pk)])
+        self.assertEqual(student_group(self.homeroom)['Midterm']['count'], 3.0)
@@ -0,0 +1,64 @@
+from django.test import SimpleTestCase
+
+from matplotlib.collections import PathCollection, PolyCollection
+
+from ..plotting import figure
+from ..swarm import beeswarm_offsets, swarmplot
+
+import numpy as np
+import pandas as pd
+
+
+class BeeswarmOffsetTests(SimpleTestCase):
+
+    def test_points_of_one_bin_spread_out_from_the_middle(self):
+        offsets = beeswarm_offsets([50, 50, 50], bin_height=1, step=0.1)
+        self.assertEqual(sorted(np.round(offsets, 6)), [-0.1, 0.0, 0.1])
+
+    def test_even_bins_are_shifted_half_a_step(self):
+        offsets = beeswarm_offsets([50, 50, 50, 50], bin_height=1, step=0.1)
+        self.assertEqual(sorted(np.round(offsets, 6)), [-0.15, -0.05, 0.05, 0.15])
+
+    def test_separate_bins_stay_in_the_middle(self):
+        offsets = beeswarm_offsets([10, 50, 90], bin_height=1, step=0.1)
+        self.assertTrue((offsets == 0).all())
+
+    def test_offsets_follow_the_input_order(self):
+        values = np.array([70, 10, 70, 70, 10])
+        offsets = beeswarm_offsets(values, bin_height=5, step=1)
+        self.assertEqual(sorted(offsets[values == 70]), [-1, 0, 1])
+        self.assertEqual(sorted(offsets[values == 10]), [-0.5, 0.5])
+
+    def test_empty_and_bad_bins(self):
+        self.assertEqual(beeswarm_offsets([], 1, 1).size, 0)
+        self.assertEqual(beeswarm_offsets([1, 1], 0, 1).size, 2)
+
+
+class SwarmplotTests(SimpleTestCase):
+
+    def test_points_stay_within_their_category(self):
+        data = pd.DataFrame({'Midterm': [50.0] * 200, 'Final': [np.nan] * 199 + [80.0]})
+        with figure() as (fig, axes):
+            axes.set_ylim(0, 100)
+            swarmplot(axes, data)
+            x = np.concatenate([collection.get_offsets()[:, 0] for collection in axes.collections])
+        self.assertEqual(x.size, 201)
+        self.assertLessEqual(np.abs(x[:200]).max(), 0.4 + 1e-9)
+        self.assertEqual(x[200], 1.0)
+
+    def test_large_categories_become_violins(self):
+        data = pd.DataFrame({'Midterm': np.linspace(0, 100, 50)})
+        with figure() as (fig, axes):
+            axes.set_ylim(0, 100)
+            swarmplot(axes, data, max_points=10)
+            collections = list(axes.collections)
+        self.assertTrue(any(isinstance(collection, PolyCollection) for collection in collections))
+        self.assertFalse(any(isinstance(collection, PathCollection) for collection in collections))
+
+    def test_hue_gets_a_legend_entry_per_level(self):
+        data = pd.DataFrame({'Midterm': [40.0, 60.0, 80.0]})
+        with figure() as (fig, axes):
+            axes.set_ylim(0, 100)
+            swarmplot(axes, data, hue=pd.Series(['F', 'M', 'F']))
+            labels = [collection.get_label() for collection in axes.collections]
+        self.assertEqual(labels, ['F', 'M'])
@@ -0,0 +1,84 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..graphcache import graph_cache
+from ..models import (Exam, ExamScore, Assignment, AssignmentScore, Lesson, LessonTest,
+                        LessonTestScore, Homework, HomeworkScore, ScoreDataVersion)
+from ..timeline import timeline_scores, render_timeline, timeline_image
+from .utils import make_teacher, make_class
+
+import datetime
+import shutil
+import tempfile
+
+
+class TimelineTests(TestCase):
+    """ All four kinds of scores of a student, in order of their score models' dates. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_teacher()
+        _, subject, (cls.student, cls.other) = make_class(cls.teacher, students=2)
+        lesson = Lesson.objects.create(name="Fractions", subject=subject)
+        exam = Exam.objects.create(name="Midterm", subject=subject, max_score=50,
+                                   date=datetime.date(2020, 5, 1))
+        assignment = Assignment.objects.create(
+            name="Essay", subject=subject,
+            deadline=timezone.make_aware(datetime.datetime(2020, 2, 1, 12)))
+        test = LessonTest.objects.create(name="Quiz", lesson=lesson, test_date=datetime.date(2020, 3, 1))
+        homework = Homework.objects.create(
+            name="Reading", lesson=lesson,
+            deadline=timezone.make_aware(datetime.datetime(2020, 4, 1, 12)))
+        ungraded = Exam.objects.create(name="Trial", subject=subject, max_score=0,
+                                       date=datetime.date(2020, 6, 1))
+        ExamScore.objects.create(exam=exam, student=cls.student, score=40)
+        AssignmentScore.objects.create(assignment=assignment, student=cls.student, score=70)
+        LessonTestScore.objects.create(lessonTest=test, student=cls.student, score=60)
+        HomeworkScore.objects.create(homework=homework, student=cls.student, score=90)
+        ExamScore.objects.create(exam=ungraded, student=cls.student, score=0)
+        ExamScore.objects.create(exam=exam, student=cls.other, score=10)
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        patcher = mock.patch.object(graph_cache, 'directory', directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_scores_in_order_of_their_dates(self):
+        with self.assertNumQueries(1):
+            scores = timeline_scores(self.student)
+        self.assertEqual(list(scores['Name']), ["Essay", "Quiz", "Reading", "Midterm", "Trial"])
+        self.assertEqual(list(scores['Model']), ['assignment', 'lessontest', 'homework', 'exam', 'exam'])
+        self.assertEqual(list(scores['Percent'][:4]), [70.0, 60.0, 90.0, 80.0])
+        # No max_score, no percent
+        self.assertTrue(scores['Percent'].isna().iloc[4])
+        self.assertEqual(scores['Date'].iloc[0], datetime.datetime(2020, 2, 1))
+
+    def test_nothing_to_draw(self):
+        self.assertIsNone(render_timeline(self.student, timeline_scores(self.student).iloc[4:]))
+        ExamScore.objects.filter(student=self.other).delete()
+        self.assertIsNone(timeline_image(self.other))
+
+    def test_image_is_cached_per_version(self):
+        image = timeline_image(self.student)
+        self.assertTrue(image.startswith(b'\x89PNG'))
+        # Only the version, the image comes from the cache
+        with self.assertNumQueries(1):
+            self.assertEqual(timeline_image(self.student), image)
+        ScoreDataVersion.bump([('student', self.student.pk)])
+        with mock.patch('teachadmin.timeline.render_timeline', return_value=b'new') as render:
+            self.assertEqual(timeline_image(self.student), b'new')
+        render.assert_called_once()
+
+    def test_student_graph(self):
+        self.client.force_login(self.teacher.user)
+        response = self.client.get(reverse("teachadmin:graph", kwargs={
+            "model": 'student', "pk": self.student.pk, "fmt": 'svg'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertEqual(response['ETag'], '"student-{}-0-svg"'.format(self.student.pk))
+        self.assertIn(b'<svg', response.content)
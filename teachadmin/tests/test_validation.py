@@ -0,0 +1,65 @@
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import (Exam, ExamScore, Assignment, AssignmentScore, Lesson,
+                        Homework, HomeworkScore, ScoreEntry)
+from .utils import make_teacher, make_class
+
+import datetime
+
+
+class ValidateManyTests(TestCase):
+    """ validate_many() runs clean()'s checks for many scores with one best score query. """
+
+    @classmethod
+    def setUpTestData(cls):
+        _, subject, cls.students = make_class(make_teacher())
+        cls.exam = Exam.objects.create(name="Midterm", subject=subject, max_score=50)
+        cls.assignment = Assignment.objects.create(name="Essay", subject=subject, max_score=20)
+        cls.homework = Homework.objects.create(
+            name="Reading", lesson=Lesson.objects.create(name="Fractions", subject=subject))
+        ExamScore.objects.create(exam=cls.exam, student=cls.students[0], score=30)
+
+    def test_one_query_for_many_kinds(self):
+        first, second, third = self.students
+        entries = [
+            ExamScore(exam=self.exam, student=first, score=40),
+            ExamScore(exam=self.exam, student=second, score=60),
+            AssignmentScore(assignment=self.assignment, student=third, score=25),
+            HomeworkScore(homework=self.homework, student=first, score=90),
+        ]
+        with self.assertNumQueries(1):
+            errors = ScoreEntry.validate_many(entries)
+        self.assertEqual([entry for entry, _ in errors], [entries[1], entries[2]])
+        self.assertTrue(all(isinstance(err, ValidationError) for _, err in errors))
+
+    def test_entries_are_checked_in_order(self):
+        first = self.students[0]
+        entries = [
+            ExamScore(exam=self.exam, student=first, score=45),
+            # Lower than the score just before it
+            ExamScore(exam=self.exam, student=first, score=35),
+            ExamScore(exam=self.exam, student=first, score=50),
+        ]
+        errors = ScoreEntry.validate_many(entries)
+        self.assertEqual([entry for entry, _ in errors], [entries[1]])
+
+    def test_given_best_scores_save_the_query(self):
+        entry = ExamScore(exam=self.exam, student=self.students[1], score=10)
+        key = entry.best_score_key()
+        with self.assertNumQueries(0):
+            errors = ScoreEntry.validate_many([entry], {key: 20})
+        self.assertEqual(len(errors), 1)
+
+    def test_clean_runs_the_same_checks(self):
+        with self.assertRaises(ValidationError):
+            ExamScore(exam=self.exam, student=self.students[0], score=20).clean()
+        ExamScore(exam=self.exam, student=self.students[0], score=30).clean()
+
+    def test_homework_from_the_future(self):
+        score = HomeworkScore(homework=self.homework, student=self.students[1], score=50,
+                              turn_in_time=timezone.now() + datetime.timedelta(days=1))
+        with self.assertRaises(ValidationError) as ctx:
+            score.clean()
+        self.assertIn('turn_in_time', ctx.exception.message_dict)
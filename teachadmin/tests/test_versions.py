@@ -0,0 +1,123 @@
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..models import (Student, Exam, ExamScore, Lesson, Homework, HomeworkScore,
+                        ScoreDataVersion)
+from ..signals import students_added
+from .utils import make_teacher, make_class
+
+
+class ScoreDataVersionTests(TestCase):
+
+    def test_unchanged_object_has_version_zero(self):
+        version = ScoreDataVersion.get_for(make_teacher())
+        self.assertEqual(version.version, 0)
+        self.assertIsNone(version.pk)
+
+    def test_bump_creates_missing_rows_and_counts_up(self):
+        ScoreDataVersion.bump([('exam', 1), ('exam', 2)])
+        ScoreDataVersion.bump([('exam', 2), ('subject', 1), ('student', None)])
+        self.assertEqual(
+            dict(((model, pk), version) for model, pk, version in
+                 ScoreDataVersion.objects.values_list('model', 'object_id', 'version')),
+            {('exam', 1): 1, ('exam', 2): 2, ('subject', 1): 1})
+
+    def test_bump_queries(self):
+        ScoreDataVersion.bump([('exam', 1)])
+        with CaptureQueriesContext(connection) as ctx:
+            ScoreDataVersion.bump([('exam', 1)])
+        # One read of the existing rows and one update (plus the savepoint), no inserts
+        statements = [query['sql'].split()[0] for query in ctx.captured_queries]
+        self.assertEqual([sql for sql in statements if sql in ('SELECT', 'INSERT', 'UPDATE')],
+                         ['SELECT', 'UPDATE'])
+
+
+class VersionSignalTests(TransactionTestCase):
+    """ The signal handlers bump the versions once the transaction commits,
+        so these tests run outside of the TestCase transaction. """
+
+    def setUp(self):
+        self.teacher = make_teacher()
+        self.homeroom, self.subject, self.students = make_class(self.teacher)
+        self.lesson = Lesson.objects.create(name="Fractions", subject=self.subject)
+        self.exam = Exam.objects.create(name="Midterm", subject=self.subject)
+
+    def versions(self, *objects):
+        return [ScoreDataVersion.get_for(obj).version for obj in objects]
+
+    def assertBumped(self, objects, change):
+        before = self.versions(*objects)
+        change()
+        self.assertEqual(self.versions(*objects), [version + 1 for version in before])
+
+    def assertNotBumped(self, objects, change):
+        before = self.versions(*objects)
+        change()
+        self.assertEqual(self.versions(*objects), before)
+
+    def test_score_save_and_delete(self):
+        student = self.students[0]
+        above = [self.exam, self.subject, self.homeroom, student]
+        self.assertBumped(above, lambda: ExamScore.objects.create(
+            exam=self.exam, student=student, score=50))
+        self.assertNotBumped([self.students[1], self.lesson], lambda: ExamScore.objects.create(
+            exam=self.exam, student=student, score=60))
+        self.assertBumped(above, lambda: ExamScore.objects.filter(student=student).first().delete())
+
+    def test_homework_score_bumps_its_lesson(self):
+        homework = Homework.objects.create(name="Reading", lesson=self.lesson)
+        self.assertBumped(
+            [homework, self.lesson, self.subject, self.homeroom],
+            lambda: HomeworkScore.objects.create(homework=homework, student=self.students[0], score=10))
+
+    def test_score_moved_to_another_student(self):
+        first, second = self.students[:2]
+        score = ExamScore.objects.create(exam=self.exam, student=first, score=50)
+
+        def move():
+            score.student = second
+            score.save()
+        self.assertBumped([first, second, self.exam], move)
+
+    def test_item_change_bumps_the_timelines_of_its_students(self):
+        ExamScore.objects.create(exam=self.exam, student=self.students[0], score=50)
+
+        def rename():
+            self.exam.name = "Midterm (retake)"
+            self.exam.save()
+        self.assertBumped([self.exam, self.subject, self.homeroom, self.students[0]], rename)
+        self.assertNotBumped([self.students[1]], rename)
+
+    def test_student_change(self):
+        def rename():
+            self.students[0].last_name = "Renamed"
+            self.students[0].save()
+        self.assertBumped([self.students[0], self.homeroom, self.subject, self.lesson], rename)
+
+    def test_student_moved_to_another_homeroom(self):
+        other_homeroom, _, _ = make_class(self.teacher, students=0, name="1B")
+
+        def move():
+            self.students[0].homeroom = other_homeroom
+            self.students[0].save()
+        self.assertBumped([self.homeroom, other_homeroom], move)
+
+    def test_student_subjects_changed(self):
+        _, other_subject, _ = make_class(self.teacher, students=0, name="1B")
+        student = self.students[0]
+        self.assertBumped([other_subject], lambda: student.subject.add(other_subject))
+        self.assertBumped([self.subject, self.lesson], lambda: self.subject.student_set.remove(student))
+        self.assertBumped([other_subject], lambda: student.subject.clear())
+
+    def test_subject_homerooms_changed(self):
+        other_homeroom, _, _ = make_class(self.teacher, students=0, name="1B")
+        self.assertBumped([other_homeroom], lambda: self.subject.homeroom.add(other_homeroom))
+        self.assertBumped([self.homeroom], lambda: self.homeroom.subject_set.remove(self.subject))
+        self.assertBumped([other_homeroom], lambda: self.subject.homeroom.clear())
+
+    def test_bulk_created_students(self):
+        def add():
+            Student.objects.bulk_create([Student(first_name="New", homeroom=self.homeroom)])
+            students_added(self.homeroom)
+        self.assertBumped([self.homeroom, self.subject, self.lesson], add)
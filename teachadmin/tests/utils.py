@@ -0,0 +1,33 @@
+""" Small builders for the objects most tests need: a teacher with a school, a homeroom,
+    a subject and a few students in it. """
+
+from django.contrib.auth.models import User
+
+from ..models import Teacher, School, HomeRoom, Subject, Student
+
+
+def make_teacher(username: str = 'teacher'):
+    user = User.objects.create_user(username=username, password='secret')
+    return Teacher.objects.create(user=user)
+
+
+def make_class(teacher, students: int = 3, name: str = "1A"):
+    """ A school with one homeroom and one subject, and <students> students in both.
+        params: teacher (Teacher), students (int) = 3, name (str) = "1A" (the homeroom's name)
+        OUTPUT: (HomeRoom, Subject, list of Student) """
+    school = School.objects.create(name="School of {}".format(teacher))
+    school.teacher.add(teacher)
+    homeroom = HomeRoom.objects.create(name=name, school=school)
+    homeroom.teacher.add(teacher)
+    subject = Subject.objects.create(name="Math {}".format(name), school=school)
+    subject.teacher.add(teacher)
+    subject.homeroom.add(homeroom)
+    members = []
+    for number in range(1, students + 1):
+        student = Student.objects.create(
+            first_name="Student{}".format(number), last_name=name,
+            student_number=str(number), homeroom=homeroom)
+        student.subject.add(subject)
+        student.teacher.add(teacher)
+        members.append(student)
+    return homeroom, subject, members
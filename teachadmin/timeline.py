@@ -0,0 +1,97 @@
+""" A student's scores over time: every score of all four kinds (exams, assignments, lesson
+    tests and homework), in percent of the score model's max_score and put in order of the
+    score model's date. The rows are read from the four score tables with ONE UNION query
+    (see ScoreEntry.percentages()), each one carrying the date of its score model:
+        Exam.date, Assignment.deadline, LessonTest.test_date, Homework.deadline
+    The rendered timeline is kept in the graph cache under the student's ScoreDataVersion,
+    which the signal handlers bump whenever one of the student's scores, or the name or date
+    of a score model the student has a score for, changes. So a timeline is only rendered
+    again once something on it has actually changed. """
+
+from django.db.models import DateField, F
+from django.db.models.functions import TruncDate
+
+from .models import (ExamScore, AssignmentScore, LessonTestScore, HomeworkScore,
+                        ScoreDataVersion)
+from .graphcache import graph_cache
+from .plotting import figure, to_bytes, tilt_xticklabels
+
+import pandas as pd
+
+# Score table => date of its score model (deadlines are DateTimeFields, cut to their date)
+TIMELINE_DATES = {
+    ExamScore: F('exam__date'),
+    AssignmentScore: TruncDate('assignment__deadline', output_field=DateField()),
+    LessonTestScore: F('lessonTest__test_date'),
+    HomeworkScore: TruncDate('homework__deadline', output_field=DateField()),
+}
+
+# Model name => label in the graph's legend
+KIND_LABELS = {
+    'exam': "Exams",
+    'assignment': "Assignments",
+    'lessontest': "Lesson tests",
+    'homework': "Homework",
+}
+
+TIMELINE_COLUMNS = ['Model', 'Item', 'Student', 'Score', 'Percent', 'Date', 'Name']
+
+
+def timeline_scores(student):
+    """ Every score of a student, of all four kinds, in order of the score models' dates.
+        params: student (Student)
+        OUTPUT: DataFrame ['Model', 'Item', 'Student', 'Score', 'Percent', 'Date', 'Name']
+                (Percent is NaN for score models with a max_score of 0) """
+    querysets = [
+        score_model.objects.filter(student=student).annotate(
+            item_date=item_date,
+            item_name=F('{}__name'.format(score_model.ITEM_FIELD)),
+        ).percentages('item_date', 'item_name')
+        for score_model, item_date in TIMELINE_DATES.items()
+    ]
+    rows = querysets[0].union(*querysets[1:], all=True).order_by('item_date', 'entry_model', 'item')
+    scores = pd.DataFrame.from_records(list(rows), columns=TIMELINE_COLUMNS)
+    scores['Date'] = pd.to_datetime(scores['Date'])
+    scores['Percent'] = scores['Percent'].astype('float64')
+    return scores
+
+
+def render_timeline(student, scores: pd.DataFrame, fmt: str = 'png'):
+    """ Draws a student's best score per score model over time, one line per kind.
+        params: student (Student), scores (DataFrame from timeline_scores()),
+                fmt (str) = 'png' / 'svg'
+        OUTPUT: bytes / None (nothing to draw) """
+    best = scores.dropna(subset=['Percent']).groupby(
+        ['Model', 'Item', 'Date'], sort=False)['Percent'].max().reset_index()
+    if best.empty:
+        return None
+
+    with figure() as (fig, axes):
+        for model_name, label in KIND_LABELS.items():
+            kind = best[best['Model'] == model_name].sort_values('Date', kind='mergesort')
+            if not kind.empty:
+                axes.plot(kind['Date'], kind['Percent'], marker='o', label=label)
+        axes.set_ylim(best['Percent'].min() - 2, max(best['Percent'].max(), 100) + 2)
+        axes.set_ylabel("Score (%)")
+        axes.legend(loc='lower left')
+        tilt_xticklabels(axes)
+        axes.set_title("{} over time".format(student))
+        fig.tight_layout()
+        return to_bytes(fig, fmt)
+
+
+def timeline_image(student, fmt: str = 'png', version: int = None):
+    """ The student's timeline as PNG or SVG bytes, rendered only if the current version
+        of the student's scores hasn't been rendered (and cached) before.
+        params: student (Student), fmt (str) = 'png' / 'svg',
+                version (int) = the student's ScoreDataVersion if already known
+        OUTPUT: bytes / None (no scores) """
+    model_name = student._meta.model_name
+    if version is None:
+        version = ScoreDataVersion.get_for(student).version
+    image = graph_cache.get(model_name, student.pk, version, fmt)
+    if image is None:
+        image = render_timeline(student, timeline_scores(student), fmt)
+        if image:
+            graph_cache.set(model_name, student.pk, version, image, fmt)
+    return image
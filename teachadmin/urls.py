@@ -4,6 +4,12 @@ from . import views
 
 app_name = 'teachadmin'
 
+graph_patterns = [
+    path('<str:model>/<int:pk>.<str:fmt>',
+        views.graph_image,
+        name='graph'),
+]
+
 homeroom_patterns = [
     path('all/',
         views.HomeRoomListView.as_view(),
@@ -23,6 +29,10 @@ homeroom_patterns = [
     path('<int:pk>/update/',
         views.HomeRoomUpdateView.as_view(),
         name='homeroom_update'),
+    path('<int:pk>/comments.txt',
+        views.group_comments,
+        {'model': 'homeroom'},
+        name='homeroom_comments'),
     path('<int:pk>/update_subject/<subject_update>/',
         views.HomeRoomUpdateView.as_view(),
         name='homeroom_update_subject'),
@@ -47,6 +57,9 @@ school_patterns = [
     path('<int:pk>/update/',
         views.SchoolUpdateView.as_view(),
         name='school_update'),
+    path('<int:pk>/reports.<str:fmt>.zip',
+        views.school_reports,
+        name='school_reports'),
     path('<int:school_pk>/homerooms/new/',
         views.HomeRoomCreateView.as_view(),
         name='school_add_homeroom')
@@ -92,6 +105,10 @@ subject_patterns = [
     path('<int:pk>/add-student/',
         views.SubjectUpdateView.as_view(),
         name='subject_add_student'),
+    path('<int:pk>/comments.txt',
+        views.group_comments,
+        {'model': 'subject'},
+        name='subject_comments'),
     path('<int:subject_pk>/add-exam/',
         views.ExamCreateView.as_view(),
         name='subject_add_exam'),
@@ -110,6 +127,9 @@ subject_patterns = [
     path('<int:subject_pk>/exams/<int:exam_pk>/scores/new/',
         views.ExamScoreCreateView.as_view(),
         name='subject_exam_add_score'),
+    path('<int:subject_pk>/exams/<int:exam_pk>/scores/bulk/',
+        views.ExamBulkScoreView.as_view(),
+        name='exam_bulk_scores'),
     path('<int:subject_pk>/exams/<int:exam_pk>/scores/<int:pk>/',
         views.ExamScoreDetailView.as_view(),
         name='examscore_detail'),
@@ -119,6 +139,9 @@ subject_patterns = [
     path('<int:subject_pk>/exams/<int:exam_pk>/scores/<int:pk>/delete/',
         views.ExamScoreDeleteView.as_view(),
         name='examscore_delete'),
+    path('<int:subject_pk>/import-scores/',
+        views.ScoreImportView.as_view(),
+        name='subject_import_scores'),
     path('<int:subject_pk>/add-lesson/',
         views.LessonCreateView.as_view(),
         name='subject_add_lesson'),
@@ -131,6 +154,9 @@ subject_patterns = [
     path('<int:subject_pk>/lessons/<int:pk>/delete/',
         views.LessonDeleteView.as_view(),
         name='lesson_delete'),
+    path('<int:subject_pk>/lessons/<int:lesson_pk>/import-scores/',
+        views.ScoreImportView.as_view(),
+        name='lesson_import_scores'),
     path('<int:subject_pk>/lessons/<int:lesson_pk>/homework/new/',
         views.HomeworkCreateView.as_view(),
         name='lesson_add_homework'),
@@ -146,6 +172,9 @@ subject_patterns = [
     path('<int:subject_pk>/lessons/<int:lesson_pk>/homework/<int:homework_pk>/add-score/',
         views.HomeworkScoreCreateView.as_view(),
         name='homework_add_score'),
+    path('<int:subject_pk>/lessons/<int:lesson_pk>/homework/<int:homework_pk>/bulk-scores/',
+        views.HomeworkBulkScoreView.as_view(),
+        name='homework_bulk_scores'),
     path('<int:subject_pk>/lessons/<int:lesson_pk>/tests/new/',
         views.LessonTestCreateView.as_view(),
         name='lesson_add_test'),
@@ -161,6 +190,9 @@ subject_patterns = [
     path('<int:subject_pk>/lessons/<int:lesson_pk>/tests/<int:lessontest_pk>/testscores/new/',
         views.LessonTestScoreCreateView.as_view(),
         name='lessontest_add_score'),
+    path('<int:subject_pk>/lessons/<int:lesson_pk>/tests/<int:lessontest_pk>/testscores/bulk/',
+        views.LessonTestBulkScoreView.as_view(),
+        name='lessontest_bulk_scores'),
     path('<int:subject_pk>/lessons/<int:lesson_pk>/tests/<int:lessontest_pk>/testscores/<int:pk>/',
         views.LessonTestScoreDetailView.as_view(),
         name='lessontestscore_detail'),
@@ -184,7 +216,10 @@ subject_patterns = [
         name='assignment_delete'),
     path('<int:subject_pk>/assignment/<int:assignment_pk>/add_score/',
         views.AssignmentScoreCreateView.as_view(),
-        name='assignment_add_score')
+        name='assignment_add_score'),
+    path('<int:subject_pk>/assignment/<int:assignment_pk>/bulk_scores/',
+        views.AssignmentBulkScoreView.as_view(),
+        name='assignment_bulk_scores'),
 ]
 
 teacher_patterns = [
@@ -198,6 +233,7 @@ urlpatterns = [
     path('logout/', views.teachadmin_logout, name='logout'),
     path('login/', views.teachadmin_login, name='login'),
     path('addSchool/', views.addSchool, name='addSchool'),
+    path('graph/', include(graph_patterns)),
     path('homeroom/', include(homeroom_patterns)),
     path('schools/', include(school_patterns)),
     path('student/', include(student_patterns)),
@@ -1,14 +1,18 @@
-from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.http import Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, render
 from django.urls import reverse, reverse_lazy
 from django.views import generic, View
-from django.core.exceptions import ValidationError, NON_FIELD_ERRORS
 from django.core.files.storage import FileSystemStorage
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.models import User
+from django.contrib import messages
 from django.db.models import Q
+from django.utils.cache import patch_cache_control
+from django.utils.html import escape
+from django.utils.text import slugify
+from django.views.decorators.http import condition
 
 from django.conf import settings
 
@@ -17,21 +21,17 @@ from .models import (Teacher, School, Student,
                         HomeRoom, Subject, Exam, ExamScore,
                         Lesson, LessonTest, LessonTestScore,
                         BehaviorType, BehaviorEvent, 
-                        Homework, HomeworkScore)
+                        Homework, HomeworkScore,
+                        ScoreDataVersion, GraphRenderJob)
 from . import forms
 from django import forms as djangoforms
 
-from .graph import Graph
-
-from datetime import datetime
-import pandas as pd
-import seaborn as sns
-from matplotlib import pyplot as plt
-from pandas.plotting import register_matplotlib_converters
-
-import os
-import io
-import urllib, base64
+from .graph import GRAPH_MODELS, GRAPH_FORMATS, graph_image as render_graph_image, graph_url
+from .graphcache import graph_cache
+from . import bulkscores, comments, reports, roster, scoreimport
+from .growth import group_growth
+from .stats import homeroom_stats
+from .studentgroup import student_group
 
 # Create your views here.
 
@@ -53,11 +53,10 @@ class AssignmentDetailView(LoginRequiredMixin, generic.DetailView):
         context = super().get_context_data(**kwargs)
 
         students = self.object.subject.student_set.all()
-        assignmentscores = self.object.assignmentscore_set.filter(student__in=students)
+        assignmentscores = self.object.assignmentscore_set.filter(student__in=students).for_display()
         context['assignmentscores'] = assignmentscores
 
-        graph = Graph(self.object)
-        context['graph'] = graph.uri
+        context['graph'] = graph_url(self.object)
 
         return context
 
@@ -175,8 +174,7 @@ class ExamDetailView(LoginRequiredMixin, generic.DetailView):
         self.view_title = "{} ({})".format(self.object, subject)
         context['view_title'] = self.view_title
 
-        graph = Graph(self.object)
-        context['graph'] = graph.uri
+        context['graph'] = graph_url(self.object)
 
         return context
 
@@ -301,6 +299,141 @@ class ExamScoreCreateView(LoginRequiredMixin, generic.CreateView):
         return super().form_valid(form)
 
 
+class BulkScoreView(LoginRequiredMixin, generic.FormView):
+    """ Grid for entering the scores of all the students of a subject for one
+        score model at once (see bulkscores.py). Subclasses set the score model
+        and the URL keyword argument holding its pk. """
+    login_url = 'teachadmin/login/'
+    redirect_field_name = 'teachadmin/bulkscore_form.html'
+
+    template_name = 'teachadmin/bulkscore_form.html'
+    form_class = forms.BulkScoreForm
+    item_model = None
+    item_kwarg = None
+
+    def setup(self, request, *args, **kwargs):
+        super().setup(request, *args, **kwargs)
+        # Anonymous requests are redirected by LoginRequiredMixin.dispatch() without
+        # touching the database (nor learning which items exist)
+        if request.user.is_authenticated:
+            self.item = get_object_or_404(self.item_model, pk=kwargs.get(self.item_kwarg))
+            self.subject = bulkscores.item_subject(self.item)
+            self.students = list(self.subject.students())
+            self.best_scores = bulkscores.best_scores(self.item)
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['students'] = self.students
+        kwargs['best_scores'] = self.best_scores
+        return kwargs
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['item'] = self.item
+        context['subject'] = self.subject
+        context['view_title'] = "Add scores to {}".format(self.item)
+        return context
+
+    def form_valid(self, form):
+        entries = bulkscores.build_scores(self.item, form.scores())
+        errors = bulkscores.check_scores(entries, self.best_scores)
+        if errors:
+            for student_pk, error_messages in errors.items():
+                for message in error_messages:
+                    form.add_error('student_{}'.format(student_pk), message)
+            return self.form_invalid(form)
+
+        bulkscores.save_scores(self.item, entries, self.best_scores)
+        messages.success(self.request, "Added {} score(s) to {}.".format(len(entries), self.item))
+        return HttpResponseRedirect(self.item.get_absolute_url())
+
+
+class ExamBulkScoreView(BulkScoreView):
+    item_model = Exam
+    item_kwarg = 'exam_pk'
+
+
+class AssignmentBulkScoreView(BulkScoreView):
+    item_model = Assignment
+    item_kwarg = 'assignment_pk'
+
+
+class LessonTestBulkScoreView(BulkScoreView):
+    item_model = LessonTest
+    item_kwarg = 'lessontest_pk'
+
+
+class HomeworkBulkScoreView(BulkScoreView):
+    item_model = Homework
+    item_kwarg = 'homework_pk'
+
+
+class ScoreImportView(LoginRequiredMixin, generic.FormView):
+    """ Upload of a score sheet (see scoreimport.py) into a Subject's exams or assignments,
+        or into a Lesson's tests or homeworks. The sheet is imported chunk by chunk and
+        the outcome is reported through the messages framework. """
+    login_url = 'teachadmin/login/'
+    redirect_field_name = 'teachadmin/scoreimport_form.html'
+
+    template_name = 'teachadmin/scoreimport_form.html'
+    form_class = forms.ScoreImportForm
+
+    # Row errors shown after an import, the rest is only counted
+    MAX_REPORTED_ERRORS = 20
+
+    def setup(self, request, *args, **kwargs):
+        super().setup(request, *args, **kwargs)
+        # Only after the login, see BulkScoreView.setup()
+        if not request.user.is_authenticated:
+            return
+        if kwargs.get('lesson_pk'):
+            self.owner = get_object_or_404(Lesson, pk=kwargs['lesson_pk'], subject__pk=kwargs['subject_pk'])
+            self.model_choices = [('lessontest', 'Lesson tests'), ('homework', 'Homeworks')]
+        else:
+            self.owner = get_object_or_404(Subject, pk=kwargs['subject_pk'])
+            self.model_choices = [('exam', 'Exams'), ('assignment', 'Assignments')]
+
+    def get_initial(self):
+        initial = super().get_initial()
+        if self.request.GET.get('model') in dict(self.model_choices):
+            initial['model'] = self.request.GET['model']
+        return initial
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['model_choices'] = self.model_choices
+        return kwargs
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['owner'] = self.owner
+        context['view_title'] = "Import scores into {}".format(self.owner)
+        return context
+
+    def form_valid(self, form):
+        upload = form.cleaned_data['file']
+        teacher = get_object_or_404(Teacher, user=self.request.user)
+        try:
+            report = scoreimport.import_scores(upload, form.cleaned_data['model'], self.owner,
+                                               filename=upload.name, teacher=teacher)
+        except Exception as err:
+            print("Unable to read score sheet")
+            print(err)
+            messages.error(self.request, "Unable to read the file: {}".format(err))
+            return self.form_invalid(form)
+
+        messages.success(self.request, "Imported {} score(s) from {} row(s) into {}.".format(
+            report['created'], report['rows'], self.owner))
+        if report['skipped']:
+            messages.info(self.request, "{} score(s) were already there.".format(report['skipped']))
+        for line, column, message in report['errors'][:self.MAX_REPORTED_ERRORS]:
+            messages.warning(self.request, "Line {} ({}): {}".format(line, column, message))
+        if report['error_count'] > self.MAX_REPORTED_ERRORS:
+            messages.warning(self.request, "... and {} more problem(s).".format(
+                report['error_count'] - self.MAX_REPORTED_ERRORS))
+        return HttpResponseRedirect(self.owner.get_absolute_url())
+
+
 class ExamScoreUpdateView(LoginRequiredMixin, generic.UpdateView):
     login_url = 'teachadmin/login/'
     redirect_field_name = 'teachadmin/examscore_form.html'
@@ -392,11 +525,10 @@ class HomeRoomDetailView(LoginRequiredMixin, generic.DetailView):
         context['subject_update'] = True
         context['student_update'] = True
 
-        graph = Graph(self.object)
-        context['graph'] = graph.uri
-        stats = graph.get_generalstats_dict()
-        if stats:
-            context['stats'] = stats
+        context['graph'] = graph_url(self.object)
+        context['stats'] = homeroom_stats([self.object])[self.object]
+        context['class_stats'] = student_group(self.object)
+        context['growth'] = group_growth(self.object)
 
         return context
     
@@ -408,39 +540,27 @@ class HomeRoomCreateView(LoginRequiredMixin, generic.CreateView):
     model = HomeRoom
     form_class = forms.HomeRoomForm
 
+    # Row errors shown after an import, the rest is only counted
+    MAX_REPORTED_ERRORS = 20
+
     def _process_homeroomfile(self, homeroom, teacher):
-        if self.request.method == "POST":
-            try:
-                results = pd.read_csv(
-                    self.request.FILES['homeroomfile'])
-            except Exception as err:
-                print("Unable to read .csv-file")
-                print(err)
-                raise Http404("Unable to read CSV-file")
-            else:
-                results['Last'] = results['Last'].astype('str')
-                results['Last'] = results['Last'].apply(last_name_check)
-                print(results)
-                results.info()
-
-                for row in results.itertuples():
-                    student = Student(
-                        student_number=row.Number,
-                        first_name=row.First,
-                        last_name=row.Last,
-                        gender=row.Gender,
-                        homeroom=homeroom
-                    )
-                    try:
-                        student.full_clean()
-                    except ValidationError as verr:
-                        non_field_errors = verr.message_dict[NON_FIELD_ERRORS]
-                    else:
-                        student.save()
-                        print(student)
-                        teacher.student_set.add(student)
-        else:
-            print("Try with a POST-reqest next time.")
+        """ Imports the students of the uploaded roster (see roster.py) and reports
+            the rows that couldn't be imported through the messages framework. """
+        try:
+            results = roster.read_roster(self.request.FILES['homeroomfile'])
+        except Exception as err:
+            print("Unable to read .csv-file")
+            print(err)
+            messages.error(self.request, "Unable to read the CSV-file: {}".format(err))
+            return
+
+        students, errors = roster.import_roster(results, homeroom, teacher)
+        messages.success(self.request, "Imported {} student(s) into {}.".format(len(students), homeroom))
+        for line, message in errors[:self.MAX_REPORTED_ERRORS]:
+            messages.warning(self.request, "Line {}: {}".format(line, message))
+        if len(errors) > self.MAX_REPORTED_ERRORS:
+            messages.warning(self.request, "... and {} more problem(s).".format(
+                len(errors) - self.MAX_REPORTED_ERRORS))
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -496,16 +616,13 @@ class HomeRoomUpdateView(LoginRequiredMixin, generic.UpdateView):
         if self.form_class == forms.HomeRoomAddSubjectForm:
             for subject in Subject.objects.filter(pk__in=form.cleaned_data.get('subjects')):
                 homeroom.subject_set.add(subject)
-                if homeroom.students().exists():
-                    for student in homeroom.student_set.all():
-                        subject.student_set.add(student)
+                for student in homeroom.students():
+                    subject.student_set.add(student)
         elif self.form_class == forms.HomeRoomAddStudentForm:
             for student in Student.objects.filter(pk__in=form.cleaned_data.get('students')):
                 homeroom.student_set.add(student)
-                homeroom_subjects = homeroom.subjects()
-                if homeroom_subjects.exists():
-                    for subject in homeroom_subjects:
-                        subject.student_set.add(student)
+                for subject in homeroom.subjects():
+                    subject.student_set.add(student)
         else:
             students = Student.objects.filter(pk__in=self.request.POST.getlist('selected_students'))
             if students.count() >= 1:
@@ -607,8 +724,7 @@ class HomeworkDetailView(LoginRequiredMixin, generic.DetailView):
         view_title = "{} ({})".format(self.object, self.object.lesson)
         context['view_title'] = view_title
 
-        graph = Graph(self.object)
-        context['graph'] = graph.uri
+        context['graph'] = graph_url(self.object)
 
         return context
 
@@ -687,111 +803,13 @@ class LessonDetailView(LoginRequiredMixin, generic.DetailView):
     context_object_name = 'lesson'
     model = Lesson
 
-    def create_graph(self):
-        """ Generates a graph for the view that gets saved onto the server
-            and then loaded as a picture through <img>-tag in template 
-            INPUT: None
-            OUTPUT: Bool (True/False) """
-
-        lessontests = self.object.lessontest_set.all().order_by('test_date')
-        homeworks = self.object.homework_set.all()
-        students = self.object.subject.student_set.all()
-
-        lessontestscores = LessonTestScore.objects.filter(lessonTest__in=lessontests).order_by('student', 'lessonTest')
-        homeworkscores = HomeworkScore.objects.filter(homework__in=homeworks).order_by('student', 'homework')
-
-        index = []
-        scores = {
-            'Student':[],
-        }
-        testscores = {}
-        homeworkscoredict = {}
-        
-        for count, student in enumerate(students):
-            add_score = False
-            for lessontestscore in lessontestscores.filter(student=student):
-                if '{}({})'.format(lessontestscore.lessonTest, lessontestscore.lessonTest.pk) not in scores.keys():
-                    scores['{}({})'.format(lessontestscore.lessonTest, lessontestscore.lessonTest.pk)] = []
-                    testscores['{}({})'.format(lessontestscore.lessonTest, lessontestscore.lessonTest.pk)] = []
-                testscores['{}({})'.format(
-                    lessontestscore.lessonTest, lessontestscore.lessonTest.pk
-                    )].append(round(((lessontestscore.score/lessontestscore.lessonTest.max_score)*100),1))
-            
-            for key in testscores.keys():
-                scores[key].append(max(testscores[key]))
-                add_score = True
-
-            for homeworkscore in homeworkscores.filter(student=student):
-                if '{}({})'.format(homeworkscore.homework, homeworkscore.homework.pk) not in scores.keys():
-                    scores['{}({})'.format(homeworkscore.homework,
-                                           homeworkscore.homework.pk)] = []
-                    homeworkscoredict['{}({})'.format(
-                        homeworkscore.homework, homeworkscore.homework.pk)] = []
-                homeworkscoredict['{}({})'.format(
-                    homeworkscore.homework, homeworkscore.homework.pk
-                )].append(round(((homeworkscore.score/homeworkscore.homework.max_score)*100), 1))
-
-            for key in homeworkscoredict.keys():
-                scores[key].append(max(homeworkscoredict[key]))
-                add_score = True
-
-            if add_score:
-                index.append(count)
-                scores['Student'].append(str(student))
-
-        print(scores)
-        scoresDF = pd.DataFrame(data=scores, index=index)
-        checkDF = scoresDF.iloc[:,1:]
-
-        if checkDF.empty:
-            return False
-
-        fig = plt.figure()
-        sns.set_style(style='darkgrid')
-        plt.style.use("dark_background")
-        sns.swarmplot(
-            data=scoresDF,
-            palette="bright"
-        )
-        axes = fig.gca()
-        axes.set_ylim(
-            (scoresDF.min(axis=0, numeric_only=True).min())-int(
-                (scoresDF.max(axis=0, numeric_only=True).max() -
-                scoresDF.min(axis=0, numeric_only=True).min())*0.1
-            ),
-            (scoresDF.max(axis=0, numeric_only=True).max())+int(
-                (scoresDF.max(axis=0, numeric_only=True).max() -
-                scoresDF.min(axis=0, numeric_only=True).min())*0.1
-            )
-        )
-        plt.setp(axes.get_xticklabels(), rotation=45, ha="right",
-                 rotation_mode="anchor")
-        axes.set_title("{} scores".format(self.object))
-        plt.tight_layout()
-
-        buf = io.BytesIO()
-        try:
-            plt.savefig(buf, format='png')
-        except Exception as err:
-            print("Couldn't generate the graph for {}".format(self.object))
-            print(err)
-        else:
-            buf.seek(0)
-            pltstring = base64.b64encode(buf.read())
-            uri = urllib.parse.quote(pltstring)
-            return uri
-
-        return False
-
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
         view_title = "{} ({})".format(self.object, self.object.subject)
         context['view_title'] = view_title
 
-        #context['graph'] = self.create_graph()
-        graph = Graph(self.object)
-        context['graph'] = graph.uri
+        context['graph'] = graph_url(self.object)
 
         return context
 
@@ -868,11 +886,10 @@ class LessonTestDetailView(LoginRequiredMixin, generic.DetailView):
         self.view_title = "{}".format(self.object)
         context['view_title'] = self.view_title
 
-        graph = Graph(self.object)
-        if graph.uri != False:
-            context['graph'] = graph.uri
+        context['graph'] = graph_url(self.object)
 
-        context['scores'] = self.object.scores()
+        scores = self.object.scores()
+        context['scores'] = scores.for_display() if scores else scores
 
         return context
 
@@ -1078,12 +1095,8 @@ class SchoolDetailView(LoginRequiredMixin, generic.DetailView):
         context["students"] = students
 
         homerooms_stats_dict = {}
-        for homeroom in homerooms:
-            homerooms_stats_dict["{}".format(homeroom)] = {}
-            graph = Graph(homeroom, 'df')
-            homerooms_stats_dict["{}".format(homeroom)].update(
-                graph.get_generalstats_dict()
-            )
+        for homeroom, stats in homeroom_stats(homerooms).items():
+            homerooms_stats_dict["{}".format(homeroom)] = stats
         
         context['homerooms_stats_dict'] = homerooms_stats_dict
 
@@ -1129,188 +1142,6 @@ class SchoolDeleteView(LoginRequiredMixin, generic.DeleteView):
         return context
 
 
-class StudentView(generic.ListView):
-    """ This is the ListView that shows a list of Students within a
-            specific StudentClass """
-
-    template_name = 'teachadmin/class_students.html'
-    context_object_name = 'students_list'
-
-    def get_class_graph(self):
-        """ Function to generate and save a graph for use in template """
-        studentClassTests = self.studentClass.studentclasstest_set.all()
-        studentClassAssignments = self.studentClass.assignment_set.all()
-        studentClassStudents = self.studentClass.student_set.all()
-
-        scores = {}
-        scores['Name'] = []
-        scores['Gender'] = []
-        student_numbers = []
-
-        for count, student in enumerate(studentClassStudents):
-            scores['Name'].append(student.first_name)
-            scores['Gender'].append(student.gender)
-            student_numbers.append(student.student_number)
-
-            for test in studentClassTests.filter(studentClass=self.studentClass.id):
-                if count == 0:
-                    scores[f"{test.name}"] = []
-
-                score = student.studentclasstestscore_set.filter(test=test.pk)[0]
-                scores[f"{test.name}"].append(round(
-                    (score.score / test.max_score)*100, 1))
-
-            for assignment in studentClassAssignments.filter(studentClass=self.studentClass.id):
-                if count == 0:
-                    scores[f"{assignment.name}"] = []
-
-                score = student.assignmentscore_set.filter(assignment=assignment.pk)[0]
-                scores[f"{assignment.name}"].append(round(
-                    (score.score / assignment.max_score)*100, 1))
-
-        scoresDF = pd.DataFrame(scores, index=student_numbers)
-        scoresDF.info()
-        scoresDF.describe()
-
-        fig = plt.figure()
-        sns.set_style(style='darkgrid')
-        sns.swarmplot(
-            data=scoresDF,
-            palette='deep')
-
-        axes = fig.gca()
-        axes.set_ylim(
-            (scoresDF.min(axis=0, numeric_only=True).min())-3,
-            (scoresDF.max(axis=0, numeric_only=True).max())+5
-            )
-
-        plt.setp(axes.get_xticklabels(), rotation=45, ha="right",
-            rotation_mode="anchor")
-        axes.set_title("{} Test Data".format(self.studentClass))
-        plt.tight_layout()
-
-        # Getting the complete filepath to which we save the graph
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        static_dir = os.path.join(base_dir, 'teachadmin\\static\\teachadmin')
-        fig_dir = os.path.join(static_dir, 'classes\\')
-
-        plt.savefig('{}{}.png'.format(fig_dir, self.studentClass.name), format='png')
-        plt.close(fig)
-
-        return scoresDF
-
-    def get_studentClass_comments(self, scoresDF: pd.DataFrame):
-        """ This method is meant to take whatever scores-sheet is derived
-            from the get_class_graph()-method and generate some general comments
-            for each student based on how much they improved in each
-            Test or Assignment"""
-
-        advice_dict = {
-            'English':'Should practice or study Family and Friends grammar points.',
-            'Listening':'Should use the online resources from text books to help with pronunciation. YouTube also has many listening resources as well.',
-            'Phonics':'Should review the vocabulary and grammar the sounds using Oxford’s app.',
-            'Reading':'Should do plenty of reading this summer and practice answering questions about the story. YouTube has lots of read-alongside available.',
-            'Behavior':'Should practice listening and following directions the first time. I know they will get better!',
-            'Running Record':'Should do plenty of reading this summer and practice answering questions about the story. YouTube has lots of read-alongside available.'
-        }
-        skip_cats = ['Quiz', 'Homework']
-
-        final_dict = {}
-        for index, row in scoresDF.iterrows():
-            final_dict[index] = {}
-            final_dict[index]['Name'] = row['Name']
-            final_dict[index]['Gender'] = row['Gender']
-            col_dict = {}
-
-            for col in scoresDF.iloc[:,2:].columns:
-                colname, colnum = col[:-2], col[-1]
-
-                if (colname not in skip_cats) and (int(colnum) == 1):
-                    col_dict[colname] = 0
-                    for num in range(2,6):
-                        col_dict[colname] += (
-                            row[f'{colname} {num}']-row[f'{colname} {num-1}']
-                            )
-
-            max_improve_cat_key = max(col_dict.keys(), key=(lambda k: col_dict[k]))
-            min_improve_cat_key = min(col_dict.keys(), key=(lambda k: col_dict[k]))
-
-            final_dict[index]['Max Category'] = {
-                max_improve_cat_key:round(col_dict[max_improve_cat_key], 1)
-            }
-            final_dict[index]['Min Category'] = {
-                min_improve_cat_key:round(col_dict[min_improve_cat_key], 1)
-            }
-            final_dict[index]['Growth'] = "{} has shown tremendous growth in {}".format(
-                row['Name'], max_improve_cat_key
-            )
-            gender_pronoun = {'Female':'She', 'Male':'He'}
-            final_dict[index]['Advice'] = (
-                gender_pronoun[row['Gender']] + " " + advice_dict[min_improve_cat_key][0].lower() + advice_dict[min_improve_cat_key][1:]
-            )
-
-        for key, value in final_dict.items():
-            print("\n", key)
-            for cat, info in value.items():
-                if isinstance(info,dict):
-                    for infokey, infovalue in info.items():
-                        print(cat, ":", infokey, "-", infovalue)
-                else:
-                    print(info)
-
-        return final_dict
-
-    def get_queryset(self):
-        self.studentClass = get_object_or_404(
-            StudentClass, pk=self.kwargs['student_class_id'])
-
-        self.studentClass_size = len(
-            Student.objects.filter(studentClass=self.studentClass))
-
-        return Student.objects.filter(studentClass=self.studentClass)
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['student_class'] = self.studentClass
-        context['studentClass_size'] = self.studentClass_size
-
-        # Creating the form for adding a new student to current StudentClass
-        form = forms.StudentForm()
-        # Creating the form for adding a new test(exam) to current StudentClass
-        testform = forms.StudentClassTestForm()
-        # Creating the form for adding new assignments to current StudentClass
-        assignmentform = forms.AssignmentForm()
-
-        # If the forms on the view are validated, the generated values
-        # are printed to the console for confirmation
-        if self.request.method == 'POST':
-            form = forms.StudentForm(self.request.POST)
-            testform = forms.StudentClassTestForm(self.request.POST)
-
-            if form.is_valid():
-                print("VALIDATION SUCCESS!")
-                print("Name: \t" + form.cleaned_data['first_name'])
-                print("Student #: \t" + form.cleaned_data['student_number'])
-
-            elif testform.is_valid():
-                print("VALIDATION SUCCESS!")
-                print("Test Name: \t" + form.cleaned_data['test_name'])
-                print("Min. Score: \t" + form.cleaned_data['min_score'])
-                print("Max. Score: \t" + form.cleaned_data['max_score'])
-
-        context['form'] = form
-        context['testform'] = testform
-        context['assignmentform'] = assignmentform
-
-        # Creating a plot to clearly show scores of all students in a
-        # specific StudentClass through Seaborn's 'lineplot'
-
-        scoresDF = self.get_class_graph()
-        context['min_max_dict'] = self.get_studentClass_comments(scoresDF)
-
-        return context
-
-
 class StudentListView(LoginRequiredMixin, generic.ListView):
     login_url = 'teachadmin/login/'
     redirect_field_name = 'teachadmin/student_list.html'
@@ -1342,94 +1173,11 @@ class StudentDetailView(LoginRequiredMixin, generic.DetailView):
     context_object_name = 'student'
     template_name = 'teachadmin/student_detail.html'
 
-
-    # Re-write this method
-    def get_student_graph(self):
-        all_scores = {}
-        all_scores_index = []
-        for score in self.exam_scores:
-            exam_title = score.exam.name[:-2]
-            if '1' in score.exam.name:
-                all_scores[exam_title] = []
-
-            all_scores[exam_title].append(int((
-                score.score/score.exam.max_score
-                )*100))
-
-        print(all_scores)
-
-        col_length = []
-        for test in all_scores:
-            col_length.append(len(all_scores[test]))
-
-        all_scores_index.append(list(range(max(col_length))))
-        print(all_scores_index)
-
-        scoresDF = pd.DataFrame(all_scores, index=all_scores_index)
-
-        scoresDF.info()
-        print(scoresDF)
-
-        # Setting up a figure to plot on
-        fig = plt.figure()
-        # For consistency, same style as the class-graph is used
-        sns.set_style(style='darkgrid')
-        # Palette of the plot is also set to be the same
-        sns.catplot(data=scoresDF, palette='deep')
-        # Get the axes from current figure
-        axes = fig.gca()
-        # Setting y-limits based on the min and max values from DataFrame
-        axes.set_ylim(
-            (scoresDF.min(axis=0, numeric_only=True).min())-2,
-            102
-        )
-        # Based on the Series in the DataFrame, we set labels for the graph
-        # and tilt them slightly for visibility
-        plt.setp(axes.get_xticklabels(), rotation=45, ha="right",
-            rotation_mode="anchor")
-        # Last but not least, setting title for the figure and adjusting
-        # for small padding spaces (risk of labels or title being cut)
-        axes.set_title("{} Test Data".format(self.object))
-        plt.tight_layout()
-
-        # Getting the complete filepath to which we save the graph
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        static_dir = os.path.join(base_dir, 'teachadmin\\static\\teachadmin')
-        fig_dir = os.path.join(static_dir, 'students\\')
-
-        file_exists = os.path.exists(
-            fig_dir+'{}.png'.format(self.object.pk)
-            )
-
-        print(file_exists)
-
-        if not file_exists:
-            plt.savefig(
-                fig_dir+'{}.png'.format(self.object.pk),
-                format='png')
-        else:
-            time_in_seconds = os.path.getmtime(
-                fig_dir+'{}.png'.format(self.object.pk)
-                )
-            file_date = datetime.fromtimestamp(time_in_seconds)
-            right_now = datetime.now()
-            time_diff = right_now - file_date
-
-            print((time_diff.seconds)/60, " minutes")
-
-            if time_diff.seconds >= (15*60):
-                plt.savefig(
-                    fig_dir+'{}.png'.format(self.object.pk),
-                    format='png')
-                print("\n\nStudent Graph File updated!\n")
-
-        plt.close(fig)
-
-        return file_exists
-
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)    
         context['teachers'] = self.object.teacher.all()
+        # Score timeline of the student, see timeline.py
+        context['graph'] = graph_url(self.object)
 
         return context
 
@@ -1524,137 +1272,6 @@ class SubjectDetailView(LoginRequiredMixin, generic.DetailView):
     context_object_name = 'subject'
     template_name = 'teachadmin/subject_detail.html'
 
-    def create_graph(self):
-        students = self.object.student_set.all()
-        exams = self.object.exam_set.all()
-        assignments = self.object.assignment_set.all()
-        lessons = self.object.lesson_set.all()
-        lessontests = LessonTest.objects.filter(lesson__in=lessons)
-        homeworks = Homework.objects.filter(lesson__in=lessons)
-
-        index = []
-        scoreDict = {}
-        scoreDict['Student'] = []
-        scoreDict['Gender'] = []
-
-        for exam in exams:
-            scoreDict['{}({})'.format(exam, exam.pk)] = []
-        for assignment in assignments:
-            scoreDict['{}({})'.format(assignment, assignment.pk)] = []
-        for lessontest in lessontests:
-            scoreDict['{}({})'.format(lessontest, lessontest.pk)] = []
-        for homework in homeworks:
-            scoreDict['{}({})'.format(homework, homework.pk)] = []
-
-        for count, student in enumerate(students):
-            studentScores = {}
-            for exam in exams:
-                if '{}({})'.format(exam, exam.pk) not in studentScores.keys():
-                    studentScores['{}({})'.format(exam, exam.pk)] = []
-                if exam.examscore_set.filter(student=student).count() >=1:
-                    for examscore in exam.examscore_set.filter(student=student):
-                        studentScores['{}({})'.format(exam, exam.pk)].append(
-                            round(((examscore.score/exam.max_score)*100),1)
-                        )
-                else:
-                    studentScores['{}({})'.format(exam, exam.pk)].append(None)
-            
-            for assignment in assignments:
-                if '{}({})'.format(assignment, assignment.pk) not in studentScores.keys():
-                    studentScores['{}({})'.format(assignment, assignment.pk)] = []
-                if assignment.assignmentscore_set.filter(student=student).count() >= 1:
-                    for assignmentscore in assignment.assignmentscore_set.filter(student=student):
-                        studentScores['{}({})'.format(assignment, assignment.pk)].append(
-                            round(((assignmentscore.score/assignment.max_score)*100),1)
-                        )
-                else:
-                    studentScores['{}({})'.format(assignment, assignment.pk)].append(None)
-
-            for lessontest in lessontests:
-                if '{}({})'.format(lessontest, lessontest.pk) not in studentScores.keys():
-                    studentScores['{}({})'.format(lessontest, lessontest.pk)] = []
-                if lessontest.lessontestscore_set.filter(student=student).count() >= 1:
-                    for lessontestscore in lessontest.lessontestscore_set.filter(student=student):
-                        studentScores['{}({})'.format(lessontest, lessontest.pk)].append(
-                            round(((lessontestscore.score/lessontest.max_score)*100), 1)
-                        )
-                else:
-                    studentScores['{}({})'.format(lessontest, lessontest.pk)].append(None)
-
-            for homework in homeworks:
-                if '{}({})'.format(homework, homework.pk) not in studentScores.keys():
-                    studentScores['{}({})'.format(homework, homework.pk)] = []
-                if homework.homeworkscore_set.filter(student=student).count() >= 1:
-                    for homeworkscore in homework.homeworkscore_set.filter(student=student):
-                        studentScores['{}({})'.format(homework, homework.pk)].append(
-                            round(((homeworkscore.score/homework.max_score)*100), 1)
-                        )
-                else:
-                    studentScores['{}({})'.format(homework, homework.pk)].append(None)
-            
-            for key in studentScores.keys():
-                scoreDict[key].append(max(studentScores[key]))
-
-            index.append(count)
-            scoreDict['Student'].append(str(student))
-            scoreDict['Gender'].append(student.gender)
-        
-        keylist = []
-        for key in scoreDict.keys():
-            if all(elem == None for elem in scoreDict[key]):
-                keylist.append(key)
-        
-        for key in keylist:
-            scoreDict.pop(key)
-
-        scoreDF = pd.DataFrame(data=scoreDict, index=index)
-        checkDF = scoreDF.iloc[:,2:]
-
-        if checkDF.empty == False:
-            scoreDF['Gender'] = scoreDF['Gender'].apply(gender_map)
-
-            fig = plt.figure()
-            sns.set_style(style='darkgrid')
-            plt.style.use("dark_background")
-            sns.swarmplot(
-                data=scoreDF,
-                palette='bright')
-
-            axes = fig.gca()
-            margin = int(
-                (scoreDF.max(axis=0, numeric_only=True).max() -
-                scoreDF.min(axis=0, numeric_only=True).min())*0.1
-            )
-            axes.set_ylim(
-                (scoreDF.min(axis=0, numeric_only=True).min())-margin,
-                (scoreDF.max(axis=0, numeric_only=True).max())+margin
-            )
-
-            plt.setp(axes.get_xticklabels(), rotation=45, ha="right",
-                        rotation_mode="anchor")
-            axes.set_title("{} scores".format(self.object))
-            plt.tight_layout()
-
-            # To save space on the server, I convert the graph into 64-bit data and
-            # put it into a local memory buffert from which the img-tag reads the data
-            # and displays the graph
-            buf = io.BytesIO()
-            fig = plt.gcf()
-            try:
-                plt.savefig(buf, format='png')
-                buf.seek(0)
-                figstring = base64.b64encode(buf.read())
-                uri = urllib.parse.quote(figstring)
-            except Exception as err:
-                print("Error while processing data for {}".format(self.object))
-                print(err)
-            else:
-                plt.close(fig)
-                return uri
-        else:
-            return False
-
-
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         teacher = get_object_or_404(Teacher, user=self.request.user)
@@ -1667,9 +1284,9 @@ class SubjectDetailView(LoginRequiredMixin, generic.DetailView):
 
         context['view_title'] = view_title
 
-        #context['graph'] = self.create_graph()
-        graph = Graph(self.object)
-        context['graph'] = graph.uri
+        context['graph'] = graph_url(self.object)
+        context['class_stats'] = student_group(self.object)
+        context['growth'] = group_growth(self.object)
 
         return context
 
@@ -1792,6 +1409,98 @@ class TeacherDetailView(LoginRequiredMixin, generic.DetailView):
         return context
 
 
+GRAPH_PLACEHOLDER = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="640" height="480">'
+    '<rect width="100%" height="100%" fill="#222"/>'
+    '<text x="50%" y="50%" fill="#aaa" font-size="24" text-anchor="middle">'
+    'Drawing the graph for {}...</text></svg>'
+)
+
+def _graph_version(request, model, pk, fmt):
+    # Read once per request: the ETag, Last-Modified and the graph itself all need it
+    if not hasattr(request, '_graph_version'):
+        request._graph_version = ScoreDataVersion.objects.filter(model=model, object_id=pk).first()
+    return request._graph_version
+
+def graph_etag(request, model, pk, fmt):
+    version = _graph_version(request, model, pk, fmt)
+    return "{}-{}-{}-{}".format(model, pk, version.version if version else 0, fmt)
+
+def graph_last_modified(request, model, pk, fmt):
+    version = _graph_version(request, model, pk, fmt)
+    if version:
+        return version.modified
+    return None
+
+@login_required
+@condition(etag_func=graph_etag, last_modified_func=graph_last_modified)
+def graph_image(request, model, pk, fmt):
+    """ Serves the graph of a score model, Lesson, Subject or HomeRoom, or a Student's score
+        timeline, as raw PNG/SVG bytes.
+        The ETag and Last-Modified headers follow the object's ScoreDataVersion,
+        so browsers get a 304 until the scores behind the graph change. """
+    if model not in GRAPH_MODELS or fmt not in GRAPH_FORMATS:
+        raise Http404("No such graph.")
+    model_instance = get_object_or_404(GRAPH_MODELS[model], pk=pk)
+    version = _graph_version(request, model, pk, fmt)
+    version = version.version if version else 0
+
+    if getattr(settings, 'TEACHADMIN_GRAPH_WORKER', False) and fmt == 'png' and model != 'student':
+        # The background renderer (manage.py rendergraphs) takes care of the rendering,
+        # so the request only ever reads pre-rendered graphs
+        image = graph_cache.get(model, pk, version, fmt)
+        if image is None:
+            GraphRenderJob.enqueue([(model, pk)])
+            response = HttpResponse(GRAPH_PLACEHOLDER.format(escape(model_instance)), content_type=GRAPH_FORMATS['svg'])
+            response['ETag'] = '"pending"'
+            patch_cache_control(response, no_store=True)
+            return response
+    else:
+        image = render_graph_image(model_instance, fmt, version)
+    if not image:
+        raise Http404("No scores to draw a graph of for {}.".format(model_instance))
+
+    response = HttpResponse(image, content_type=GRAPH_FORMATS[fmt])
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+COMMENT_GROUPS = {
+    'homeroom': HomeRoom,
+    'subject': Subject,
+}
+
+@login_required
+def group_comments(request, model, pk):
+    """ Report comments (see comments.py) for every student of a Subject or HomeRoom,
+        as a plain text download. """
+    if model not in COMMENT_GROUPS:
+        raise Http404("No comments for {}.".format(model))
+    group = get_object_or_404(COMMENT_GROUPS[model], pk=pk)
+
+    sections = []
+    for student, comment in comments.group_comments(group).items():
+        sections.append("{}\n{}\n\n{}".format(student, "-" * len(str(student)),
+                                              comment or "No scores yet."))
+    response = HttpResponse("\n\n\n".join(sections), content_type='text/plain; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="{}-comments.txt"'.format(
+        slugify(str(group)) or model)
+    return response
+
+@login_required
+def school_reports(request, pk, fmt):
+    """ Streams a ZIP archive with the report comments of every student of a School
+        (see reports.py), one file per student. The reports are rendered inside the
+        request; the process pool is only used by 'manage.py exportreports'. """
+    if fmt not in reports.REPORT_FORMATS:
+        raise Http404("No such report format.")
+    school = get_object_or_404(School, pk=pk)
+    response = StreamingHttpResponse(
+        reports.stream_reports(school, fmt),
+        content_type='application/zip')
+    response['Content-Disposition'] = 'attachment; filename="{}-reports-{}.zip"'.format(
+        slugify(str(school)) or 'school', fmt)
+    return response
+
 @login_required
 def teachadmin_logout(request):
     logout(request)
@@ -1868,86 +1577,6 @@ def addStudent(request, student_group_id):
     else:
         raise Http404('Do not try to hack my shit! A-hole!')
 
-def addStudentClass(request):
-    if request.method == 'POST':
-        form = forms.StudentClassForm(request.POST)
-        if form.is_valid():
-            """ This will be executed when user uploads a file to add
-                    StudentClass"""
-
-            school = get_object_or_404(School, pk=form.cleaned_data['school'].pk)
-            studentClass, created = StudentClass.objects.get_or_create(
-                school=school,
-                name=form.cleaned_data['name'],
-                grade=form.cleaned_data['grade']
-            )
-            if request.FILES.get('classFile', False):
-
-                try:
-                    # Loading the file's data directly into a Pandas DataFrame
-                    results = pd.read_csv(request.FILES['classFile'],
-                                                index_col = 'Number')
-                except Exception as err:
-                    print("ERROR: Couldn't read file into pandas's CSV-format.")
-                    print(err)
-                    raise Http404('ERROR: Not able to read CSV-file')
-                else:
-                    # Since we will create classes, tests, students, and scores
-                    # separately, we separate the data into relevant data for
-                    # students and [tests + scores] respectively
-                    results.info()
-                    results_students = results.loc[:,['Name','Gender']]
-                    results_students.info()
-                    results.drop(columns=['Name','Gender'], inplace=True)
-                    results.info()
-                    results.astype('int64', copy=False)
-
-                    for row in results_students.itertuples():
-                        """ Iterate through the smaller DataFrame to get each
-                            student's data to store in the database """
-
-                        student, created = Student.objects.get_or_create(
-                            student_number=row.Index,
-                            first_name=row.Name,
-                            gender=row.Gender
-                        )
-                        if not created:
-                            print("{} student {} with number {} exists".format(
-                                row.Gender,
-                                row.Name,
-                                row.Index
-                            ))
-
-                        student.studentClass.add(studentClass)
-
-                        for col in results.columns:
-                            if ':' in col:
-                                colname = col.split(':')[0]
-
-                                test_score_limits = col.split(':')[1]
-                                test_min_score = int(test_score_limits.split('-')[0])
-                                test_max_score = int(test_score_limits.split('-')[1])
-
-                                studentClassTest, created = StudentClassTest.objects.get_or_create(
-                                    name=colname,
-                                    min_score=test_min_score,
-                                    max_score=test_max_score
-                                )
-
-                                studentClassTest.studentClass.add(studentClass)
-
-                                studentClassTestScore, created = StudentClassTestScore.objects.get_or_create(
-                                    student=student,
-                                    test=studentClassTest,
-                                    score=int(results.loc[row.Index, col])
-                                )
-
-                finally:
-                    return HttpResponseRedirect(reverse('teachadmin:index'))
-
-    else:
-        return render(request, 'teachadmin/index.html')
-
 def addStudentToHomeRoom(request, homeroom_pk, teacher_pk):
     if request.method == 'POST':
         studentform = forms.StudentToHomeRoomForm(request.POST)
@@ -2000,81 +1629,6 @@ def addTest(request, student_class_id):
                 return HttpResponseRedirect(reverse('teachadmin:studentsView',
                                                     args=(student_class.pk,)))
 
-def addAssignment(request, student_class_id):
-
-    # Getting current StudentClass from the database
-    studentClass = get_object_or_404(StudentClass, pk=student_class_id)
-
-    if request.method == 'POST':
-        print("\n", "Request method: POST", "\n")
-        if request.FILES.get('assignmentFile', False):
-            try:
-                print("\n", "Reading CSV", "\n")
-                assignmentDF = pd.read_csv(
-                    request.FILES['assignmentFile'],
-                    index_col = 'Number')
-                assignmentDF.head()
-            except Exception as err:
-                print("\n \
-                    Couldn't read CSV-file data into Pandas's DataFrame-format\
-                    \n")
-                print(err)
-                raise Http404("Couldn't read CSV-file data \
-                    into Pandas's DataFrame-format")
-            else:
-                print("Reading CSV successful!", "\n")
-                assignment_studentsDF = assignmentDF.loc[:,['Name','Gender']]
-
-                assignmentDF.drop(columns=['Name','Gender'], inplace=True)
-                assignmentDF = assignmentDF.round(0).astype('int64')
-
-                for row in assignment_studentsDF.itertuples():
-                    """ Iterate through the smaller DataFrame to get each
-                    student's data to store in/load from the database """
-                    student, created = Student.objects.get_or_create(
-                        studentClass=studentClass,
-                        student_number=row.Index,
-                        first_name=row.Name,
-                        gender=row.Gender
-                    )
-                    if not created:
-                        print("Student {} already exists in class {}".format(
-                            row.Name,
-                            studentClass
-                        ))
-                    for col in assignmentDF.columns:
-                        colname = col.split(":")[0]
-
-                        assignment_score_limits = col.split(":")[1]
-                        assignment_min_score = int(assignment_score_limits.split("-")[0])
-                        assignment_max_score = int(assignment_score_limits.split("-")[1])
-
-                        print("Attmepting to Assignment: ",
-                            colname,
-                            assignment_min_score,
-                            assignment_max_score,
-                            sep="\n")
-                        assignment, created = Assignment.objects.get_or_create(
-                            name=colname,
-                            min_score=assignment_min_score,
-                            max_score=assignment_max_score
-                        )
-                        print("Attempting to AssignmentScore: ",
-                            student,
-                            assignment,
-                            int(assignmentDF.loc[row.Index, col]),
-                            sep="\n")
-                        assignmentscore, created = AssignmentScore.objects.get_or_create(
-                            student=student,
-                            assignment=assignment,
-                            score=int(assignmentDF.loc[row.Index, col])
-                        )
-        else:
-            print("\nFile not found.\n")
-
-    return HttpResponseRedirect(reverse('teachadmin:studentsView',
-                                                    args=(studentClass.pk,)))
-
 def gender_map(gender):
     if gender == 'F':
         return 'Female'
@@ -2082,7 +1636,3 @@ def gender_map(gender):
         return 'Male'
     else:
         return 'Other'
-
-def last_name_check(last_name):
-    if last_name == "nan":
-        return ""